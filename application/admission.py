@@ -0,0 +1,312 @@
+"""
+Description:
+    Classes used by the server to refuse the connections of the banned users before reading their data.
+    The ban list contains IP addresses, networks (CIDR) and names, and is saved in a file to be kept when
+    the server is launched again. The IP addresses are found in a set, and the networks in a prefix trie
+    whose depth is the length of the address, so the time of a check doesn't depend on the number of bans.
+    The connection attempts of each IP address are limited by a token bucket, so that a client reconnecting
+    in a loop costs only an accept and a close.
+
+Packages:
+    - collections
+    - ipaddress
+    - json
+    - os
+    - time
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+from collections import OrderedDict
+import ipaddress
+import json
+import os
+import time
+
+# Number of connection attempts allowed per second for each IP address, and number of attempts allowed at once.
+CONNECT_RATE = 2.0
+CONNECT_BURST = 10
+
+# Number of IP addresses followed by the rate limiter, the address which has not connected for the longest time is forgotten first.
+MAX_TRACKED = 10000
+
+
+def parse_address(address:str):
+    """
+    Read an IP address.
+
+    Arg:
+        - address (str): The IP address, an IPv4 address mapped in IPv6 is read as IPv4.
+
+    Returns the IP address, None if the text is not an IP address (Unix socket).
+    """
+    try:
+        ip = ipaddress.ip_address(address)
+
+    except ValueError:
+        return None
+
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        return ip.ipv4_mapped
+
+    return ip
+
+
+class BanList:
+    """
+    List of the IP addresses, networks and names banned from the server.
+
+    Arg:
+        - path (str): The path of the file where the list is saved, by default in the folder of the user.
+    """
+    def __init__(self, path:str=None):
+        self.path = path or os.path.join(os.path.expanduser("~"), ".online_chat", "bans.json")
+
+        # Set of the IP addresses banned, and the networks banned in a prefix trie for each IP version.
+        # Each node of a trie is a list containing the nodes of the bits 0 and 1, and true if the network ends at this node.
+        self.addresses = set()
+        self.networks = set()
+        self.tries = {4:[None, None, False], 6:[None, None, False]}
+
+        # Set of the names banned, in lowercase.
+        self.names = set()
+
+        # List of the errors of reading or writing the file, read by the server.
+        self.errors = []
+
+        self.load()
+
+    def load(self):
+        """Read the ban list from its file, the list is empty if the file can't be read."""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+
+            for entry in data.get("Addresses", []):
+                self.add_address(entry)
+
+            self.names = {name.casefold() for name in data.get("Names", [])}
+
+        # The file doesn't exist yet, or is incorrect.
+        except FileNotFoundError:
+            pass
+
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            self.errors.append(e)
+
+    def save(self):
+        """Write the ban list in its file, the file is replaced at once so that it is never incomplete."""
+        data = {"Addresses":sorted(self.addresses | self.networks), "Names":sorted(self.names)}
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+            with open(self.path + ".tmp", "w", encoding="utf-8") as file:
+                json.dump(data, file, indent=4)
+
+            os.replace(self.path + ".tmp", self.path)
+
+        # The bans are kept until the server is closed.
+        except OSError as e:
+            self.errors.append(e)
+
+    def add_address(self, entry:str):
+        """
+        Add an IP address or a network to the list, without saving it.
+
+        Arg:
+            - entry (str): The IP address or the network, like "192.168.1.10" or "192.168.1.0/24".
+
+        Returns the address or the network in its standard form.
+
+        Raises ValueError if the entry is not an IP address or a network.
+        """
+        network = ipaddress.ip_network(entry.strip(), strict=False)
+
+        # A single address is found in the set.
+        if network.prefixlen == network.max_prefixlen:
+            self.addresses.add(str(network.network_address))
+            return str(network.network_address)
+
+        # Add the bits of the prefix to the trie.
+        node = self.tries[network.version]
+        value = int(network.network_address)
+
+        for i in range(network.prefixlen):
+            bit = (value >> (network.max_prefixlen - 1 - i)) & 1
+
+            if node[bit] is None:
+                node[bit] = [None, None, False]
+
+            node = node[bit]
+
+        node[2] = True
+        self.networks.add(str(network))
+
+        return str(network)
+
+    def ban_address(self, entry:str):
+        """
+        Ban an IP address or a network, and save the list.
+
+        Arg:
+            - entry (str): The IP address or the network.
+
+        Returns the address or the network in its standard form.
+
+        Raises ValueError if the entry is not an IP address or a network.
+        """
+        entry = self.add_address(entry)
+        self.save()
+
+        return entry
+
+    def ban_name(self, name:str):
+        """
+        Ban a user name, and save the list.
+
+        Arg:
+            - name (str): The name of the user.
+        """
+        self.names.add(name.casefold())
+        self.save()
+
+    def unban(self, entry:str):
+        """
+        Remove an IP address, a network or a name from the list, and save the list.
+
+        Arg:
+            - entry (str): The IP address, the network or the name.
+
+        Returns false if the entry is not in the list.
+        """
+        try:
+            network = ipaddress.ip_network(entry.strip(), strict=False)
+
+        # The entry is a name.
+        except ValueError:
+            if entry.casefold() not in self.names:
+                return False
+
+            self.names.discard(entry.casefold())
+            self.save()
+
+            return True
+
+        key = str(network.network_address) if network.prefixlen == network.max_prefixlen else str(network)
+
+        if key not in self.addresses and key not in self.networks:
+            return False
+
+        self.addresses.discard(key)
+        self.networks.discard(key)
+
+        # The tries are built again without the network, the networks are rarely removed.
+        self.tries = {4:[None, None, False], 6:[None, None, False]}
+        networks, self.networks = self.networks, set()
+
+        for network in networks:
+            self.add_address(network)
+
+        self.save()
+
+        return True
+
+    def is_banned_address(self, address:str):
+        """
+        Check if an IP address is banned, alone or by a network.
+
+        Arg:
+            - address (str): The IP address of the connection.
+
+        Returns true if the address is banned, false for the connections which have no IP address.
+        """
+        ip = parse_address(address)
+
+        return ip is not None and self.is_banned_ip(ip)
+
+    def is_banned_ip(self, ip):
+        """
+        Check if an IP address already read by parse_address is banned, alone or by a network.
+
+        Arg:
+            - ip (ipaddress.IPv4Address or ipaddress.IPv6Address): The IP address of the connection.
+
+        Returns true if the address is banned.
+        """
+        if str(ip) in self.addresses:
+            return True
+
+        # Follow the bits of the address in the trie, until the end of a network or a missing node.
+        node = self.tries[ip.version]
+        value = int(ip)
+        max_prefixlen = ip.max_prefixlen
+
+        for i in range(max_prefixlen):
+            if node[2]:
+                return True
+
+            node = node[(value >> (max_prefixlen - 1 - i)) & 1]
+
+            if node is None:
+                return False
+
+        return node[2]
+
+    def is_banned_name(self, name:str):
+        """
+        Check if a user name is banned.
+
+        Arg:
+            - name (str): The name of the user.
+
+        Returns true if the name is banned.
+        """
+        return name.casefold() in self.names
+
+
+class RateLimiter:
+    """
+    Limit the connection attempts of each IP address with a token bucket.
+
+    Args:
+        - rate (float): The number of attempts allowed per second.
+        - burst (int): The number of attempts allowed at once.
+    """
+    def __init__(self, rate:float=CONNECT_RATE, burst:int=CONNECT_BURST):
+        self.rate = rate
+        self.burst = burst
+
+        # Dictionary containing the number of attempts left and the time of the last attempt, by IP address.
+        # The addresses are ordered from the least to the most recent attempt.
+        self.buckets = OrderedDict()
+
+    def allow(self, address:str):
+        """
+        Count a connection attempt of an IP address.
+
+        Arg:
+            - address (str): The IP address of the connection.
+
+        Returns true if the attempt is allowed.
+        """
+        now = time.monotonic()
+
+        # The address is removed then added again, at the end of the order.
+        tokens, last_time = self.buckets.pop(address, (self.burst, now))
+
+        # The attempts left are refilled with the time elapsed since the last attempt.
+        tokens = min(self.burst, tokens + (now - last_time) * self.rate)
+
+        # Forget the address which has not connected for the longest time.
+        if len(self.buckets) >= MAX_TRACKED:
+            self.buckets.popitem(last=False)
+
+        if tokens < 1:
+            self.buckets[address] = (tokens, now)
+            return False
+
+        self.buckets[address] = (tokens - 1, now)
+        return True
@@ -0,0 +1,194 @@
+"""
+Description:
+    Class used to keep the last messages of the conversations on the disk of the client,
+    so that the messages are displayed as soon as the client is connected to a server.
+    The messages are written by batch in another thread. Only the last messages are loaded,
+    the older messages are loaded by page when the user scrolls up.
+    The number of messages kept is limited, the messages of the servers not used for the longest time are deleted first.
+
+Packages:
+    - os
+    - queue
+    - sqlite3
+    - threading
+    - time
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+
+class MessageCache:
+    """
+    Create a cache of the messages in a database.
+
+    Args:
+        - path (str): The path of the database, by default in the folder of the user.
+        - max_messages (int): The maximum number of messages kept for all the servers.
+        - flush_delay (float): The time in seconds during which the messages are gathered before being written.
+    """
+    def __init__(self, path:str=None, max_messages:int=20000, flush_delay:float=0.5):
+        self.path = path or os.path.join(os.path.expanduser("~"), ".online_chat", "cache.db")
+        self.max_messages = max_messages
+        self.flush_delay = flush_delay
+
+        # Queue of the messages waiting to be written.
+        self.writes = queue.Queue()
+
+        # Lock preventing the database from being used by the menu and the writing thread at the same time.
+        self.lock = threading.Lock()
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+
+            with self.connection:
+                self.connection.execute("CREATE TABLE IF NOT EXISTS conversations (key TEXT PRIMARY KEY, last_used REAL)")
+                self.connection.execute("CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT, "
+                                        "author TEXT, text TEXT, time REAL, own INTEGER)")
+                self.connection.execute("CREATE INDEX IF NOT EXISTS messages_key ON messages (key, id)")
+
+            self.nb_messages = self.connection.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+        # The messages are not kept if the database can't be opened.
+        except (OSError, sqlite3.Error) as e:
+            print(e)
+            self.connection = None
+            return
+
+        # Create the thread writing the messages.
+        self.thread = threading.Thread(target=self.write_loop, daemon=True)
+        self.thread.start()
+
+    def open(self, key:str):
+        """
+        Mark a conversation as the most recently used.
+
+        Arg:
+            - key (str): The key of the conversation.
+        """
+        if self.connection is None:
+            return
+
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO conversations VALUES (?, ?)", (key, time.time()))
+
+    def add(self, key:str, author:str, text:str, own:bool=False, timestamp:float=None):
+        """
+        Add a message to the cache, it is written later by the writing thread.
+
+        Args:
+            - key (str): The key of the conversation.
+            - author (str): The name of the user who has sent the message.
+            - text (str): The message.
+            - own (bool): If true, the message has been sent by the user.
+            - timestamp (float): The time of the message, by default the current time.
+        """
+        if self.connection is not None:
+            self.writes.put((key, author, text, timestamp or time.time(), int(own)))
+
+    def load(self, key:str, before_id:int=None, limit:int=50):
+        """
+        Read the last messages of a conversation.
+
+        Args:
+            - key (str): The key of the conversation.
+            - before_id (int): Only the messages older than this message are read, to load the previous page.
+            - limit (int): The maximum number of messages read.
+
+        Returns a list containing the ID, the author, the text, the time and if the message has been sent by the user,
+        from the oldest message.
+        """
+        if self.connection is None:
+            return []
+
+        with self.lock:
+            rows = self.connection.execute("SELECT id, author, text, time, own FROM messages WHERE key = ? AND id < ? "
+                                           "ORDER BY id DESC LIMIT ?", (key, before_id or 2**63 - 1, limit)).fetchall()
+
+        return rows[::-1]
+
+    def write_loop(self):
+        """Write the messages by batch until the cache is closed."""
+        while True:
+            message = self.writes.get()
+
+            # The cache is closed.
+            if message is None:
+                return
+
+            # Gather the messages received during the delay, to write them in a single transaction.
+            batch = [message]
+            deadline = time.monotonic() + self.flush_delay
+
+            while message is not None and time.monotonic() < deadline:
+                try:
+                    message = self.writes.get(timeout=max(deadline - time.monotonic(), 0))
+                    if message is not None:
+                        batch.append(message)
+
+                except queue.Empty:
+                    break
+
+            try:
+                with self.lock, self.connection:
+                    self.connection.executemany("INSERT INTO messages (key, author, text, time, own) VALUES (?, ?, ?, ?, ?)", batch)
+                    self.nb_messages += len(batch)
+
+                    if self.nb_messages > self.max_messages:
+                        self.evict()
+
+            # A failed writing doesn't stop the thread.
+            except sqlite3.Error as e:
+                print(e)
+
+            if message is None:
+                return
+
+    def evict(self):
+        """
+        Delete the oldest messages of the conversations used the least recently, until 90% of the maximum is reached.
+        The lock must be held by the caller.
+        """
+        excess = self.nb_messages - self.max_messages * 9 // 10
+
+        keys = [key for key, in self.connection.execute("SELECT key FROM conversations ORDER BY last_used")]
+
+        # The messages of unknown conversations are deleted first.
+        keys.insert(0, None)
+
+        for key in keys:
+            if excess <= 0:
+                break
+
+            if key is None:
+                cursor = self.connection.execute("DELETE FROM messages WHERE id IN (SELECT id FROM messages WHERE key NOT IN "
+                                                 "(SELECT key FROM conversations) ORDER BY id LIMIT ?)", (excess,))
+
+            else:
+                cursor = self.connection.execute("DELETE FROM messages WHERE id IN (SELECT id FROM messages WHERE key = ? "
+                                                 "ORDER BY id LIMIT ?)", (key, excess))
+
+            excess -= cursor.rowcount
+            self.nb_messages -= cursor.rowcount
+
+        # Forget the conversations without messages.
+        self.connection.execute("DELETE FROM conversations WHERE key NOT IN (SELECT DISTINCT key FROM messages)")
+
+    def close(self):
+        """Write the remaining messages and close the database."""
+        if self.connection is None:
+            return
+
+        self.writes.put(None)
+        self.thread.join()
+
+        self.connection.close()
+        self.connection = None
@@ -0,0 +1,150 @@
+"""
+Description:
+    Class used to record the traffic received by a server in a capture file, to replay it later on a new server.
+    Each record contains the time since the beginning of the capture, the ID of the connection, the type of record
+    and its content:
+        - the connection of a client, with the data of the user. The password and the session token are not recorded.
+        - a message received from a client.
+        - a chunk of file received from a client, only its size is recorded.
+        - the disconnection of a client.
+
+Packages:
+    - pickle
+    - struct
+    - time
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import pickle
+import struct
+import time
+
+from protocol import FRAME_OBJECT
+
+# Beginning of the capture files.
+MAGIC = b"ONLINE CHAT CAPTURE 1\n"
+
+# Header of each record: the time (8 bytes), the ID of the connection (4 bytes), the type (1 byte) and the length of the content (4 bytes).
+RECORD = struct.Struct("!dIBI")
+
+RECORD_CONNECT = 0
+RECORD_MESSAGE = 1
+RECORD_CHUNK = 2
+RECORD_DISCONNECT = 3
+
+
+class TrafficCapture:
+    """
+    Record the traffic received by a server.
+
+    Arg:
+        - path (str): The path of the capture file.
+
+    Raises OSError if the file can't be created.
+    """
+    def __init__(self, path:str):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.start = time.monotonic()
+
+        # Dictionary containing the ID of each connection recorded.
+        self.connection_ids = {}
+        self.next_id = 1
+
+    def write(self, connection_id:int, kind:int, content=None):
+        """
+        Write a record at the end of the file.
+
+        Args:
+            - connection_id (int): The ID of the connection.
+            - kind (int): The type of record.
+            - content: The content of the record.
+        """
+        payload = b"" if content is None else pickle.dumps(content)
+        self.file.write(RECORD.pack(time.monotonic() - self.start, connection_id, kind, len(payload)) + payload)
+
+    def connect(self, connection, data_user:dict):
+        """
+        Record the connection of a client.
+
+        Args:
+            - connection : The connection of the client.
+            - data_user (dict): The data sent by the client.
+        """
+        self.connection_ids[connection] = self.next_id
+        self.next_id += 1
+
+        data_user = {key: value for key, value in data_user.items() if key not in ("User_Password", "Session_Token")}
+        self.write(self.connection_ids[connection], RECORD_CONNECT, data_user)
+
+    def frame(self, connection, kind:int, content):
+        """
+        Record a frame received from a client.
+
+        Args:
+            - connection : The connection of the client.
+            - kind (int): The type of frame.
+            - content: The content of the frame, see FrameReader.next_frame.
+        """
+        connection_id = self.connection_ids.get(connection)
+
+        # The client was connected before the beginning of the capture.
+        if connection_id is None:
+            return
+
+        if kind == FRAME_OBJECT:
+            self.write(connection_id, RECORD_MESSAGE, content)
+
+        else:
+            self.write(connection_id, RECORD_CHUNK, [content[0], len(content[1])])
+
+    def disconnect(self, connection):
+        """
+        Record the disconnection of a client.
+
+        Arg:
+            - connection : The connection of the client.
+        """
+        connection_id = self.connection_ids.pop(connection, None)
+
+        if connection_id is not None:
+            self.write(connection_id, RECORD_DISCONNECT)
+
+    def close(self):
+        """Write the last records and close the file."""
+        self.file.close()
+
+
+def read_capture(path:str):
+    """
+    Read the records of a capture file.
+
+    Arg:
+        - path (str): The path of the capture file.
+
+    Returns a generator of tuples containing the time, the ID of the connection, the type and the content of each record.
+
+    Raises ValueError if the file is not a capture file.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a capture file.")
+
+        while True:
+            header = file.read(RECORD.size)
+
+            # The end of the file, the last record may be incomplete if the server has been stopped.
+            if len(header) < RECORD.size:
+                return
+
+            timestamp, connection_id, kind, length = RECORD.unpack(header)
+            payload = file.read(length)
+
+            if len(payload) < length:
+                return
+
+            yield timestamp, connection_id, kind, pickle.loads(payload) if payload else None
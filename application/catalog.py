@@ -0,0 +1,88 @@
+"""
+Description:
+    Catalog of the system messages displayed by the menus. A system message is a tuple containing the ID
+    of its template and its parameters, like (USER_LEFT, "Alice"). The server sends only the ID and
+    the parameters to the clients, and each menu displays the template of its language.
+    A new language only needs a new text in each template.
+
+    The IDs are sent by the server and kept in the history of the messages, they must never change.
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+# Authors of the system messages.
+SYSTEM = 1
+SEARCH = 2
+PRIVATE = 3
+
+# Messages sent by the server.
+USER_LEFT = 10
+KICKED = 11
+SERVER_CLOSED = 12
+
+# Messages of the client.
+RECONNECTED = 20
+RECONNECTING = 21
+CONNECTION_LOST = 22
+NOT_ONLINE = 23
+FILE_REFUSED = 24
+NO_RESULTS = 25
+SEARCH_RESULTS = 26
+
+# Errors reported to the menus.
+STAGE_FAILED = 30
+BAN_LIST_FAILED = 31
+COMMAND_FAILED = 32
+UNIX_SOCKET_FAILED = 33
+LINK_FAILED = 34
+
+# Templates of the messages in English and French, by ID. The parameters are inserted in their order.
+TEMPLATES = {
+    SYSTEM: ["System", "Système"],
+    SEARCH: ["Search", "Recherche"],
+    PRIVATE: ["{} (private)", "{} (privé)"],
+    USER_LEFT: ["{} exit the server.", "{} quitte le serveur."],
+    KICKED: ["You have been kicked out by a moderator.", "Vous avez été exclu du serveur."],
+    SERVER_CLOSED: ["The server has been closed.", "Le serveur a été fermé."],
+    RECONNECTED: ["You are connected again.", "Vous êtes de nouveau connecté."],
+    RECONNECTING: ["The connection with the server has been lost, reconnection...",
+                   "La connexion avec le serveur a été perdue, reconnexion..."],
+    CONNECTION_LOST: ["The connection with the server has been lost.", "La connexion avec le serveur a été perdue."],
+    NOT_ONLINE: ["{} is not online, the message has not been sent.", "{} n'est pas connecté, le message n'a pas été envoyé."],
+    FILE_REFUSED: ["The file {} has been refused by the server.", "Le fichier {} a été refusé par le serveur."],
+    NO_RESULTS: ["No message found.", "Aucun message trouvé."],
+    SEARCH_RESULTS: ["{} messages found : {}", "{} messages trouvés : {}"],
+    STAGE_FAILED: ["A message has been dropped by an error of the pipeline : {}",
+                   "Un message a été supprimé par une erreur du pipeline : {}"],
+    BAN_LIST_FAILED: ["The ban list can't be read or saved : {}", "La liste des bannis ne peut pas être lue ou enregistrée : {}"],
+    COMMAND_FAILED: ["The command {} has failed : {}", "La commande {} a échoué : {}"],
+    UNIX_SOCKET_FAILED: ["The Unix socket can't be created : {}", "Le socket Unix ne peut pas être créé : {}"],
+    LINK_FAILED: ["The link with another server has been closed : {}", "Le lien avec un autre serveur a été fermé : {}"],
+}
+
+
+def localize(text, language:int):
+    """
+    Get the text of a message in a language.
+
+    Args:
+        - text: A text, a message of the catalog, or a list containing the text in each language (sent by the previous servers).
+        - language (int): The index of the language, 0 for English and 1 for French.
+
+    Returns the text.
+    """
+    if isinstance(text, tuple):
+        templates = TEMPLATES.get(text[0])
+
+        # A message of a newer server, only its parameters are displayed.
+        if templates is None:
+            return " ".join(str(param) for param in text[1:])
+
+        return templates[language].format(*text[1:])
+
+    if isinstance(text, list):
+        return text[language]
+
+    return text
@@ -1,19 +1,63 @@
 """
 Description:
     Class used to create and connect client to the server with a IP address and port.
-    The client can receive and send messages from the server.
+    The client can receive and send messages from the server, and send private messages to another user.
+    The client can share files with the other users, the files are sent and received by chunks.
+    When the connection is lost, the client reconnects with the token of his session and receives the messages
+    sent during the reconnection.
+    The connection can be cancelled, and fails when the server doesn't answer in time. When the name of the server
+    has several addresses, the client connects to all of them in parallel and keeps the first connection established.
 
 Packages:
-    - pickle
+    - errno
+    - os
+    - queue
+    - random
+    - select
     - socket
+    - threading
+    - time
 """
 
 __author__ = ("Manitas Bahri")
 __version__ = "1.0"
 __date__ = "2020/05"
 
-import pickle
+import errno
+import os
+import queue
+import random
+import select
 import socket
+import threading
+import time
+
+from catalog import (CONNECTION_LOST, FILE_REFUSED, NO_RESULTS, NOT_ONLINE, PRIVATE, RECONNECTED, RECONNECTING,
+                     SEARCH, SEARCH_RESULTS, SYSTEM)
+from protocol import CHUNK_SIZE, FRAME_CHUNK, FrameReader, is_trusted_unix_socket, pack_chunk, pack_object, unix_socket_path
+
+# Maximum number of bytes of a file sent and not yet acknowledged by the server.
+UPLOAD_WINDOW = 8 * CHUNK_SIZE
+
+# Number of attempts to reconnect, and the first and maximum delays in seconds between two attempts.
+RECONNECT_ATTEMPTS = 8
+RECONNECT_DELAY = 0.5
+RECONNECT_MAX_DELAY = 15
+
+# Maximum time in seconds to connect to the server and receive its answer.
+CONNECT_TIMEOUT = 10.0
+
+# Delay in seconds before connecting to the next address of the server, if the previous ones have not answered yet.
+CONNECT_DELAY = 0.25
+
+# Errors of a connection which is being established by a non-blocking socket (10035 is WSAEWOULDBLOCK on Windows).
+CONNECT_IN_PROGRESS = (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN, 10035)
+
+# Minimum time in seconds between two notifications that the user is typing, shorter than the timeout of the server.
+TYPING_DEBOUNCE = 2.0
+
+# Addresses of the machine of the client, the server can then be reached by its Unix domain socket.
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
 
 
 class Client:
@@ -33,15 +77,56 @@ class Client:
         self.password = password
         
         # Dictionary contain user data.
+        # The client asks to be informed of the users who are typing.
         self.data_user = {"User_Name":self.user_name,
                           "User_Password":self.password,
-                          "Online_User":[]}
+                          "Online_User":[],
+                          "Typing_Events":True}
 
         # Define variables.
         self.is_connected = False
         self.is_stopped = False
-        self.new_msg = False
-        self.updt_user = False
+        self.server_connection = None
+
+        # The Unix domain socket of a local server is used only if it is asked.
+        self.use_unix_socket = False
+
+        # Maximum time in seconds to connect, the event is set to cancel the connection.
+        self.connect_timeout = CONNECT_TIMEOUT
+        self.cancel_event = threading.Event()
+
+        # Step of the connection displayed by the menu, in English and French.
+        self.connect_state = ["Connecting to the server...", "Connexion au serveur..."]
+
+        # Token of the session given by the server, and number of the last message received.
+        self.session_token = None
+        self.last_sequence = 0
+
+        # Time of the last notification sent to the server that the user is typing, None if he is not typing.
+        self.typing_time = None
+
+        # Queue of the events received from the server (messages, online users, file transfers), 
+        # filled by the receiving thread and emptied by the menu.
+        self.events = queue.Queue()
+
+        # Reader cutting the data received in frames.
+        self.reader = FrameReader()
+
+        # Lock preventing the frames sent by several threads from being mixed.
+        self.send_lock = threading.Lock()
+
+        # Dictionary containing the files sent and received, by ID of transfer.
+        self.transfers = {}
+
+        # Dictionary containing the files offered to the server and waiting for an ID of transfer.
+        self.pending_uploads = {}
+        self.next_token = 1
+
+        # Condition used to wait for the acknowledgement of the chunks of file sent.
+        self.transfer_condition = threading.Condition()
+
+        # Folder where the files received are saved.
+        self.download_dir = os.path.join(os.path.expanduser("~"), "Downloads")
 
     def create_connection(self):
         """
@@ -56,23 +141,18 @@ class Client:
             if  self.port < 1024 or self.port > 60000:
                 raise ValueError("The port is not between 1024 and 60000.")
 
-            # Create the connection with the server
-            self.server_connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_connection.connect((self.host, self.port))
-
-            # Send data user to the server.
-            self.server_connection.send(pickle.dumps(self.data_user))
+            msg_connection = self.connect()
 
-            # Receive and decrypt the server authorization message.
-            msg_connection = self.server_connection.recv(1024)
-            msg_connection = pickle.loads(msg_connection)
+            # The connection has been cancelled just after being accepted.
+            if msg_connection[0] == "server connection accepted" and self.cancel_event.is_set():
+                self.server_connection.close()
+                raise ConnectionAbortedError("The connection has been cancelled.")
 
             # The connection with the server is authorized.
             if msg_connection[0] == "server connection accepted":
                 self.msg_report = ["Connection with the server.", "Connection au serveur."]
-                self.data_server = msg_connection[1]
                 self.is_connected = True
-                self.updt_user = True
+                self.events.put(["Update User", self.data_user["Online_User"]])
 
             # The connection with the server is refused.
             # Name already exists.
@@ -85,48 +165,359 @@ class Client:
                 self.msg_report = ["The password does not match. Please try again.",
                                    "Le mot de passe ne correspond pas. Veuillez réessayer."]
 
+            # The user is banned from the server.
+            elif msg_connection[0] == "server connection refused" and msg_connection[1] == "banned":
+                self.msg_report = ["You are banned from this server.", "Vous êtes banni de ce serveur."]
+
+            # Too many connections from the address of the user.
+            elif msg_connection[0] == "server connection refused" and msg_connection[1] == "rate limit":
+                self.msg_report = ["Too many connection attempts. Please wait a few seconds and try again.",
+                                   "Trop de tentatives de connexion. Veuillez patienter quelques secondes et réessayer."]
+
         # The port is not an integer.
         except ValueError as ve:
             self.msg_report = [f"The server could not be launched. Please check the port.\nError : {ve}",
                                f"Le serveur n'a pas pu être lancé. Veuillez vérifier le port.\nErreur : {ve}"]
 
+        # The user has cancelled the connection.
+        except ConnectionAbortedError:
+            self.msg_report = ["The connection has been cancelled.", "La connexion a été annulée."]
+
+        # The server has not answered in time.
+        except socket.timeout:
+            self.msg_report = [f"The server has not answered within {self.connect_timeout:g} seconds. Please check the IP address and port.",
+                               f"Le serveur n'a pas répondu en {self.connect_timeout:g} secondes. Veuillez vérifier l'adresse IP et le port."]
+
         # Incorrect address IP or Port.
         except socket.error as e:
             self.msg_report = [f"There is no server which correspond with these informations. Please check the IP address and port.\nError : {e}",
                                f"Aucun serveur ne correspond à ces informations. Veuillez vérifier l'adresse IP et le port.\nErreur : {e}"]
 
+    def connect(self):
+        """
+        Open a new connection with the server and send the data of the user.
+
+        Returns the server authorization message.
+
+        Raises ConnectionAbortedError if the connection is cancelled, socket.timeout if the server doesn't answer in time.
+        """
+        deadline = time.monotonic() + self.connect_timeout
+
+        # Create the connection with the server
+        self.server_connection = self.open_socket(deadline)
+        self.reader = FrameReader()
+
+        try:
+            # Send data user to the server.
+            self.connect_state = ["Waiting for the answer of the server...", "Attente de la réponse du serveur..."]
+            self.send_frame(pack_object(self.data_user))
+
+            # Receive and decrypt the server authorization message.
+            __, msg_connection = self.wait_frame(deadline)
+
+        except (OSError, ValueError):
+            self.server_connection.close()
+            raise
+
+        # Keep the session to reconnect later. The client only receives the messages sent after his first connection.
+        # A new session, after a restart of the server for example, numbers the messages again from the number given.
+        if msg_connection[0] == "server connection accepted":
+            self.data_server = msg_connection[1]
+
+            if msg_connection[2] != self.session_token:
+                self.last_sequence = msg_connection[3]
+
+            self.session_token = msg_connection[2]
+
+        return msg_connection
+
+    def open_socket(self, deadline:float):
+        """
+        Open a socket connected to the server. If it is asked, a server of the same machine is reached by its
+        Unix domain socket, only if the socket has been created by the same user, and by TCP otherwise.
+
+        Arg:
+            - deadline (float): The time, given by time.monotonic, when the connection fails.
+
+        Returns the socket.
+        """
+        path = unix_socket_path(self.port) if self.use_unix_socket and self.host in LOCAL_HOSTS else None
+
+        if path is not None and is_trusted_unix_socket(path):
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+            try:
+                connection.connect(path)
+                return connection
+
+            # The file has been left by a server which is closed.
+            except OSError:
+                connection.close()
+
+        self.connect_state = [f"Resolving {self.host}...", f"Résolution de {self.host}..."]
+        addresses = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+
+        self.connect_state = [f"Connecting to {self.host}:{self.port} ({len(addresses)} addresses)...",
+                              f"Connexion à {self.host}:{self.port} ({len(addresses)} adresses)..."]
+
+        # Dictionary containing the connections being established, and the last error.
+        pending = {}
+        error = OSError(f"No address found for {self.host}.")
+        next_start = time.monotonic()
+
+        try:
+            while addresses or pending:
+                self.check_connecting(deadline)
+                now = time.monotonic()
+
+                # Connect to the next address when the previous ones take too long or have failed.
+                if addresses and (now >= next_start or not pending):
+                    family, kind, proto, __, address = addresses.pop(0)
+                    next_start = now + CONNECT_DELAY
+
+                    connection = socket.socket(family, kind, proto)
+                    connection.setblocking(False)
+                    error_code = connection.connect_ex(address)
+
+                    if error_code in CONNECT_IN_PROGRESS:
+                        pending[connection] = address
+
+                    else:
+                        connection.close()
+                        error = OSError(error_code, os.strerror(error_code))
+
+                    continue
+
+                # Wait a short time, to check regularly if the connection is cancelled.
+                timeout = min(0.1, max(deadline - now, 0), max(next_start - now, 0) if addresses else 0.1)
+                __, writable, failed = select.select([], list(pending), list(pending), timeout)
+
+                for connection in set(writable) | set(failed):
+                    error_code = connection.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    del pending[connection]
+
+                    # The first connection established is kept, the others are closed.
+                    if error_code == 0:
+                        connection.setblocking(True)
+                        return connection
+
+                    connection.close()
+                    error = OSError(error_code, os.strerror(error_code))
+
+            raise error
+
+        finally:
+            for connection in pending:
+                connection.close()
+
+    def check_connecting(self, deadline:float):
+        """
+        Check if the connection can continue.
+
+        Arg:
+            - deadline (float): The time, given by time.monotonic, when the connection fails.
+
+        Raises ConnectionAbortedError if the connection is cancelled, socket.timeout if the time is over.
+        """
+        if self.cancel_event.is_set():
+            raise ConnectionAbortedError("The connection has been cancelled.")
+
+        if time.monotonic() >= deadline:
+            raise socket.timeout("The server has not answered in time.")
+
+    def wait_frame(self, deadline:float):
+        """
+        Wait for a complete frame from the server, while checking if the connection is cancelled.
+
+        Arg:
+            - deadline (float): The time, given by time.monotonic, when the connection fails.
+
+        Returns the frame, see FrameReader.next_frame.
+        """
+        while not self.reader.has_frame():
+            self.check_connecting(deadline)
+            readable, __, __ = select.select([self.server_connection], [], [], min(0.1, max(deadline - time.monotonic(), 0)))
+
+            if readable and self.reader.recv_into(self.server_connection) == 0:
+                raise ConnectionResetError("The connection has been closed.")
+
+        return self.reader.next_frame()
+
+    def cancel_connection(self):
+        """Cancel the connection to the server, the connection stops within a tenth of a second."""
+        self.cancel_event.set()
+
+    def reconnect(self):
+        """
+        Try to reconnect to the server after the connection has been lost.
+        The delay between two attempts doubles at each attempt, with a random part so that all the clients
+        of the server don't reconnect at the same time.
+
+        Returns true if the client is reconnected.
+        """
+        # The client resumes his session from the last message received.
+        self.data_user["Session_Token"] = self.session_token
+        self.data_user["Last_Sequence"] = self.last_sequence
+        delay = RECONNECT_DELAY
+
+        for __ in range(RECONNECT_ATTEMPTS):
+            self.server_connection.close()
+            time.sleep(random.uniform(delay / 2, delay))
+
+            # The user has closed the connection during the reconnection.
+            if not self.is_connected:
+                return False
+
+            try:
+                msg_connection = self.connect()
+
+            except (OSError, ValueError):
+                delay = min(2 * delay, RECONNECT_MAX_DELAY)
+                continue
+
+            # The session has expired, or the user has closed the connection during the reconnection.
+            if msg_connection[0] != "server connection accepted" or not self.is_connected:
+                self.server_connection.close()
+                return False
+
+            self.events.put(["Message", (SYSTEM,), (RECONNECTED,)])
+            return True
+
+        return False
+
+    def connection_lost(self):
+        """The connection with the server has been lost without being closed by the server, the client tries to reconnect."""
+        # The file transfers can't continue on a new connection.
+        for transfer_id in list(self.transfers):
+            self.stop_transfer(transfer_id)
+
+        # The users who are typing are sent again by the server after the reconnection.
+        self.typing_time = None
+        self.events.put(["Typing", []])
+
+        self.events.put(["Message", (SYSTEM,), (RECONNECTING,)])
+
+        if self.session_token is None or not self.reconnect():
+            self.stop_connection((CONNECTION_LOST,))
+
+    def start_receiving(self):
+        """Start the thread receiving the messages from the server."""
+        trd_receive = threading.Thread(target=self.receive_loop, daemon=True)
+        trd_receive.start()
+
+    def receive_loop(self):
+        """Receive the messages from the server until the connection is closed."""
+        while self.is_connected:
+            self.receive_message()
+
     def receive_message(self):
-        """Receive messages and data from the server."""
+        """
+        Receive a message or data from the server.
+        The messages are decoded and added to the events queue, to be displayed by the menu.
+        """
         try:
             if self.is_connected:
-                # Receive the messages.
-                self.message_recv = self.server_connection.recv(1024)
+                # Receive the data only if no complete frame is waiting in the reader.
+                if not self.reader.has_frame():
+                    # The connection has been lost.
+                    if self.reader.recv_into(self.server_connection) == 0:
+                        if self.is_connected:
+                            self.connection_lost()
+                        return
+
+                # Get the next frame.
+                frame = self.reader.next_frame()
                 
                 # Check if the message is not null.
-                if self.message_recv != b"":
+                if frame is not None:
+                    kind, message_recv = frame
+
+                    # Chunk of a file being received.
+                    if kind == FRAME_CHUNK:
+                        self.receive_chunk(*message_recv)
 
-                    # Decrypt the messages.
-                    self.message_recv = pickle.loads(self.message_recv)
+                    # Messages of the file transfers.
+                    elif message_recv[0] in ("File Upload", "File Refused", "File Ack", "File Offer", "File Cancel"):
+                        self.handle_transfer(message_recv)
 
                     # Server request to update the online users list.
-                    if self.message_recv[0] == "Update User":
-                        self.updt_user = True
-                        self.data_user["Online_User"] = self.message_recv[1]
+                    elif message_recv[0] == "Update User":
+                        self.data_user["Online_User"] = message_recv[1]
+                        self.events.put(["Update User", message_recv[1]])
+
+                    # Private message sent by another user.
+                    elif message_recv[0] == "Direct Message":
+                        name = message_recv[1]
+                        self.events.put(["Message", (PRIVATE, name), message_recv[2]])
+
+                    # The recipient of a private message is not online.
+                    elif message_recv[0] == "Direct Message Error":
+                        name = message_recv[1]
+                        self.events.put(["Message", (SYSTEM,), (NOT_ONLINE, name)])
+
+                    # List of the users who are typing, without the user.
+                    elif message_recv[0] == "Typing":
+                        self.events.put(["Typing", [name for name in message_recv[1] if name != self.user_name]])
+
+                    # Server response to a search of old messages.
+                    elif message_recv[0] == "Search Result":
+                        self.events.put(["Message", (SEARCH,), self.format_results(message_recv[1])])
 
                     # Server request to exit the server.
-                    elif self.message_recv[0] == "Exit Server":
-                        self.new_msg = True
-                        self.message_recv[0] = ["System", "Système"]
-                        
-                        self.is_stopped = True
-                        self.is_connected = False
+                    elif message_recv[0] == "Exit Server":
+                        self.stop_connection(message_recv[1])
+
+                    # The messages sent to all users are numbered, they are displayed only once
+                    # even if they are sent again after a reconnection.
+                    elif len(message_recv) > 2 and message_recv[2] <= self.last_sequence:
+                        pass
 
                     else:
-                        self.new_msg = True
+                        if len(message_recv) > 2:
+                            self.last_sequence = message_recv[2]
+
+                        self.events.put(["Message", message_recv[0], message_recv[1]])
 
         # Avoid an error when shutting down the server.
-        except ConnectionAbortedError as e:
-            print(e)
+        except (OSError, ValueError) as e:
+            if self.is_connected:
+                print(e)
+                self.connection_lost()
+
+    def stop_connection(self, reason:tuple):
+        """
+        Stop the connection after the server has closed it, and inform the menu.
+
+        Arg:
+            - reason (tuple): The message of the catalog explaining why the connection is stopped.
+        """
+        self.is_stopped = True
+        self.is_connected = False
+        self.events.put(["Exit Server", (SYSTEM,), reason])
+
+    def search(self, query:str):
+        """
+        Ask the server the old messages matching the query.
+
+        Arg:
+            - query (str): The words to search, with the optional filters "from:name", "after:date" and "before:date".
+        """
+        self.send_frame(pack_object(f"/search {query}"))
+
+    def format_results(self, results:list):
+        """
+        Create the text displaying the results of a search.
+
+        Arg:
+            - results (list): List containing the author, the time and the text of the messages found.
+
+        Returns the message of the catalog.
+        """
+        if not results:
+            return (NO_RESULTS,)
+
+        lines = " | ".join(f"{author}, {hour} : {text.strip()}" for author, hour, text in results)
+        return (SEARCH_RESULTS, len(results), lines)
 
     def send_message(self, message:str):
         """
@@ -135,17 +526,281 @@ class Client:
         Arg:
             - message (str): Message to send to the server.
         """
-        msg_send = message.encode()
-        self.server_connection.send(msg_send)
+        # The server knows that the user has stopped typing when he receives the message.
+        self.typing_time = None
+        self.send_frame(pack_object(message))
+
+    def send_direct_message(self, recipient:str, message:str):
+        """
+        Send a private message to another user through the server.
+        
+        Args:
+            - recipient (str): The name of the user who receives the message.
+            - message (str): Message to send.
+        """
+        self.typing_time = None
+        self.send_frame(pack_object(f"/msg {recipient}\n{message}"))
+
+    def notify_typing(self):
+        """Inform the server that the user is typing. The server is informed at most once per delay, not at each key."""
+        now = time.monotonic()
+
+        if self.typing_time is not None and now - self.typing_time < TYPING_DEBOUNCE:
+            return
+
+        self.typing_time = now
+
+        # The notification is not needed if the connection is lost.
+        try:
+            self.send_frame(pack_object(["Typing", True]))
+
+        except OSError:
+            pass
+
+    def stop_typing(self):
+        """Inform the server that the user has stopped typing, if the server has been informed that he is typing."""
+        if self.typing_time is None:
+            return
+
+        self.typing_time = None
+
+        try:
+            self.send_frame(pack_object(["Typing", False]))
+
+        except OSError:
+            pass
+
+    def send_frame(self, frame:bytes):
+        """
+        Send a frame to the server.
+
+        Arg:
+            - frame (bytes): The frame to send.
+        """
+        with self.send_lock:
+            self.server_connection.sendall(frame)
+
+    def offer_file(self, path:str, recipient:str=None):
+        """
+        Ask the server to share a file. The file is sent when the server gives the ID of the transfer.
+
+        Args:
+            - path (str): The path of the file.
+            - recipient (str): The name of the user who receives the file, by default all the users receive it.
+        """
+        token = self.next_token
+        self.next_token += 1
+
+        self.pending_uploads[token] = path
+        self.send_frame(pack_object(["File Offer", token, os.path.basename(path), os.path.getsize(path), recipient]))
+
+    def handle_transfer(self, message:list):
+        """
+        Handle a message of the server about a file transfer.
+
+        Arg:
+            - message (list): The message received.
+        """
+        # The server is ready to receive the file.
+        if message[0] == "File Upload":
+            path = self.pending_uploads.pop(message[1])
+            transfer_id = message[2]
+
+            self.transfers[transfer_id] = {"Name":os.path.basename(path), "Size":os.path.getsize(path), "Done":0, "Sent":0,
+                                           "Direction":"upload", "State":"running", "Path":path}
+
+            # The file is sent in another thread to not block the reception of the messages.
+            trd_upload = threading.Thread(target=self.upload_file, args=(transfer_id,), daemon=True)
+            trd_upload.start()
+
+        # The server refuses the file.
+        elif message[0] == "File Refused":
+            path = self.pending_uploads.pop(message[1])
+            name = os.path.basename(path)
+
+            self.events.put(["Message", (SYSTEM,), (FILE_REFUSED, name)])
+
+        # The server has received the chunks of file.
+        elif message[0] == "File Ack":
+            with self.transfer_condition:
+                self.transfers[message[1]]["Done"] = message[2]
+                self.transfer_condition.notify_all()
+
+        # Another user shares a file.
+        elif message[0] == "File Offer":
+            transfer_id, sender, name, size = message[1:]
+            self.transfers[transfer_id] = {"Name":name, "Size":size, "Done":0, "Sender":sender,
+                                           "Direction":"download", "State":"offered", "Path":None}
+
+        # The server has cancelled the transfer.
+        elif message[0] == "File Cancel":
+            self.stop_transfer(message[1])
+
+        self.events.put(["Transfer"])
+
+    def upload_file(self, transfer_id:int):
+        """
+        Send a file to the server by chunks.
+        The file is read chunk by chunk, and the chunks are sent only when the server has acknowledged the previous ones.
+
+        Arg:
+            - transfer_id (int): The ID of the transfer.
+        """
+        transfer = self.transfers[transfer_id]
+
+        try:
+            with open(transfer["Path"], "rb") as file:
+                while transfer["State"] == "running" and transfer["Sent"] < transfer["Size"]:
+                    # Wait until the server has acknowledged enough chunks.
+                    with self.transfer_condition:
+                        while transfer["State"] == "running" and transfer["Sent"] - transfer["Done"] >= UPLOAD_WINDOW:
+                            self.transfer_condition.wait(1)
+
+                    data = file.read(CHUNK_SIZE)
+
+                    if not data or transfer["State"] != "running":
+                        break
+
+                    self.send_frame(pack_chunk(transfer_id, data))
+                    transfer["Sent"] += len(data)
+
+            # Wait the acknowledgement of the last chunks.
+            with self.transfer_condition:
+                while transfer["State"] == "running" and transfer["Done"] < transfer["Size"]:
+                    self.transfer_condition.wait(1)
+
+            if transfer["State"] == "running":
+                transfer["State"] = "complete"
+
+        # The file can't be read or the connection is closed.
+        except OSError:
+            self.cancel_transfer(transfer_id)
+
+        self.events.put(["Transfer"])
+
+    def accept_file(self, transfer_id:int):
+        """
+        Accept a file offered by another user, the file is saved in the download folder.
+
+        Arg:
+            - transfer_id (int): The ID of the transfer.
+        """
+        transfer = self.transfers[transfer_id]
+
+        # Find a name not used in the download folder.
+        os.makedirs(self.download_dir, exist_ok=True)
+        name, extension = os.path.splitext(transfer["Name"])
+        path = os.path.join(self.download_dir, transfer["Name"])
+        number = 1
+
+        while os.path.exists(path):
+            path = os.path.join(self.download_dir, f"{name} ({number}){extension}")
+            number += 1
+
+        transfer["Path"] = path
+        transfer["File"] = open(path, "wb")
+        transfer["State"] = "running"
+
+        self.send_frame(pack_object(["File Accept", transfer_id]))
+
+        # An empty file is immediately complete.
+        if transfer["Size"] == 0:
+            self.receive_chunk(transfer_id, b"")
+
+        self.events.put(["Transfer"])
+
+    def receive_chunk(self, transfer_id:int, data:bytes):
+        """
+        Write a chunk of file received on the disk.
+
+        Args:
+            - transfer_id (int): The ID of the transfer.
+            - data (bytes): The chunk of file.
+        """
+        transfer = self.transfers.get(transfer_id)
+
+        # The lock prevents the file from being closed by a cancellation during the writing.
+        with self.transfer_condition:
+            # Ignore the chunks of cancelled transfers.
+            if transfer is None or transfer["State"] != "running":
+                return
+
+            transfer["File"].write(data)
+            transfer["Done"] += len(data)
+
+            if transfer["Done"] >= transfer["Size"]:
+                transfer["File"].close()
+                transfer["State"] = "complete"
+
+        self.events.put(["Transfer"])
+
+    def cancel_transfer(self, transfer_id:int):
+        """
+        Cancel the sending or the reception of a file.
+
+        Arg:
+            - transfer_id (int): The ID of the transfer.
+        """
+        # A file only offered is refused without informing the server.
+        if self.transfers[transfer_id]["State"] == "running":
+            try:
+                self.send_frame(pack_object(["File Cancel", transfer_id]))
+
+            # Avoid an error when the connection is closed.
+            except OSError:
+                pass
+
+        self.stop_transfer(transfer_id)
+
+    def stop_transfer(self, transfer_id:int):
+        """
+        Stop a transfer and delete the part of file received.
+
+        Arg:
+            - transfer_id (int): The ID of the transfer.
+        """
+        transfer = self.transfers.get(transfer_id)
+
+        if transfer is None or transfer["State"] in ("complete", "cancelled"):
+            return
+
+        with self.transfer_condition:
+            was_running = transfer["State"] == "running"
+            transfer["State"] = "cancelled"
+            self.transfer_condition.notify_all()
+
+            # Delete the part of file received.
+            if transfer["Direction"] == "download" and was_running:
+                transfer["File"].close()
+
+                try:
+                    os.remove(transfer["Path"])
+
+                except OSError:
+                    pass
+
+        self.events.put(["Transfer"])
 
     def close(self):
         """Close the connection with the server."""
+        # The connection is closed, the receiving thread stops, and the reconnection is cancelled.
+        self.is_connected = False
+        self.cancel_event.set()
+
+        # The client has never been connected.
+        if self.server_connection is None:
+            return
+
         try:
-            self.server_connection.send(b"Close Client Connection")
+            self.send_frame(pack_object("Close Client Connection"))
+
+            # Wake up the receiving thread waiting for data.
+            self.server_connection.shutdown(socket.SHUT_RDWR)
 
         # Avoid an error when shutting down the server.
-        except ConnectionAbortedError:
+        except OSError:
             pass
 
-        # The connection is closed.
-        self.is_connected = False
+        # Stop the file transfers.
+        for transfer_id in list(self.transfers):
+            self.stop_transfer(transfer_id)
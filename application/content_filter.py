@@ -0,0 +1,164 @@
+"""
+Description:
+    Class used to block or mask the banned words in the messages sent by the clients.
+    The banned words are compiled in an Aho-Corasick automaton, so each message is read only once
+    whatever the number of banned words.
+
+Packages:
+    - collections
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+from collections import deque
+
+
+class ContentFilter:
+    """
+    Create a filter of banned words, usable as a stage of the message pipeline.
+
+    Args:
+        - patterns (list): The banned words.
+        - mode (str): "mask" to replace the banned words by the mask character, "block" to drop the message.
+        - mask_char (str): The character used to hide the banned words.
+        - ignore_case (bool): If true the banned words are found whatever their case.
+    """
+    def __init__(self, patterns=(), mode:str="mask", mask_char:str="*", ignore_case:bool=True):
+        if mode not in ("mask", "block"):
+            raise ValueError("The mode must be 'mask' or 'block'.")
+
+        self.mode = mode
+        self.mask_char = mask_char
+        self.ignore_case = ignore_case
+
+        self.load(patterns)
+
+    def load(self, patterns):
+        """
+        Compile a new list of banned words and replace the current one.
+        The messages being filtered keep using the previous automaton.
+
+        Arg:
+            - patterns (list): The banned words.
+        """
+        # List of transitions of each node, the node 0 is the root.
+        goto = [{}]
+
+        # Length of the longest banned word ending at each node.
+        output = [0]
+        nb_patterns = 0
+
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if self.ignore_case:
+                pattern = pattern.lower()
+
+            # Ignore the empty lines.
+            if not pattern:
+                continue
+
+            node = 0
+            for char in pattern:
+                next_node = goto[node].get(char)
+
+                if next_node is None:
+                    next_node = len(goto)
+                    goto[node][char] = next_node
+                    goto.append({})
+                    output.append(0)
+
+                node = next_node
+
+            output[node] = max(output[node], len(pattern))
+            nb_patterns += 1
+
+        # Compute the failure links with a breadth-first traversal of the tree.
+        # The failure link of the nodes following the root is the root.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+
+        while queue:
+            node = queue.popleft()
+
+            for char, next_node in goto[node].items():
+                queue.append(next_node)
+
+                # Search the longest suffix which is also a prefix of a banned word.
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+
+                fail[next_node] = goto[state].get(char, 0)
+                output[next_node] = max(output[next_node], output[fail[next_node]])
+
+        # Replace the automaton in a single assignment, so the workers never see an incomplete one.
+        self.automaton = (goto, fail, output)
+        self.nb_patterns = nb_patterns
+
+    def find(self, message:str):
+        """
+        Search the banned words in the message.
+
+        Arg:
+            - message (str): The message to read.
+
+        Returns a list containing the start and end index of each banned word found.
+        """
+        goto, fail, output = self.automaton
+        text = message.lower() if self.ignore_case else message
+
+        # Index in the message of each character of the text, None when they are the same.
+        positions = None
+
+        # Some characters change length when lowercased, each character is then lowercased alone
+        # to know where it comes from in the message.
+        if len(text) != len(message):
+            positions = []
+            for index, char in enumerate(message):
+                positions += [index] * len(char.lower())
+
+            text = "".join(char.lower() for char in message)
+
+        matches = []
+        node = 0
+
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+
+            node = goto[node].get(char, 0)
+
+            if output[node]:
+                matches.append((index + 1 - output[node], index + 1))
+
+        if positions is not None:
+            matches = [(positions[start], positions[end - 1] + 1) for start, end in matches]
+
+        return matches
+
+    def __call__(self, author:str, message:str):
+        """
+        Filter a message.
+
+        Args:
+            - author (str): The name of the user who has sent the message.
+            - message (str): The message to filter.
+
+        Returns the filtered message, or None if the message is blocked.
+        """
+        matches = self.find(message)
+
+        if not matches:
+            return message
+
+        if self.mode == "block":
+            return None
+
+        # Replace each character of the banned words by the mask character.
+        chars = list(message)
+        for start, end in matches:
+            chars[start:end] = self.mask_char * (end - start)
+
+        return "".join(chars)
@@ -0,0 +1,354 @@
+"""
+Description:
+    Classes used to run the server or the client in a child process, so that the network is not slowed down
+    by the graphical user interface, which can take a long time to display many messages.
+    The menu uses these classes like a server or a client. The commands and the events are exchanged
+    with the child process through queues.
+
+Packages:
+    - multiprocessing
+    - queue
+    - time
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import multiprocessing
+import queue
+import time
+
+# Keys of the file transfers copied to the menu, the other keys contain the open files of the client.
+TRANSFER_KEYS = ("Name", "Size", "Done", "Sender", "Direction", "State")
+
+# Maximum time in seconds to wait for the server or the client to be created in the child process.
+START_TIMEOUT = 30
+
+
+def run_server(args, commands, events):
+    """
+    Create the server and run it until it is closed. This function is executed in the child process.
+
+    Args:
+        - args (list): The arguments of the server.
+        - commands (multiprocessing.Queue): The queue of the commands sent by the menu.
+        - events (multiprocessing.Queue): The queue of the events sent to the menu.
+    """
+    from server import Server
+
+    server = Server(*args)
+    server.create_connection()
+
+    # Informs the menu of the server launch.
+    events.put(["Report", {"msg_report":server.msg_report, "is_launched":server.is_launched, "port":server.port}])
+
+    if server.is_launched:
+        # The queues of the server are replaced by the queues shared with the menu process.
+        server.commands = commands
+        server.events = events
+        server.run()
+
+
+def run_client(args, commands, events):
+    """
+    Create the client and execute the commands of the menu until the client is closed.
+    This function is executed in the child process.
+
+    Args:
+        - args (list): The arguments of the client.
+        - commands (multiprocessing.Queue): The queue of the commands sent by the menu.
+        - events (multiprocessing.Queue): The queue of the events sent to the menu.
+    """
+    from catalog import COMMAND_FAILED
+    from client import Client
+
+    client = Client(*args)
+    client.create_connection()
+
+    # Informs the menu of the connection.
+    events.put(["Report", {"msg_report":client.msg_report, "is_connected":client.is_connected,
+                           "data_server":getattr(client, "data_server", None)}])
+
+    if not client.is_connected:
+        return
+
+    # The events of the client are sent to the menu, starting with those of the connection.
+    first_events = client.events
+    client.events = TransferEvents(events, client)
+
+    while not first_events.empty():
+        client.events.put(first_events.get())
+
+    client.start_receiving()
+
+    # Each command is the name of a method of the client followed by its arguments.
+    while True:
+        command = commands.get()
+
+        try:
+            getattr(client, command[0])(*command[1:])
+
+        # A command which fails doesn't stop the client, the menu is informed of the error.
+        except Exception as e:
+            events.put(["Error", (COMMAND_FAILED, command[0], str(e))])
+
+        if command[0] == "close":
+            return
+
+
+class TransferEvents:
+    """
+    Queue used by the client in the child process. The state of the file transfers is added to their events,
+    because the menu can't read the transfers of the client.
+
+    Args:
+        - events (multiprocessing.Queue): The queue of the events sent to the menu.
+        - client (Client): The client whose transfers are sent.
+    """
+    def __init__(self, events, client):
+        self.events = events
+        self.client = client
+
+    def put(self, event:list):
+        """Send an event to the menu."""
+        if event[0] == "Transfer":
+            event = ["Transfer", {transfer_id: {key: transfer[key] for key in TRANSFER_KEYS if key in transfer}
+                                  for transfer_id, transfer in list(self.client.transfers.items())}]
+
+        self.events.put(event)
+
+
+class EngineProcess:
+    """
+    Child process running a server or a client, and the queues used to communicate with it.
+
+    Args:
+        - target: The function executed in the child process.
+        - args (list): The arguments of the server or the client.
+    """
+    def __init__(self, target, args):
+        # The child process is started without copying the graphical user interface.
+        context = multiprocessing.get_context("spawn")
+
+        self.commands = context.Queue()
+        self.events = context.Queue()
+        self.process = context.Process(target=target, args=(list(args), self.commands, self.events), daemon=True)
+
+    def start_process(self):
+        """
+        Start the child process and wait until the server or the client is created.
+
+        Returns the report of the child process, None if it has not answered in time or has been stopped.
+        """
+        self.process.start()
+        deadline = time.monotonic() + START_TIMEOUT
+
+        # Wait a short time, to see if the child process has been stopped while it starts.
+        while time.monotonic() < deadline:
+            is_alive = self.process.is_alive()
+
+            try:
+                return self.events.get(timeout=0.1)[1]
+
+            except queue.Empty:
+                if not is_alive:
+                    return None
+
+        return None
+
+    def stop_process(self, timeout:float):
+        """
+        Wait for the end of the child process, and kill it if it doesn't stop in time.
+
+        Arg:
+            - timeout (float): The maximum time in seconds to wait.
+
+        Returns false if the process has not stopped in time and has been killed.
+        """
+        self.process.join(timeout)
+
+        if not self.process.is_alive():
+            return True
+
+        self.process.terminate()
+        self.process.join()
+
+        return False
+
+
+class ServerProcess(EngineProcess):
+    """
+    Server running in a child process. The menu uses it like a server, with its commands and events queues.
+
+    Args:
+        - server_name (str) : The name of server.
+        - user_name (str) : The name of the server owner.
+        - address_ip (str) : The address IP used to launch the server.
+        - port (str) : The port where the server will be created.
+        - password (str) : The server can be password protected to prevent intrusion.
+        - pipeline (MessagePipeline) : The pipeline of the server, sent to the child process before its workers start.
+    """
+    def __init__(self, server_name, user_name, address_ip, port, password, pipeline=None):
+        super().__init__(run_server, [server_name, user_name, address_ip, port, password, pipeline])
+        self.server_name = server_name
+        self.owner_name = user_name
+        self.host = address_ip
+        self.port = port
+
+        # Define variables.
+        self.is_launched = False
+
+    def create_connection(self):
+        """Launch the server in the child process."""
+        report = self.start_process()
+
+        if report is None:
+            self.msg_report = ["The server could not be launched.", "Le serveur n'a pas pu être lancé."]
+            self.stop_process(0)
+
+        else:
+            self.msg_report = report["msg_report"]
+            self.is_launched = report["is_launched"]
+            self.port = report["port"]
+
+    def start(self):
+        """The server is already running in the child process."""
+
+    def stop(self, timeout:float=2.0):
+        """
+        Close the server and wait for the end of the child process.
+
+        Arg:
+            - timeout (float): The maximum time in seconds to inform the clients of server shutdown.
+
+        Returns false if the server has not stopped in time and its process has been killed.
+        """
+        if self.is_launched:
+            self.commands.put(["Close Server", timeout])
+            self.is_launched = False
+
+        return self.stop_process(timeout + 1)
+
+
+class ClientProcess(EngineProcess):
+    """
+    Client running in a child process. The menu uses it like a client, each method sends a command to the child process.
+
+    Args:
+        - user_name (str) : The name of the user.
+        - address_ip (str) : The address IP of the server.
+        - port (str) : The port of the server.
+        - password (str) : The password of the server.
+    """
+    def __init__(self, user_name, address_ip, port, password):
+        super().__init__(run_client, [user_name, address_ip, port, password])
+
+        # Copy of the file transfers of the client, updated with the events.
+        self.transfers = {}
+
+        # Define variables.
+        self.is_connected = False
+        self.is_cancelled = False
+        self.connect_state = ["Connecting to the server...", "Connexion au serveur..."]
+
+    def create_connection(self):
+        """Connect the client to the server in the child process."""
+        report = self.start_process()
+
+        if self.is_cancelled:
+            self.msg_report = ["The connection has been cancelled.", "La connexion a été annulée."]
+            self.stop_process(0)
+
+            # The client may have been connected just before being stopped.
+            self.is_connected = False
+
+        elif report is None:
+            self.msg_report = ["The connection with the server has failed.", "La connexion avec le serveur a échoué."]
+            self.stop_process(0)
+
+        else:
+            self.msg_report = report["msg_report"]
+            self.is_connected = report["is_connected"]
+            self.data_server = report["data_server"]
+
+        # The events are read by the menu, the transfers are updated at the same time.
+        self.events = ClientEvents(self.events, self)
+
+    def cancel_connection(self):
+        """Cancel the connection to the server by stopping the child process."""
+        self.is_cancelled = True
+
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def start_receiving(self):
+        """The client already receives the messages in the child process."""
+
+    def search(self, query:str):
+        """Ask the server for the old messages matching the query."""
+        self.commands.put(["search", query])
+
+    def send_message(self, message:str):
+        """Send a message to all users."""
+        self.commands.put(["send_message", message])
+
+    def send_direct_message(self, recipient:str, message:str):
+        """Send a private message to a user."""
+        self.commands.put(["send_direct_message", recipient, message])
+
+    def notify_typing(self):
+        """Inform the server that the user is typing."""
+        self.commands.put(["notify_typing"])
+
+    def stop_typing(self):
+        """Inform the server that the user has stopped typing."""
+        self.commands.put(["stop_typing"])
+
+    def offer_file(self, path:str, recipient:str=None):
+        """Share a file with the users."""
+        self.commands.put(["offer_file", path, recipient])
+
+    def accept_file(self, transfer_id:int):
+        """Accept a file offered by another user."""
+        self.commands.put(["accept_file", transfer_id])
+
+    def cancel_transfer(self, transfer_id:int):
+        """Cancel a file transfer."""
+        self.commands.put(["cancel_transfer", transfer_id])
+
+    def close(self):
+        """Close the connection with the server and wait for the end of the child process."""
+        if self.is_connected:
+            self.commands.put(["close"])
+            self.is_connected = False
+
+        self.stop_process(2)
+
+
+class ClientEvents:
+    """
+    Queue of the events received from the client process.
+    The copy of the file transfers is updated when their events are read.
+
+    Args:
+        - events (multiprocessing.Queue): The queue of the events sent by the child process.
+        - client (ClientProcess): The client whose transfers are updated.
+    """
+    def __init__(self, events, client):
+        self.events = events
+        self.client = client
+
+    def get_nowait(self):
+        """
+        Get the next event of the client.
+
+        Raises queue.Empty if there is no event.
+        """
+        event = self.events.get_nowait()
+
+        if event[0] == "Transfer":
+            self.client.transfers = event[1]
+            event = ["Transfer"]
+
+        return event
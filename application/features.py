@@ -3,6 +3,7 @@ This script file contains all the widgets classes needed for the GUI of the mess
 The widgets are created with Tkinter and Python 3.
 
 Packages:
+    - bisect
     - datetime
     - textwrap
     - tkinter
@@ -13,11 +14,15 @@ __author__ = ("Manitas Bahri")
 __version__ = "1.0"
 __date__ = "2020/05"
 
+import bisect
 from datetime import datetime
 import textwrap
 import tkinter as tk
 import tkinter.ttk as ttk
 
+# Dictionary containing the icons of the application, loaded only once.
+ICONS = {}
+
 
 class BubbleMessage(tk.Frame):
     """
@@ -107,9 +112,146 @@ class TextButton(tk.Label):
         self["fg"] = self.default_color
 
 
+class FileTransferBar(tk.Frame):
+    """
+    Create a frame displaying the progress of a file transfer, with buttons to accept and cancel it.
+
+    Args:
+        - parent: The parent of this frame.
+        - name (str): The name of the file.
+        - size (int): The size of the file in bytes.
+        - lg (int): The language of the texts.
+        - fg: The color font.
+        - bg: The background color of the frame.
+        - accept_command: Function to call when the user accepts the file, None for the files sent.
+        - cancel_command: Function to call when the user cancels the transfer.
+    """
+    def __init__(self, parent, name:str, size:int, lg:int, fg, bg, accept_command=None, cancel_command=None):
+        super().__init__(parent, bg=bg)
+        self.name = name
+        self.size = size
+        self.lg = lg
+        self.is_finished = False
+
+        # Create a label with the name and the size of the file.
+        self.lbl_file = tk.Label(self, text="%s (%s)" % (textwrap.shorten(name, 20, placeholder="..."), format_size(size)),
+                                 font=("Courier 9"), fg=fg, bg=bg, anchor="w")
+        self.lbl_file.pack(side="top", fill="x")
+
+        # Create a progress bar.
+        self.progress = ttk.Progressbar(self, orient="horizontal", mode="determinate", maximum=max(size, 1))
+        self.progress.pack(side="left", fill="x", expand=True)
+
+        # Create text buttons to accept and cancel the transfer.
+        self.btn_cancel = TextButton(self, hover_color="#FFBEBE", text=["Cancel", "Annuler"][self.lg], command=cancel_command,
+                                     font=("Courier 9 bold"), fg=fg, bg=bg)
+        self.btn_cancel.pack(side="right", padx=2)
+
+        self.btn_accept = None
+        if accept_command:
+            self.btn_accept = TextButton(self, hover_color="#BEFFBE", text=["Accept", "Accepter"][self.lg], command=accept_command,
+                                         font=("Courier 9 bold"), fg=fg, bg=bg)
+            self.btn_accept.pack(side="right", padx=2)
+
+    def update_transfer(self, state:str, done:int):
+        """
+        Update the progress of the transfer.
+
+        Args:
+            - state (str): The state of the transfer (offered, running, complete or cancelled).
+            - done (int): The number of bytes transferred.
+        """
+        self.progress["value"] = done
+
+        # The file can't be accepted anymore.
+        if state != "offered" and self.btn_accept:
+            self.btn_accept.destroy()
+            self.btn_accept = None
+
+        # The transfer is finished.
+        if state in ("complete", "cancelled"):
+            self.is_finished = True
+            self.btn_cancel.config(text={"complete":["Complete", "Terminé"], "cancelled":["Cancelled", "Annulé"]}[state][self.lg])
+            self.btn_cancel.unbind("<Button-1>")
+
+
+def format_size(size:int):
+    """Returns the size in bytes with the most suitable unit."""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return "%d %s" % (size, unit)
+        size /= 1024
+
+    return "%.1f GB" % size
+
+
+class MessageRow(tk.Frame):
+    """
+    Create a bubble message reused to display the different messages of the message box.
+
+    Args:
+        - parent: The canvas of the message box.
+        - msg_width (int): The width of the bubble message in pixels.
+        - click_command: Function called with the event when the user clicks on the bubble message.
+        - delete_command: Function called with the index of the message when the user deletes it.
+    """
+    def __init__(self, parent, msg_width:int, click_command, delete_command):
+        super().__init__(parent, highlightthickness=1)
+
+        # Index of the message displayed, None if the bubble message is not used.
+        self.index = None
+
+        # Create labels in the bubble message.
+        self.lbl_title = tk.Label(self, font=("Courier 9 bold"))
+        self.lbl_msg = tk.Label(self, font=("Courier 10"), justify="left")
+        self.lbl_title.pack(anchor="w")
+        self.lbl_msg.pack(anchor="w")
+
+        # Create the frame with the option to delete the message, only displayed when the message is selected.
+        self.frm_options = tk.Frame(self, highlightbackground="#F5F6F7", highlightthickness=1)
+        self.btn_delete = TextButton(self.frm_options, hover_color="#FFBEBE", text="Delete this message.", 
+                                     command=lambda: delete_command(self.index), font=("Courier 9 bold"))
+        self.btn_delete.pack(side="left")
+
+        # Call the click command if the user clicks on the text message or on the frame.
+        self.bind("<Button-1>", click_command)
+        self.lbl_msg.bind("<Button-1>", click_command)
+
+        # Create the window of the bubble message in the canvas, hidden until a message is displayed.
+        self.item = parent.create_window(0, 0, window=self, anchor="nw", width=msg_width, state="hidden")
+
+    def show(self, index:int, title:str, message:str, style:tuple, selected:bool):
+        """
+        Display a message in the bubble message.
+
+        Args:
+            - index (int): The index of the message.
+            - title (str): The title of the message.
+            - message (str): The message, already cut in lines.
+            - style (tuple): The background, border and font colors.
+            - selected (bool): If true, the option to delete the message is displayed.
+        """
+        bg_color, bd_color, font_color = style
+        self.index = index
+
+        self.config(bg=bg_color, highlightbackground=bd_color)
+        self.lbl_title.config(text=title, bg=bg_color, fg=font_color)
+        self.lbl_msg.config(text=message, bg=bg_color, fg=font_color)
+
+        if selected:
+            self.frm_options.config(bg=bg_color)
+            self.btn_delete.config(bg=bg_color, fg=font_color)
+            self.btn_delete.default_color = font_color
+            self.frm_options.pack(fill="x")
+
+        else:
+            self.frm_options.pack_forget()
+
+
 class ScrollableFrameMessage(tk.Frame):
     """
     Create a scrollable frame for displaying messages.
+    The messages are stored as text, only the visible messages are displayed in bubble messages reused when scrolling.
 
     Args:
         - parent: The parent of this frame.
@@ -117,19 +259,41 @@ class ScrollableFrameMessage(tk.Frame):
         - c_height (int): The canvas height of the frame.
         - bg: The background color of the frame.
         - msg_width (int): The length of message in a line.
+        - margin (int): The number of messages displayed above and below the visible messages.
+        - max_messages (int): The maximum number of messages kept, the oldest are deleted.
+        - load_command: Function called when the top of the message box is reached, to add the older messages.
+          It returns the number of messages added, 0 when there are no older messages.
     """
-    def __init__(self, parent, c_width:int, c_height:int, bg, msg_width:int=48, **kw):
+    def __init__(self, parent, c_width:int, c_height:int, bg, msg_width:int=48, margin:int=5, max_messages:int=100000,
+                 load_command=None, **kw):
         super().__init__(parent, bg=bg, **kw)
         self.c_width = c_width
         self.c_height = c_height
         self.background = bg
         self.msg_width = msg_width
+        self.margin = margin
+        self.max_messages = max_messages
+        self.load_command = load_command
+
+        # List containing the title, the text cut in lines and the style of each message.
+        self.messages = []
+
+        # List of the different colors of messages, each message only contains the index of its style.
+        self.styles = []
+
+        # List containing the position of the top of each message, and the height of all messages.
+        self.offsets = []
+        self.total_height = 0
+
+        # Dictionary containing the bubble message of each displayed message, and the list of the unused bubble messages.
+        self.rows = {}
+        self.free_rows = []
 
         # Define variables.
-        self.frm_options = None
-        self.current_event = None
+        self.selected = None
+        self.row_height = None
 
-        # Create canvas contain the scrollbar frame.
+        # Create canvas contain the bubble messages.
         self.canvas = tk.Canvas(self, highlightbackground=self.background, highlightthickness=1, bg=self.background, width=self.c_width, height=self.c_height)
         self.canvas.pack(side="left", fill="both", expand=True)
         
@@ -137,21 +301,13 @@ class ScrollableFrameMessage(tk.Frame):
         self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
         self.scrollbar.pack(side="right", fill="y")
         
-        # Configure the scrollbar to the canvas.
-        self.canvas.config(yscrollcommand=self.scrollbar.set)
-        
-        # The main scrollable frame contain all messages.
-        self.frm_scrollable = tk.Frame(self.canvas, bg=self.background)
-        
-        # Update the value of scrollregion.
-        self.frm_scrollable.bind("<Configure>", lambda e: self.canvas.config(scrollregion=self.canvas.bbox("all")))
+        # Configure the scrollbar to the canvas, the visible messages are displayed at each scrolling.
+        self.canvas.config(yscrollcommand=self.on_scroll)
+        self.canvas.bind("<Configure>", lambda e: self.render())
         
         # When mouse is over the frame, the user can scroll it with the mouse wheel.
-        self.frm_scrollable.bind("<Enter>", self.bound_mousewheel)
-        self.frm_scrollable.bind("<Leave>", self.unbound_mousewheel)
-
-        # Create a window at the top of the canvas where the messages will appear.
-        self.canvas.create_window(0, 0, window=self.frm_scrollable, anchor=("nw"), width=self.c_width)        
+        self.canvas.bind("<Enter>", self.bound_mousewheel)
+        self.canvas.bind("<Leave>", self.unbound_mousewheel)
         
     def bound_mousewheel(self, event):
         """
@@ -168,9 +324,23 @@ class ScrollableFrameMessage(tk.Frame):
         """Method used to scroll with mouse wheel."""
         self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
 
+    def on_scroll(self, first, last):
+        """Move the scrollbar and display the messages which have become visible."""
+        self.scrollbar.set(first, last)
+        self.render()
+
+        # Load the older messages when the top of the message box is reached.
+        if self.load_command and float(first) <= 0:
+            self.after_idle(self.load_older)
+
+    def load_older(self):
+        """Ask for the older messages, and stop asking when there are no more messages."""
+        if self.load_command and self.canvas.canvasy(0) <= 0 and self.load_command() == 0:
+            self.load_command = None
+
     def display_message(self, user_name:str, message:str, bg_color, bd_color, font_color):
         """
-        Create a new bubble message in the message box.
+        Add a new message in the message box.
 
         Args:
             - user_name (str): The name of the user who has sent this message.
@@ -179,74 +349,293 @@ class ScrollableFrameMessage(tk.Frame):
             - bd_color : The border color of the bubble message.
             - font_color : The font color in the bubble message.
         """
+        self.display_messages([(user_name, message, bg_color, bd_color, font_color)])
 
-        # Format the information text.
-        txt_info = "%s, %s" % (user_name, datetime.now().strftime("%H:%M"))
-        
-        # Frame containing the title and message.
-        bubble_frame = tk.Frame(self.frm_scrollable, bg=bg_color, highlightbackground=bd_color, highlightthickness=1)
-        bubble_frame.pack(fill="x", expand=True, padx=5, pady=5)
+    def display_messages(self, batch:list):
+        """
+        Add several messages in the message box.
+        The scroll region is computed and the message box is scrolled only once for all messages.
 
-        # Create labels in the bubble message.
-        tk.Label(bubble_frame, text=txt_info, font=("Courier 9 bold"), bg=bg_color, fg=font_color).pack(anchor="w")
-        lbl_msg = tk.Label(bubble_frame, text=textwrap.fill(message, self.msg_width), font=("Courier 10"), bg=bg_color, justify="left", fg=font_color)
-        lbl_msg.pack(anchor="w")
+        Arg:
+            - batch (list): The name of the user, the message, the background, border and font colors of each message,
+          and optionally the time of the message.
+        """
+        if not batch:
+            return
+
+        for message in batch:
+            self.messages.append(self.format_message(*message))
+            self.offsets.append(self.total_height)
+            self.total_height += self.get_height(len(self.messages) - 1)
+
+        # Delete the oldest messages, by block to not move all messages each time.
+        if len(self.messages) > self.max_messages:
+            self.delete_messages(0, len(self.messages) - self.max_messages + self.max_messages // 10)
 
-        # Call message_option method if the user clicks on the text message or on the frame.
-        lbl_msg.bind("<Button-1>", lambda event:self.message_option(event, font_color))
-        bubble_frame.bind("<Button-1>", lambda event:self.message_option(event, font_color))
-        
         # Move the scrollbar to bottom of frame.
-        self.after(30, lambda: self.canvas.yview_moveto(1))
+        self.canvas.config(scrollregion=(0, 0, self.c_width, self.total_height))
+        self.canvas.yview_moveto(1)
+        self.render()
+
+    def insert_messages(self, batch:list):
+        """
+        Add older messages at the beginning of the message box, the visible messages don't move.
 
-    def message_option(self, event, font_color):
+        Arg:
+            - batch (list): The messages, see display_messages.
+        """
+        if not batch:
+            return
+
+        self.messages[0:0] = [self.format_message(*message) for message in batch]
+
+        if self.selected is not None:
+            self.selected += len(batch)
+
+        top = self.canvas.canvasy(0)
+        previous_height = self.total_height
+        self.update_offsets(0)
+
+        # Scroll to keep the same messages visible.
+        self.canvas.yview_moveto((top + self.total_height - previous_height) / max(self.total_height, 1))
+        self.clear_rows()
+        self.render()
+
+    def format_message(self, user_name:str, message:str, bg_color, bd_color, font_color, timestamp:float=None):
+        """
+        Create the data of a message stored in the message box.
+
+        Args:
+            - user_name (str): The name of the user who has sent this message.
+            - message (str): The message.
+            - bg_color : The background color of the bubble message.
+            - bd_color : The border color of the bubble message.
+            - font_color : The font color in the bubble message.
+            - timestamp (float): The time of the message, by default the current time.
+
+        Returns a tuple containing the title, the message cut in lines and the index of the style.
+        """
+        # Format the information text.
+        date = datetime.fromtimestamp(timestamp) if timestamp else datetime.now()
+        txt_info = "%s, %s" % (user_name, date.strftime("%H:%M"))
+
+        # The colors are stored once for all messages with the same style.
+        style = (bg_color, bd_color, font_color)
+        if style not in self.styles:
+            self.styles.append(style)
+
+        return txt_info, textwrap.fill(message, self.msg_width), self.styles.index(style)
+
+    def get_height(self, index:int):
+        """Returns the height in pixels of a message, with the space between messages."""
+        # The heights of the lines are measured with a bubble message the first time.
+        if self.row_height is None:
+            self.measure_rows()
+
+        base_height, line_height, option_height = self.row_height
+        height = base_height + line_height * (self.messages[index][1].count("\n") + 1)
+
+        if index == self.selected:
+            height += option_height
+
+        return height
+
+    def measure_rows(self):
+        """Measure the height of a bubble message, of a line of message and of the option frame."""
+        row = self.get_row()
+        style = (self.background, self.background, "black")
+
+        heights = []
+        for message, selected in (("-", False), ("-\n-", False), ("-", True)):
+            row.show(None, "-", message, style, selected)
+            row.update_idletasks()
+            heights.append(row.winfo_reqheight())
+
+        self.free_rows.append(row)
+
+        # The space between the messages is added to the height of the bubble message.
+        line_height = heights[1] - heights[0]
+        self.row_height = (heights[0] - line_height + 10, line_height, heights[2] - heights[0])
+
+    def update_offsets(self, start:int=0):
+        """
+        Compute the position of the messages after a message whose height has changed.
+
+        Arg:
+            - start (int): The index of the first message to move.
+        """
+        del self.offsets[start:]
+        height = self.offsets[-1] + self.get_height(start - 1) if start > 0 else 0
+
+        for index in range(start, len(self.messages)):
+            self.offsets.append(height)
+            height += self.get_height(index)
+
+        self.total_height = height
+        self.canvas.config(scrollregion=(0, 0, self.c_width, self.total_height))
+
+    def get_row(self):
+        """Returns an unused bubble message, a new one is created only if there is none."""
+        if self.free_rows:
+            return self.free_rows.pop()
+
+        return MessageRow(self.canvas, self.c_width - 10, self.message_option, self.delete_message)
+
+    def clear_rows(self):
+        """Hide all bubble messages, to display them again after the messages have moved."""
+        for row in self.rows.values():
+            self.canvas.itemconfigure(row.item, state="hidden")
+            row.index = None
+            self.free_rows.append(row)
+
+        self.rows.clear()
+
+    def render(self):
+        """Display the visible messages with the bubble messages, the other bubble messages are reused."""
+        # Get the visible part of the canvas.
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+
+        # Search the visible messages, with a margin of messages.
+        first = max(bisect.bisect_right(self.offsets, top) - 1 - self.margin, 0)
+        last = min(bisect.bisect_right(self.offsets, bottom) + self.margin, len(self.offsets))
+
+        # Hide the bubble messages which are no longer visible.
+        for index in list(self.rows):
+            if not first <= index < last:
+                row = self.rows.pop(index)
+                self.canvas.itemconfigure(row.item, state="hidden")
+                row.index = None
+                self.free_rows.append(row)
+
+        # Display the messages which have become visible.
+        for index in range(first, last):
+            if index not in self.rows:
+                row = self.rows[index] = self.get_row()
+                title, message, style = self.messages[index]
+                row.show(index, title, message, self.styles[style], index == self.selected)
+
+                self.canvas.coords(row.item, 5, self.offsets[index] + 5)
+                self.canvas.itemconfigure(row.item, state="normal")
+
+    def message_option(self, event):
         """
         When the user clicks on the bubble message, 
-        a new frame appears with option to delete it.
+        the option to delete it appears.
+        """
+        # Get the bubble message, the user can click on the frame or on the text message.
+        row = event.widget if isinstance(event.widget, MessageRow) else event.widget.master
+
+        if row.index is None:
+            return
+
+        # If the message already has the option, it is hidden. Else, the option is moved to this message.
+        previous = self.selected
+        self.selected = None if row.index == previous else row.index
+
+        # Move the messages after the messages whose height has changed.
+        changed = [index for index in (previous, self.selected) if index is not None]
+        self.update_offsets(min(changed))
+
+        self.clear_rows()
+        self.render()
+
+    def delete_message(self, index:int):
+        """
+        Delete a message from the message box.
 
         Arg:
+            - index (int): The index of the message.
+        """
+        self.selected = None
+        self.delete_messages(index, index + 1)
+
+    def delete_messages(self, start:int, end:int):
+        """
+        Delete several consecutive messages.
+
+        Args:
+            - start (int): The index of the first message deleted.
+            - end (int): The index after the last message deleted.
+        """
+        del self.messages[start:end]
+
+        # The index of the selected message changes if the messages before it are deleted.
+        if self.selected is not None:
+            if self.selected >= end:
+                self.selected -= end - start
+
+            elif self.selected >= start:
+                self.selected = None
+
+        self.update_offsets(start)
+        self.clear_rows()
+        self.render()
+
+
+def get_icon(name:str):
+    """
+    Load an icon of the application, each icon is loaded only once and shared by all widgets.
+
+    Arg:
+        - name (str): The name of the icon, without the extension.
+
+    Returns the image, None if the icon has not been found.
+    """
+    if name not in ICONS:
+        try:
+            ICONS[name] = tk.PhotoImage(file=f"application/icon/{name}.png")
+
+        # Avoid an error if the icon has not been found.
+        except tk.TclError:
+            ICONS[name] = None
+
+    return ICONS[name]
+
+
+class UserRow(tk.Label):
+    """
+    Create a bubble user reused to display the different users of the online user frame.
+
+    Args:
+        - parent: The canvas of the online user frame.
+        - width (int): The width of the bubble user in pixels.
+    """
+    def __init__(self, parent, width:int):
+        super().__init__(parent, font=("Courier 11"), anchor="w", compound="left", relief="flat")
+        self.user_name = None
+        self.command = None
+
+        # Call the command when the user clicks on the bubble user.
+        self.bind("<Button-1>", lambda event: self.command(self.user_name) if self.command else None)
+
+        # Create the window of the bubble user in the canvas, hidden until a user is displayed.
+        self.item = parent.create_window(0, 0, window=self, anchor="nw", width=width, state="hidden")
+
+    def show(self, user_name:str, user_status:str, bg_color, font_color, command=None):
+        """
+        Display a user in the bubble user.
+
+        Args:
+            - user_name (str): The name of the user.
+            - user_status (str): The status of the user (moderator or client).
+            - bg_color: The background color of the bubble user.
             - font_color: The font color.
-        """        
-        def delete_message():
-            """Function used to delete the message from the message box."""
-            frm_bubble.destroy()
-            self.frm_options.destroy()
-
-        # Check the type of event.widget so that the message bubble frame is used as the parent. 
-        if event.widget.winfo_class() == "Frame":
-            frm_bubble = event.widget
-        
-        elif event.widget.winfo_class() == "Label":
-            frm_bubble = event.widget.master
-
-        # Check if the bubble message does not already have the frm_options.
-        if self.current_event != event.widget:
-            
-            # If the frm_options already exists, then it destroys it.
-            if self.frm_options:
-                self.frm_options.destroy()
-            
-            # Create the frm_options.
-            self.frm_options = tk.Frame(frm_bubble, bg=frm_bubble["bg"], highlightbackground="#F5F6F7", highlightthickness=1)
-            self.frm_options.pack(fill="x")
-            
-            # Create text button to delete the current message.
-            TextButton(self.frm_options, hover_color="#FFBEBE", text="Delete this message.", 
-                                        command=delete_message, font=("Courier 9 bold"), bg=frm_bubble["bg"], fg=font_color).pack(side="left")
-            
-            # Change the bubble message that has the frm_options.
-            self.current_event = event.widget
-        
-        # If the bubble message already has the frm_options, it destroys it. 
-        else:
-            self.frm_options.destroy()
-            self.frm_options = None
-            self.current_event = None    
+            - command: Function called with the name of the user when the bubble user is clicked.
+        """
+        self.user_name = user_name
+        self.command = command
+
+        # Crown icon next to the name of the moderator.
+        icon = get_icon("crown" if user_status == "moderator" else "client")
+
+        self.config(text=" " + user_name, image=icon or "", bg=bg_color, fg=font_color, cursor="hand2" if command else "")
 
 
 class ScrollableFrameOnUser(tk.Frame):
     """
     Create a scrollable frame for displaying the online users.
+    Only the visible users are displayed in bubble users, which are kept while their user is visible.
 
     Args:
         - parent: The parent of this frame.
@@ -260,11 +649,19 @@ class ScrollableFrameOnUser(tk.Frame):
         self.c_height = c_height
         self.background = bg
 
+        # List containing the name and the status of each user.
+        self.users = []
+
+        # Dictionary containing the bubble user of each displayed user, and the list of the unused bubble users.
+        self.rows = {}
+        self.free_rows = []
+
         # Define variables.
-        self.frm_options = None
-        self.current_event = None
+        self.style = None
+        self.command = None
+        self.row_height = None
 
-        # Create canvas contain the scrollbar frame.
+        # Create canvas contain the bubble users.
         self.canvas = tk.Canvas(self, highlightbackground=self.background, highlightthickness=1, bg=self.background, width=self.c_width, height=self.c_height)
         self.canvas.pack(side="left", fill="both", expand=True)
         
@@ -272,21 +669,13 @@ class ScrollableFrameOnUser(tk.Frame):
         self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
         self.scrollbar.pack(side="right", fill="y")
         
-        # Configure the scrollbar to the canvas.
-        self.canvas.config(yscrollcommand=self.scrollbar.set)
-        
-        # The main scrollable frame contain all messages.
-        self.frm_scrollable = tk.Frame(self.canvas, bg=self.background)
-        
-        # Update the value of scrollregion.
-        self.frm_scrollable.bind("<Configure>", lambda e: self.canvas.config(scrollregion=self.canvas.bbox("all")))
+        # Configure the scrollbar to the canvas, the visible users are displayed at each scrolling.
+        self.canvas.config(yscrollcommand=self.on_scroll)
+        self.canvas.bind("<Configure>", lambda e: self.render())
         
         # When mouse is over the frame, the user can scroll it with the mouse wheel.
-        self.frm_scrollable.bind("<Enter>", self.bound_mousewheel)
-        self.frm_scrollable.bind("<Leave>", self.unbound_mousewheel)
-
-        # Create a window at the top of the canvas where the messages will appear.
-        self.canvas.create_window(0, 0, window=self.frm_scrollable, anchor=("nw"), width=self.c_width)   
+        self.canvas.bind("<Enter>", self.bound_mousewheel)
+        self.canvas.bind("<Leave>", self.unbound_mousewheel)
         
     def bound_mousewheel(self, event):
         """
@@ -303,40 +692,91 @@ class ScrollableFrameOnUser(tk.Frame):
         """Method used to scroll with mouse wheel."""
         self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
 
-    def display_user(self, user_name:str, bg_color, font_color, user_status="client"):
+    def on_scroll(self, first, last):
+        """Move the scrollbar and display the users who have become visible."""
+        self.scrollbar.set(first, last)
+        self.render()
+
+    def update_users(self, online_users:list, bg_color, font_color, owner:str=None, command=None):
         """
-        Create a new bubble message in the online user frame.
+        Display the new list of online users. Only the users who have joined or left the server are changed.
         
         Args:
-            - user_name (str): The name of the user.
-            - bg_color: The background color of the bubble message.
+            - online_users (list): The names of the online users.
+            - bg_color: The background color of the bubble users.
             - font_color: The font color.
-            - user_status (str): The status of the user (moderator or client).
+            - owner (str): The name of the server owner, displayed first as moderator.
+            - command: Function called with the name of the user when a bubble user is clicked.
         """
-        bubble_user = tk.Text(self.frm_scrollable, font=("Courier 11"), bg=bg_color, fg=font_color, relief="flat", height=1)
-
-        # Crown icon next
-        try:
-            if user_status == "moderator":
-                self.crown_img = tk.PhotoImage(file="application/icon/crown.png")
-                bubble_user.image_create("end", image=self.crown_img)
-            
-            else:
-                self.client_img = tk.PhotoImage(file="application/icon/client.png")
-                bubble_user.image_create("end", image=self.client_img)
-
-        except tk.TclError:
-            pass
-
-        # Insert the name of user.
-        bubble_user.insert("end", " " + user_name)
-
-        # Disables the text to not modify it.
-        bubble_user.config(state="disabled")
-        bubble_user.pack(fill="x", expand=True, padx=5, pady=5)
-        
-        # Move the scrollbar to bottom of frame.
-        self.after(30, lambda: self.canvas.yview_moveto(1))
+        # All bubble users are changed if the colors or the command are different.
+        if (bg_color, font_color) != self.style or command != self.command:
+            self.style = (bg_color, font_color)
+            self.command = command
+            self.clear_rows()
+
+        self.users = [(owner, "moderator")] if owner is not None else []
+        self.users.extend((user_name, "client") for user_name in online_users)
+
+        # The height of a bubble user is measured the first time.
+        if self.row_height is None:
+            self.measure_rows()
+
+        self.canvas.config(scrollregion=(0, 0, self.c_width, len(self.users) * self.row_height))
+        self.render()
+
+    def measure_rows(self):
+        """Measure the height of a bubble user, with the space between the users."""
+        row = self.get_row()
+        row.show("-", "client", self.background, self.background)
+        row.update_idletasks()
+
+        self.row_height = row.winfo_reqheight() + 10
+        self.free_rows.append(row)
+
+    def get_row(self):
+        """Returns an unused bubble user, a new one is created only if there is none."""
+        if self.free_rows:
+            return self.free_rows.pop()
+
+        return UserRow(self.canvas, self.c_width - 10)
+
+    def hide_row(self, user_name:str):
+        """Hide the bubble user of a user and keep it to be reused."""
+        row = self.rows.pop(user_name)
+        self.canvas.itemconfigure(row.item, state="hidden")
+        self.free_rows.append(row)
+
+    def clear_rows(self):
+        """Hide all bubble users."""
+        for user_name in list(self.rows):
+            self.hide_row(user_name)
+
+    def render(self):
+        """Display the visible users with the bubble users, the bubble users of the users still visible are only moved."""
+        if self.row_height is None:
+            return
+
+        # Get the visible users.
+        top = self.canvas.canvasy(0)
+        first = max(int(top // self.row_height), 0)
+        last = min(int((top + self.canvas.winfo_height()) // self.row_height) + 1, len(self.users))
+        visible_users = {user_name: index for index, (user_name, __) in enumerate(self.users[first:last], first)}
+
+        # Hide the bubble users of the users who have left or are no longer visible.
+        for user_name in list(self.rows):
+            if user_name not in visible_users:
+                self.hide_row(user_name)
+
+        for user_name, index in visible_users.items():
+            row = self.rows.get(user_name)
+
+            # Display the users who have become visible.
+            if row is None:
+                row = self.rows[user_name] = self.get_row()
+                row.show(user_name, self.users[index][1], *self.style, self.command)
+                self.canvas.itemconfigure(row.item, state="normal")
+
+            self.canvas.coords(row.item, 5, index * self.row_height + 5)
 
 
 class ScrollableFrame(tk.Frame):
@@ -0,0 +1,577 @@
+"""
+Description:
+    Class used to link several servers, so that the users connected to different servers share one room.
+    The servers are linked by persistent TCP relay links. A server dials the peers given to it,
+    and accepts the links of the other servers on its own port: the first frame tells a link from a client.
+
+    Each server is a node with a random ID. Each message has an ID made of the node which has created it
+    and a number. A message is sent once to each node linked, with the list of the nodes which have already
+    received it, and a node ignores the messages already seen, so a message never loops between the servers.
+
+    Each node sends the list of its users with a version number, again regularly, and the lists of the other nodes
+    are merged in the list of online users. The list of a node is forgotten when the link it came from is lost,
+    or when the node has not sent it again in time.
+
+    A private message to a user of another node is sent only towards this node, through the link
+    its list of users came from, and each node on the way sends it further in the same way.
+
+    The links are dialed in threads, then all their frames are read and sent by the thread of the server.
+
+    The servers linked must have the same password. A server which opens a link proves that it knows the password
+    with a key derived from it, the password itself is not kept.
+
+Packages:
+    - collections
+    - pickle
+    - queue
+    - secrets
+    - socket
+    - threading
+    - time
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+from collections import deque
+import pickle
+import queue
+import secrets
+import socket
+import threading
+import time
+
+from catalog import LINK_FAILED
+from passwords import derive_link_key, sign_link, verify_link
+from protocol import MAX_FRAME_SIZE, FrameReader, pack_object, receive_frame
+
+# Number of IDs of messages remembered to ignore the messages already received.
+SEEN_SIZE = 10000
+
+# Maximum time in seconds to open a link, and delay before dialing again a peer whose link is lost.
+LINK_TIMEOUT = 5.0
+LINK_RETRY_DELAY = 2.0
+
+# Time in seconds between two lists of users sent by a node, and time after which the list of a node is forgotten.
+PRESENCE_INTERVAL = 10.0
+PRESENCE_TIMEOUT = 35.0
+
+# Types of the arguments of each frame relayed, checked before reading them.
+RELAY_FRAMES = {"Relay Message": (str, int, list, str, object),
+                "Relay Users": (str, int, list, list),
+                "Relay Private": (str, list, str, str, str)}
+
+
+def parse_address(address:str):
+    """
+    Read the address of a peer server.
+
+    Arg:
+        - address (str): The address in the form "IP:port".
+
+    Returns a tuple containing the IP address and the port.
+
+    Raises ValueError if the address is incorrect.
+    """
+    host, __, port = address.rpartition(":")
+
+    if not host:
+        raise ValueError(f"The address {address} is not in the form IP:port.")
+
+    return host, int(port)
+
+
+def is_valid_relay(content):
+    """
+    Check a frame received from a link before reading its arguments.
+
+    Arg:
+        - content: The content of the frame.
+
+    Returns true if the frame has the arguments of its type, or if its type is unknown (sent by a newer node).
+    """
+    if not isinstance(content, list) or not content or not isinstance(content[0], str):
+        return False
+
+    types = RELAY_FRAMES.get(content[0])
+
+    if types is None:
+        return True
+
+    if len(content) != len(types) + 1 or not all(isinstance(arg, kind) for arg, kind in zip(content[1:], types)):
+        return False
+
+    # The names of the users are compared as texts.
+    return content[0] != "Relay Users" or all(isinstance(name, str) for name in content[4])
+
+
+class Federation:
+    """
+    Manage the relay links of a server with the other servers.
+
+    Arg:
+        - password (str): The password of the server, the servers linked must have the same password.
+    """
+    def __init__(self, password:str):
+        self.node_id = secrets.token_hex(8)
+        self.set_password(password)
+
+        # Dictionary containing the ID of the node, the frame reader and the address dialed of each link, by connection.
+        self.links = {}
+
+        # Queue of the links opened by the dialing threads, added to the links by the thread of the server.
+        self.new_links = queue.Queue()
+
+        # Dictionary containing the event set when the link is lost, by address of peer dialed.
+        self.peers = {}
+
+        # Number of the last message created by this node, and the IDs of the last messages received.
+        self.number = 0
+        self.seen = set()
+        self.seen_order = deque()
+
+        # Dictionary containing the version, the users, the link and the time of reception of the list of users, by node.
+        self.presence = {}
+
+        # Version and time of the last list of users sent by this node.
+        self.users = []
+        self.version = 0
+        self.presence_time = 0
+
+        # Event set when the federation is closed, to stop the dialing threads.
+        self.stopped = threading.Event()
+
+    def set_password(self, password:str):
+        """
+        Replace the password of the server. The links already opened are kept.
+
+        Arg:
+            - password (str): The new password.
+        """
+        self.link_key = derive_link_key(password)
+
+    def add_peer(self, address:str):
+        """
+        Start dialing a peer server. The link is opened again when it is lost.
+
+        Arg:
+            - address (str): The address of the peer, in the form "IP:port".
+
+        Raises ValueError if the address is incorrect.
+        """
+        host, port = parse_address(address)
+
+        if (host, port) in self.peers:
+            return
+
+        self.peers[(host, port)] = threading.Event()
+
+        trd_dial = threading.Thread(target=self.dial_loop, args=((host, port),), daemon=True)
+        trd_dial.start()
+
+    def dial_loop(self, address:tuple):
+        """
+        Open the link with a peer, and open it again each time it is lost, until the federation is closed.
+        This method is executed in the dialing thread of the peer.
+
+        Arg:
+            - address (tuple): The IP address and the port of the peer.
+        """
+        lost = self.peers[address]
+
+        while not self.stopped.is_set():
+            try:
+                connection = socket.create_connection(address, timeout=LINK_TIMEOUT)
+
+                # The peer checks the proof of the password before accepting the link.
+                reader = FrameReader()
+                connection.sendall(pack_object({"Node_Id":self.node_id, "Link_Proof":sign_link(self.link_key, self.node_id)}))
+                __, answer = receive_frame(connection, reader)
+                connection.settimeout(None)
+
+                if answer[0] == "link accepted":
+                    # The link is added by the thread of the server, then the thread waits until it is lost.
+                    lost.clear()
+                    self.new_links.put((connection, reader, answer[1], address))
+                    lost.wait()
+
+                else:
+                    print(f"The link with {address[0]}:{address[1]} has been refused: {answer[1]}")
+                    connection.close()
+
+            # The peer is not launched, or it has closed the link during the opening.
+            except (OSError, ValueError):
+                pass
+
+            self.stopped.wait(LINK_RETRY_DELAY)
+
+    def connections(self):
+        """Returns the list of the connections of the links."""
+        return list(self.links)
+
+    def accept_link(self, connection, reader:FrameReader, data_link:dict):
+        """
+        Accept the link opened by another server, if it has the same password.
+
+        Args:
+            - connection : The connection of the link.
+            - reader (FrameReader): The reader of the connection.
+            - data_link (dict): The first frame sent by the other server.
+
+        Returns the list of the events of the frames already received, see receive.
+        """
+        if data_link["Node_Id"] == self.node_id:
+            reason = "same node"
+
+        elif not verify_link(self.link_key, data_link["Node_Id"], data_link.get("Link_Proof")):
+            reason = "password"
+
+        else:
+            connection.sendall(pack_object(["link accepted", self.node_id]))
+            return self.open_link(connection, reader, data_link["Node_Id"], None)
+
+        connection.sendall(pack_object(["link refused", reason]))
+        connection.close()
+        return []
+
+    def add_links(self):
+        """
+        Add the links opened by the dialing threads.
+
+        Returns the list of the events of the frames already received, see receive.
+        """
+        events = []
+
+        while True:
+            try:
+                connection, reader, node_id, address = self.new_links.get_nowait()
+
+            except queue.Empty:
+                return events
+
+            events += self.open_link(connection, reader, node_id, address)
+
+    def open_link(self, connection, reader:FrameReader, node_id:str, address:tuple):
+        """
+        Add a link and send it the lists of users known by this node.
+
+        Args:
+            - connection : The connection of the link.
+            - reader (FrameReader): The reader of the connection.
+            - node_id (str): The ID of the node linked.
+            - address (tuple): The address dialed, None if the link has been opened by the other node.
+
+        Returns the list of the events of the frames already received, see receive.
+        """
+        # The link can now send longer frames than its first one.
+        reader.max_size = MAX_FRAME_SIZE
+        self.links[connection] = {"Node":node_id, "Reader":reader, "Address":address}
+
+        try:
+            connection.sendall(pack_object(["Relay Users", self.node_id, self.version, [self.node_id], self.users]))
+
+            for node_id, presence in self.presence.items():
+                if presence["Link"] != connection:
+                    connection.sendall(pack_object(["Relay Users", node_id, presence["Version"], [self.node_id],
+                                                    presence["Users"]]))
+
+        except OSError:
+            return self.close_link(connection)
+
+        return self.read_frames(connection)
+
+    def receive(self, connection):
+        """
+        Receive the frames of a link. The link is closed if it is lost or if it sends an incorrect frame.
+
+        Arg:
+            - connection : The connection of the link.
+
+        Returns a list of events: ["Message", name, message] for each new message,
+        ["Private", name, recipient, message] for each private message to a user of this node,
+        ["Update User"] when the users of the other nodes have changed,
+        and ["Error", message] when the link is closed after an incorrect frame.
+        """
+        try:
+            if self.links[connection]["Reader"].recv_into(connection) == 0:
+                return self.close_link(connection)
+
+        except OSError:
+            return self.close_link(connection)
+
+        return self.read_frames(connection)
+
+    def read_frames(self, connection):
+        """
+        Handle the frames received from a link.
+
+        Arg:
+            - connection : The connection of the link.
+
+        Returns the list of the events, see receive.
+        """
+        events = []
+        reader = self.links[connection]["Reader"]
+
+        try:
+            while True:
+                frame = reader.next_frame()
+
+                if frame is None:
+                    return events
+
+                __, content = frame
+
+                if not is_valid_relay(content):
+                    raise ValueError("The frame relayed is incorrect.")
+
+                if content[0] == "Relay Message":
+                    events += self.receive_message(connection, *content[1:])
+
+                elif content[0] == "Relay Users":
+                    events += self.receive_users(connection, *content[1:])
+
+                elif content[0] == "Relay Private":
+                    events += self.receive_private(connection, *content[1:])
+
+        # The other node has sent an incorrect frame, only its link is closed.
+        except (ValueError, TypeError, IndexError, KeyError, AttributeError, pickle.UnpicklingError) as e:
+            return events + [["Error", (LINK_FAILED, str(e))]] + self.close_link(connection)
+
+    def receive_message(self, connection, origin:str, number:int, seen_by:list, name:str, message):
+        """
+        Handle a message received from a link, and send it to the other nodes which have not received it.
+
+        Args:
+            - connection : The connection of the link.
+            - origin (str): The ID of the node which has created the message.
+            - number (int): The number of the message in its node.
+            - seen_by (list): The IDs of the nodes which have already received the message.
+            - name (str): The name of the author.
+            - message : The message.
+
+        Returns the list of the events, empty if the message has already been received.
+        """
+        message_id = (origin, number)
+
+        if origin == self.node_id or message_id in self.seen:
+            return []
+
+        # Remember the message, the oldest IDs are forgotten.
+        self.seen.add(message_id)
+        self.seen_order.append(message_id)
+
+        if len(self.seen_order) > SEEN_SIZE:
+            self.seen.discard(self.seen_order.popleft())
+
+        self.flood(["Relay Message", origin, number], seen_by, [name, message])
+        return [["Message", name, message]]
+
+    def receive_users(self, connection, origin:str, version:int, seen_by:list, users:list):
+        """
+        Handle the list of users of a node, and send it to the other nodes which have not received it.
+
+        Args:
+            - connection : The connection of the link.
+            - origin (str): The ID of the node of the users.
+            - version (int): The version of the list, a newer list has a higher version.
+            - seen_by (list): The IDs of the nodes which have already received the list.
+            - users (list): The names of the users of the node.
+
+        Returns the list of the events, empty if the list is already known.
+        """
+        presence = self.presence.get(origin)
+
+        if origin == self.node_id or (presence is not None and presence["Version"] >= version):
+            return []
+
+        self.presence[origin] = {"Version":version, "Users":users, "Link":connection, "Time":time.monotonic()}
+        self.flood(["Relay Users", origin, version], seen_by, [users])
+
+        # The list of users is not changed when the node sends it again.
+        if presence is not None and presence["Users"] == users:
+            return []
+
+        return [["Update User"]]
+
+    def receive_private(self, connection, target:str, path:list, name:str, recipient:str, message:str):
+        """
+        Handle a private message received from a link, and send it further if it is for the user of another node.
+
+        Args:
+            - connection : The connection of the link.
+            - target (str): The ID of the node of the recipient.
+            - path (list): The IDs of the nodes which have already sent the message, from the node of the author.
+            - name (str): The name of the author.
+            - recipient (str): The name of the user who receives the message.
+            - message (str): The message.
+
+        Returns the list of the events.
+        """
+        if target == self.node_id:
+            return [["Private", name, recipient, message]]
+
+        # The message is dropped if it comes back to a node, while the lists of users are changing.
+        if self.node_id not in path:
+            self.route(target, ["Relay Private", target, path + [self.node_id], name, recipient, message])
+
+        return []
+
+    def route(self, target:str, content:list):
+        """
+        Send a frame towards a node, through the link its list of users came from.
+
+        Args:
+            - target (str): The ID of the node.
+            - content (list): The frame.
+
+        Returns false if no link leads to the node.
+        """
+        presence = self.presence.get(target)
+
+        if presence is None or presence["Link"] not in self.links:
+            return False
+
+        try:
+            presence["Link"].sendall(pack_object(content))
+
+        # The lost link is closed when it is read.
+        except OSError:
+            pass
+
+        return True
+
+    def flood(self, header:list, seen_by:list, content:list):
+        """
+        Send a frame to each node linked which has not already received it, with only one link per node.
+        The nodes sent are added to the list of nodes, so that they don't send the frame to each other.
+
+        Args:
+            - header (list): The beginning of the frame: the type, the origin node and the number or the version.
+            - seen_by (list): The IDs of the nodes which have already received the frame.
+            - content (list): The end of the frame.
+        """
+        targets = {}
+
+        for connection, link in self.links.items():
+            if link["Node"] not in seen_by:
+                targets.setdefault(link["Node"], connection)
+
+        if not targets:
+            return
+
+        seen_by = list(set(seen_by) | set(targets) | {self.node_id})
+        frame = pack_object(header + [seen_by] + content)
+
+        for connection in targets.values():
+            try:
+                connection.sendall(frame)
+
+            # The lost link is closed when it is read.
+            except OSError:
+                pass
+
+    def send_message(self, name:str, message):
+        """
+        Send a message created on this node to the other nodes.
+
+        Args:
+            - name (str): The name of the author.
+            - message : The message.
+        """
+        self.number += 1
+        self.flood(["Relay Message", self.node_id, self.number], [self.node_id], [name, message])
+
+    def send_private(self, name:str, recipient:str, message:str):
+        """
+        Send a private message to a user of another node.
+
+        Args:
+            - name (str): The name of the author.
+            - recipient (str): The name of the user who receives the message.
+            - message (str): The message.
+
+        Returns false if the recipient is not a user of the other nodes.
+        """
+        for node_id, presence in self.presence.items():
+            if recipient.casefold() in (user.casefold() for user in presence["Users"]):
+                return self.route(node_id, ["Relay Private", node_id, [self.node_id], name, recipient, message])
+
+        return False
+
+    def set_users(self, users:list):
+        """
+        Send the users of this node to the other nodes, if they have changed.
+
+        Arg:
+            - users (list): The names of the users of this node.
+        """
+        if users == self.users:
+            return
+
+        self.users = list(users)
+        self.send_users()
+
+    def send_users(self):
+        """Send the users of this node to the other nodes, with a new version."""
+        self.version += 1
+        self.presence_time = time.monotonic()
+        self.flood(["Relay Users", self.node_id, self.version], [self.node_id], [self.users])
+
+    def refresh(self):
+        """
+        Add the links opened, send again the users of this node regularly, and forget the users of the nodes
+        which have not sent them again in time.
+
+        Returns the list of the events, see receive.
+        """
+        events = self.add_links()
+        now = time.monotonic()
+
+        if now - self.presence_time < PRESENCE_INTERVAL:
+            return events
+
+        self.send_users()
+
+        expired = [node_id for node_id, presence in self.presence.items() if now - presence["Time"] > PRESENCE_TIMEOUT]
+        for node_id in expired:
+            del self.presence[node_id]
+
+        return events + ([["Update User"]] if expired else [])
+
+    def remote_users(self):
+        """Returns the names of the users of the other nodes."""
+        return [name for presence in self.presence.values() for name in presence["Users"]]
+
+    def close_link(self, connection):
+        """
+        Close a link, and forget the users received from it. A link dialed by this node is opened again.
+
+        Arg:
+            - connection : The connection of the link.
+
+        Returns the list of the events, see receive.
+        """
+        link = self.links.pop(connection, None)
+        connection.close()
+
+        if link is not None and link["Address"] is not None:
+            self.peers[link["Address"]].set()
+
+        lost = [node_id for node_id, presence in self.presence.items() if presence["Link"] == connection]
+        for node_id in lost:
+            del self.presence[node_id]
+
+        return [["Update User"]] if lost else []
+
+    def close(self):
+        """Close all the links and stop dialing the peers."""
+        self.stopped.set()
+
+        for connection in list(self.links):
+            self.close_link(connection)
+
+        # Wake up the dialing threads waiting for the loss of their link.
+        for lost in self.peers.values():
+            lost.set()
@@ -9,15 +9,19 @@ Descrition:
     The application is developped with Python 3 and Windows 10. The GUI is create with Tkinter.
 
 Packages:
-    - threading
     - tkinter
     - ttkthemes
-    - pickle
+    - queue
+    - textwrap
+    - threading
+    - time
 
 Script File:
     - features : Creation of widgets classes used in the graphical user interface.
     - server : Launch and Manage server.
     - client : Create and connect a client to server.
+    - engine : Run the server or the client in a child process (option --process).
+    - cache : Keep the last messages of the conversations on the disk of the client.
 """
 
 __author__ = ("Manitas Bahri")
@@ -26,18 +30,21 @@ __date__ = "2020/05"
 
 try:
     # Import modules
-    from threading import Thread 
     import tkinter as tk
     import tkinter.ttk as ttk
-    from tkinter import messagebox
+    from tkinter import filedialog, messagebox
     from ttkthemes import ThemedStyle
-    import pickle
+    import queue
     import sys
+    import textwrap
+    import threading
+    import time
 
     # Import other python scripts.
+    # The server, the client and the cache are imported when they are used, so that the home menu is displayed faster.
     import features as ft
-    from server import Server
-    from client import Client
+    from catalog import NO_RESULTS, NOT_ONLINE, SEARCH, SYSTEM, localize
+    from pipeline import POOL_KINDS, MessagePipeline
 
 # Prevents errors when importing modules.
 except ImportError as e:
@@ -52,19 +59,36 @@ class MainController(tk.Tk):
     It is the main window of the application, it plays the role of manager.
     All page of the application are displayed in this window.
     It links the interface with the server or client script.
+
+    Arg:
+        - use_process (bool): If true the server or the client runs in a child process, else in a thread of the application.
     """
-    def __init__(self):
+    def __init__(self, use_process:bool=False):
         super().__init__()
+        self.use_process = use_process
+
         # List containing the data entered by the user to create or connect to server.
         self.data_server = []
         self.data_client = []
 
+        # Kind of pool and number of workers of the pipeline of the server.
+        self.pipeline_pool = "inline"
+        self.pipeline_workers = 4
+
         # Define variables
         self.current_page = None
+        self.style = None
         self.server = None
         self.client = None
         self.stop = False
 
+        # Thread connecting the client to the server, and the time when the connection has started.
+        self.connection_thread = None
+        self.connect_start = 0
+
+        # The cache of the messages is opened when the first conversation is displayed.
+        self.message_cache = None
+
         # Set the color themes of the application.
         self.current_color = 0
 
@@ -115,9 +139,13 @@ class MainController(tk.Tk):
         self.msg_font_color = ["#000000", "#000000"][self.current_color]
         self.border_color = ["#DDE3E9", "#2A2A2A"][self.current_color]
         
-        # Define the style.
-        self.style = ThemedStyle()
-        self.style.set_theme(self.name_theme)
+        # Define the style. The style is created once, the theme is loaded only when it changes.
+        if self.style is None:
+            self.style = ThemedStyle()
+
+        if self.style.theme_use() != self.name_theme:
+            self.style.set_theme(self.name_theme)
+
         self.style.configure("TLabel", foreground=self.font_color)
         self.style.configure("TButton", font=("Courier 11 bold"), foreground=self.font_color)
         self.style.configure("TNotebook", font=("Courier 9"), foreground=self.font_color)
@@ -136,7 +164,13 @@ class MainController(tk.Tk):
 
     def create_server(self):
         """Create a new server."""
-        self.server = Server(*self.data_server)
+        if self.use_process:
+            from engine import ServerProcess as Server
+
+        else:
+            from server import Server
+
+        self.server = Server(*self.data_server, MessagePipeline(self.pipeline_workers, self.pipeline_pool))
         
         # Create the server connection and report the connection status to inform the user.
         self.server.create_connection()
@@ -152,11 +186,39 @@ class MainController(tk.Tk):
             self.data_server = []
 
     def create_client(self):
-        """Create a new instance of a user."""
+        """Create a new instance of a user, and connect it to the server in another thread so that the window stays responsive."""
+        if self.use_process:
+            from engine import ClientProcess as Client
+
+        else:
+            from client import Client
+
         self.client = Client(*self.data_client)
+        self.connect_start = time.monotonic()
+
+        # Create connection and connect the client to server, the end of the connection is checked by check_client.
+        self.connection_thread = threading.Thread(target=self.client.create_connection, daemon=True)
+        self.connection_thread.start()
+
+    def is_connecting(self):
+        """Returns true while the client connects to the server."""
+        return self.connection_thread is not None and self.connection_thread.is_alive()
+
+    def cancel_client(self):
+        """Cancel the connection of the client to the server."""
+        if self.is_connecting():
+            self.client.cancel_connection()
+
+    def check_client(self):
+        """
+        Check if the connection of the client has ended, and informs the user of the connection status.
 
-        # Create connection and connect the client to server. And, informs him of the connection status.
-        self.client.create_connection()
+        Returns true when the connection has ended.
+        """
+        if self.is_connecting():
+            return False
+
+        self.connection_thread = None
         self.msg_report = self.client.msg_report[self.current_language]
 
         # If the server is correctly launched, change the page of the application.
@@ -168,6 +230,8 @@ class MainController(tk.Tk):
             self.client = None
             self.data_client = []
 
+        return True
+
     def go_home(self):
         """Close the connection with server and return to home menu."""
         # Close the connection.
@@ -195,10 +259,21 @@ class MainController(tk.Tk):
 
                 # Close the connection.
                 if exit:
-                    self.server.close_server()
+                    # Informs the user if the server has not stopped in time, the clients may not have been informed.
+                    if not self.server.stop():
+                        messagebox.showwarning("Online Chat", ["The server has not stopped in time.",
+                                                               "Le serveur ne s'est pas arrêté à temps."][self.current_language])
+
                     self.data_server = []
                     self.server = None
 
+            # If a client is connecting, the connection is cancelled.
+            elif self.is_connecting():
+                self.client.cancel_connection()
+                self.connection_thread = None
+                self.data_client = []
+                self.client = None
+
             # If a client exist.
             elif self.client:
                 exit = messagebox.askyesno(["Online Chat", "Quitter le serveur"][self.current_language], 
@@ -214,6 +289,11 @@ class MainController(tk.Tk):
             # Close the application.
             if exit and quit:
                 self.stop = True
+
+                # Write the last messages in the cache.
+                if self.message_cache:
+                    self.message_cache.close()
+
                 self.quit()
                 return True
 
@@ -296,9 +376,23 @@ class HomeMenu(tk.Frame):
         # Creation and positioning of all server_entries entries.
         [self.create_entry(*server_entries[i]).grid(row=i+1, column=0, pady=5) for i in range(len(server_entries))]
 
+        # Kind of pool of the pipeline and number of workers, inline by default.
+        frm_pipeline = tk.Frame(frm_server, bg=self.bg_color)
+        frm_pipeline.grid(row=6, column=0, sticky="w", pady=5)
+        ttk.Label(frm_pipeline, text="Pipeline :", font=self.controller.ft_footer, width=19).grid(column=0, row=0, sticky=tk.W)
+
+        self.select_pool = ttk.Combobox(frm_pipeline, values=POOL_KINDS, state="readonly", width=8, font=self.controller.ft_footer)
+        self.select_pool.current(POOL_KINDS.index(self.controller.pipeline_pool))
+        self.select_pool.grid(column=1, row=0, sticky=tk.W)
+
+        self.spn_workers = ttk.Spinbox(frm_pipeline, from_=1, to=64, width=4, font=self.controller.ft_footer)
+        self.spn_workers.set(self.controller.pipeline_workers)
+        self.spn_workers.grid(column=2, row=0, sticky=tk.W, padx=5)
+        ttk.Label(frm_pipeline, text=["workers", "workers"][self.lg], font=self.controller.ft_footer).grid(column=3, row=0, sticky=tk.W)
+
         # Create a button to launch the server.
         btn_launch_server = ttk.Button(frm_server, text=["Launch Server", "Démarrer le serveur"][self.lg], command=self.launch_server)
-        btn_launch_server.grid(row=6, column=0, sticky="wens", pady=5)
+        btn_launch_server.grid(row=7, column=0, sticky="wens", pady=5)
 
         # Client Part.
         # Frame for the client input fields.
@@ -316,9 +410,9 @@ class HomeMenu(tk.Frame):
         # Creation and positioning of all client_entries entries.
         [self.create_entry(*client_entries[i]).grid(row=i+1, column=0, pady=5) for i in range(len(client_entries))]
 
-        # Create a button to connect the client to a server.
-        btn_connect_client = ttk.Button(frm_client, text=["Search Server", "Rechercher un serveur"][self.lg], command=self.connect_client)
-        btn_connect_client.grid(row=5, column=0, sticky="wens", pady=5)
+        # Create a button to connect the client to a server, it cancels the connection while the client connects.
+        self.btn_connect_client = ttk.Button(frm_client, text=["Search Server", "Rechercher un serveur"][self.lg], command=self.connect_client)
+        self.btn_connect_client.grid(row=5, column=0, sticky="wens", pady=5)
 
         # Create text where all error will be print here to inform the user.
         self.bbl_report = ft.BubbleMessage(self, ["Message Box", "Messagerie"][self.lg], ["No Message...", "Pas de message..."][self.lg], 
@@ -326,6 +420,20 @@ class HomeMenu(tk.Frame):
         self.bbl_report.config(relief="flat", highlightbackground=self.border_color, highlightthickness=1)
         self.bbl_report.pack(fill="both", padx=35)
 
+        # The menu is reloaded while the client connects (language or theme changed), the progress is displayed again.
+        self.after_id = None
+
+        if self.controller.is_connecting():
+            self.btn_connect_client.config(text=["Cancel", "Annuler"][self.lg], command=self.controller.cancel_client)
+            self.wait_connection()
+
+    def destroy(self):
+        """Stop displaying the progress of the connection before destroying the menu."""
+        if self.after_id:
+            self.after_cancel(self.after_id)
+
+        super().destroy()
+
     def create_entry(self, frm_parent, text, name_obj, password=False):
         """
         Create a frame containing an entry and its associated label.
@@ -381,8 +489,18 @@ class HomeMenu(tk.Frame):
                                         "Le nom doit contenir moins de 20 caractères. Veuillez réessayer."][self.lg])
                 self.controller.data_server.clear()
 
+            # The pipeline needs at least one worker.
+            elif not self.spn_workers.get().isdigit() or int(self.spn_workers.get()) < 1:
+                self.bbl_report.modify(["System", "Système"][self.lg],
+                                       ["The number of workers must be a positive integer. Please try again.",
+                                        "Le nombre de workers doit être un entier positif. Veuillez réessayer."][self.lg])
+                self.controller.data_server.clear()
+
             # Launch the server.
             else:
+                self.controller.pipeline_pool = self.select_pool.get()
+                self.controller.pipeline_workers = int(self.spn_workers.get())
+
                 try:
                     self.controller.create_server()
                     self.bbl_report.modify(["System", "Système"][self.lg], self.controller.msg_report)
@@ -424,7 +542,9 @@ class HomeMenu(tk.Frame):
                 self.controller.data_client.clear()
 
             # Forbidden name.
-            elif self.user_name.get() in ("Update User", "Exit Server", "System", "Système"):
+            elif self.user_name.get() in ("Update User", "Exit Server", "Search Result", "Direct Message", 
+                                           "Direct Message Error", "File Upload", "File Refused", "File Ack", 
+                                           "File Offer", "File Cancel", "Typing", "System", "Système"):
                 self.bbl_report.modify(["System", "Système"][self.lg],
                                        ["Please change the username",
                                         "Veuillez changer le nom d'utilisateur"][self.lg])
@@ -433,7 +553,8 @@ class HomeMenu(tk.Frame):
             else:
                 try:
                     self.controller.create_client()
-                    self.bbl_report.modify(["System", "Système"][self.lg], self.controller.msg_report)
+                    self.btn_connect_client.config(text=["Cancel", "Annuler"][self.lg], command=self.controller.cancel_client)
+                    self.wait_connection()
 
                 # Prevents to error during the server execution.
                 except Exception as e:
@@ -448,6 +569,22 @@ class HomeMenu(tk.Frame):
                                    ["Please complete all entries in the client input field.", 
                                    "Veuillez remplir tous les champs de saisie du client."][self.lg])
 
+    def wait_connection(self):
+        """Display the progress of the connection of the client until it ends, without blocking the window."""
+        self.after_id = None
+
+        # The connection has ended, informs the user of the connection status.
+        if self.controller.check_client():
+            self.btn_connect_client.config(text=["Search Server", "Rechercher un serveur"][self.lg], command=self.connect_client)
+            self.bbl_report.modify(["System", "Système"][self.lg], self.controller.msg_report)
+            return
+
+        # Display the step of the connection and the time elapsed.
+        elapsed = time.monotonic() - self.controller.connect_start
+        self.bbl_report.modify(["System", "Système"][self.lg], f"{self.controller.client.connect_state[self.lg]} ({elapsed:.0f} s)")
+
+        self.after_id = self.after(100, self.wait_connection)
+
     def select_language(self, event):
         """Get the language select by the user and change all the texts."""
         # Get the language select.
@@ -513,10 +650,12 @@ class ServerMenu(tk.Frame):
         # Create tab of notebook.
         tab_server_info = tk.Frame(notebook, bg=self.bg_color)
         tab_on_user = tk.Frame(notebook, bg=self.bg_color)
+        tab_search = tk.Frame(notebook, bg=self.bg_color)
 
         # Add tab to notebook.
         notebook.add(tab_server_info, text=["Server Management", "Gestion du Serveur"][self.lg])        
         notebook.add(tab_on_user, text=["Online Users", "Utilisateurs Connectés"][self.lg])
+        notebook.add(tab_search, text=["Search", "Recherche"][self.lg])
 
         # Information Tab.
         # Create a scrollable frame where server information will be displayed.
@@ -564,7 +703,7 @@ class ServerMenu(tk.Frame):
         frm_dlt_user.pack(fill="x", padx=2, pady=2)
 
         # Subtitle.
-        tk.Label(frm_dlt_user, text=["Ban User", "Exclure un Utilisateur"][self.lg], bg=self.bg_color, font=("Courier 11"), fg=self.font_color).pack()
+        tk.Label(frm_dlt_user, text=["Exclude or Ban a User", "Exclure ou Bannir un Utilisateur"][self.lg], bg=self.bg_color, font=("Courier 11"), fg=self.font_color).pack()
 
         # Create a text to inform the user to modifing password.
         self.lbl_dlt_user = tk.Label(frm_dlt_user, text="...", bg=self.bg_color, fg=self.font_color, font=("Courier 9"), width=50, anchor="w")
@@ -574,14 +713,89 @@ class ServerMenu(tk.Frame):
         self.etr_dlt_user = ttk.Entry(frm_dlt_user, font=("Courier 11"))
         self.etr_dlt_user.pack(side="left")
 
-        # Create a button to ban user.
-        ttk.Button(frm_dlt_user, text=["Submit", "Exclure"][self.lg], command=self.delete_user).pack(side="left")
+        # Create the buttons to exclude the user, or to exclude him and ban his name and address.
+        ttk.Button(frm_dlt_user, text=["Exclude", "Exclure"][self.lg], command=self.delete_user).pack(side="left")
+        ttk.Button(frm_dlt_user, text=["Ban", "Bannir"][self.lg], command=lambda: self.delete_user(True)).pack(side="left")
+
+        ttk.Separator(self.frm_info.frm_scrollable, orient="horizontal").pack(fill="x", padx=2, pady=4)
+
+        # Create a frame for the banned addresses part.
+        frm_ban = tk.Frame(self.frm_info.frm_scrollable, bg=self.bg_color)
+        frm_ban.pack(fill="x", padx=2, pady=2)
+
+        # Subtitle.
+        tk.Label(frm_ban, text=["Ban an Address (IP or IP/mask)", "Bannir une Adresse (IP ou IP/masque)"][self.lg], bg=self.bg_color, font=("Courier 11"), fg=self.font_color).pack()
+
+        # Create a text to inform the user of the bans.
+        self.lbl_ban = tk.Label(frm_ban, text="...", bg=self.bg_color, fg=self.font_color, font=("Courier 9"), width=50, anchor="w")
+        self.lbl_ban.pack(side="bottom", anchor="w")
+
+        # Create an entry where the user enters the address or the network, or a name to unban.
+        self.etr_ban = ttk.Entry(frm_ban, font=("Courier 11"))
+        self.etr_ban.pack(side="left")
+
+        # Create the buttons to ban and unban.
+        ttk.Button(frm_ban, text=["Ban", "Bannir"][self.lg], command=self.ban_address).pack(side="left")
+        ttk.Button(frm_ban, text=["Unban", "Débannir"][self.lg], command=self.unban).pack(side="left")
+
+        ttk.Separator(self.frm_info.frm_scrollable, orient="horizontal").pack(fill="x", padx=2, pady=4)
+
+        # Create a frame for the banned words part.
+        frm_banned_words = tk.Frame(self.frm_info.frm_scrollable, bg=self.bg_color)
+        frm_banned_words.pack(fill="x", padx=2, pady=2)
+
+        # Subtitle.
+        tk.Label(frm_banned_words, text=["Banned Words", "Mots Interdits"][self.lg], bg=self.bg_color, font=("Courier 11"), fg=self.font_color).pack()
+
+        # Create a text to inform the user of the loading of the banned words.
+        self.lbl_banned_words = tk.Label(frm_banned_words, text="...", bg=self.bg_color, fg=self.font_color, font=("Courier 9"), width=50, anchor="w")
+        self.lbl_banned_words.pack(side="bottom", anchor="w")
+
+        # Create a button to load the file of banned words. The file can be reloaded at any time.
+        ttk.Button(frm_banned_words, text=["Load a file", "Charger un fichier"][self.lg], command=self.load_banned_words).pack(side="left")
+
+        ttk.Separator(self.frm_info.frm_scrollable, orient="horizontal").pack(fill="x", padx=2, pady=4)
+
+        # Create a frame for the linked servers part.
+        frm_peer = tk.Frame(self.frm_info.frm_scrollable, bg=self.bg_color)
+        frm_peer.pack(fill="x", padx=2, pady=2)
+
+        # Subtitle.
+        tk.Label(frm_peer, text=["Link a Server (IP:port)", "Relier un Serveur (IP:port)"][self.lg], bg=self.bg_color, font=("Courier 11"), fg=self.font_color).pack()
+
+        # Create a text to inform the user of the link with the other server.
+        self.lbl_peer = tk.Label(frm_peer, text="...", bg=self.bg_color, fg=self.font_color, font=("Courier 9"), width=50, anchor="w")
+        self.lbl_peer.pack(side="bottom", anchor="w")
+
+        # Create an entry where the user enters the address of the other server, it must have the same password.
+        self.etr_peer = ttk.Entry(frm_peer, font=("Courier 11"))
+        self.etr_peer.pack(side="left")
+
+        # Create a button to link the servers.
+        ttk.Button(frm_peer, text=["Submit", "Relier"][self.lg], command=self.add_peer).pack(side="left")
 
         # Online User Tab.
         # Create a scrollable frame where online users will be displayed.
         self.frm_on_user = ft.ScrollableFrameOnUser(tab_on_user, c_width=300, c_height=325, bg=self.canvas_color)
         self.frm_on_user.pack()
 
+        # Search Tab.
+        # Create a frame for the search entry and button.
+        frm_search = tk.Frame(tab_search, bg=self.bg_color)
+        frm_search.pack(fill="x", padx=2, pady=2)
+
+        # Create an entry where the user enters the words to search, with the filters "from:name", "after:date" and "before:date".
+        self.etr_search = ttk.Entry(frm_search, font=("Courier 11"))
+        self.etr_search.pack(side="left", expand=True, fill="x")
+        self.etr_search.bind("<Return>", lambda event: self.search_messages())
+
+        # Create a button to search messages.
+        ttk.Button(frm_search, text=["Search", "Chercher"][self.lg], command=self.search_messages).pack(side="left")
+
+        # Create a scrollable frame where the messages found will be displayed.
+        self.frm_search = ft.ScrollableFrame(tab_search, c_width=300, c_height=295, bg=self.canvas_color)
+        self.frm_search.pack()
+
         # Create a button to return to home page.
         ttk.Button(self.frm_right, text=["Return to home page", "Retourner à la page d'accueil"][self.lg],
                    command=self.controller.go_home).pack(fill="x", pady=15)
@@ -591,6 +805,13 @@ class ServerMenu(tk.Frame):
         frm_txtbox = tk.Frame(self.frm_right, bg=self.bg_color)
         frm_txtbox.pack(fill="both")
 
+        # Create a text displaying the recipient of the private messages, click on it to send to all users again.
+        self.recipient = None
+        self.lbl_recipient = ft.TextButton(frm_txtbox, hover_color="#FFBEBE", command=lambda: self.select_recipient(None),
+                                           font=("Courier 9"), bg=self.bg_color, fg=self.font_color, anchor="w")
+        self.lbl_recipient.pack(side="top", fill="x")
+        self.select_recipient(None)
+
         # Create vertical scrollbar attached to text box.
         vbar_txtbox = ttk.Scrollbar(frm_txtbox)
         vbar_txtbox.pack(side="right", fill="y")
@@ -605,58 +826,128 @@ class ServerMenu(tk.Frame):
         # Create a button to send a message.
         ttk.Button(frm_txtbox, text=["Send", "Envoyer"][self.lg], command=self.send_message).pack(side="bottom", anchor="e", pady=3)
 
-        # Create a thread in parallel to the menu creation.  
-        trd_main = Thread(target=self.main)
-        trd_main.start()
+        # Start the server in another thread, its events are displayed by the GUI thread.
+        self.after_id = None
+        self.controller.server.start()
+        self.process_events()
 
-    def main(self):
-        """Main method used to update client connections, displaying online users and receive messages."""
-        try:
-            while not self.controller.stop:
-                # Accept client in server. Then, manage the reception and the messages sending to other clients.
-                self.controller.server.main()
-
-                # Manage the display of online users in the server.
-                # Check if a user update request has been asked.
-                if self.controller.server.updt_user:
-                    # Delete all widgets in the "Online User Tab".
-                    for user in self.frm_on_user.frm_scrollable.winfo_children():
-                        user.destroy()
-
-                    # Add a widget for the name of the server owner.
-                    self.frm_on_user.display_user(self.controller.data_server[1], self.bg_color, self.font_color, "moderator")
-
-                    # Create new widget for each online user.
-                    for online_user in range(len(self.controller.server.data_online_client["User_Name"])):
-                        self.frm_on_user.display_user(self.controller.server.data_online_client["User_Name"][online_user], 
-                                                    self.bg_color, self.font_color)
-                    
-                    # The user's update request is complete.
-                    self.controller.server.updt_user = False
-
-                # Manage the display of received messages.
-                # Check for new message.
-                if self.controller.server.new_msg:
-                    # Decrypt the message.
-                    msg_rcv = pickle.loads(self.controller.server.data_msg_send)
-
-                    # Translation for the message.
-                    # Check if the message is a simple str or if it contains a list of multiple translations.
-                    if isinstance(msg_rcv[0], list):
-                        msg_rcv[0] = msg_rcv[0][self.lg]
-
-                    if isinstance(msg_rcv[1], list):
-                        msg_rcv[1] = msg_rcv[1][self.lg]
-
-                    # Create new widget fot the message.
-                    self.frm_scroll_msg.display_message(msg_rcv[0], msg_rcv[1], self.msg_other_color, self.border_color, self.msg_font_color)
-
-                    # The message is displayed.
-                    self.controller.server.new_msg = False
-
-        # Avoid an error when the user return to home because the loop has been stopped.
-        except AttributeError:
-            pass
+    def process_events(self, batch_size:int=200):
+        """
+        Display the events sent by the server (messages, online users and results of the commands).
+        The events are taken by batch from the queue, then the method is called again a few milliseconds later.
+
+        Arg:
+            - batch_size (int): The maximum number of events displayed at each call.
+        """
+        server = self.controller.server
+
+        # The server has been closed by the user.
+        if server is None:
+            return
+
+        online_users = None
+
+        # List of the messages received, displayed together at the end.
+        batch = []
+
+        for __ in range(batch_size):
+            try:
+                event = server.events.get_nowait()
+
+            except queue.Empty:
+                break
+
+            # Only the last list of online users is displayed.
+            if event[0] == "Update User":
+                online_users = event[1]
+
+            # Display the received messages.
+            elif event[0] == "Message":
+                # Translation for the message.
+                # The system messages are displayed with the template of the language.
+                author = localize(event[1], self.lg)
+                message = localize(event[2], self.lg)
+
+                batch.append((author, message, self.msg_other_color, self.border_color, self.msg_font_color))
+
+            # Display the errors of the server as system messages.
+            elif event[0] == "Error":
+                batch.append((localize((SYSTEM,), self.lg), localize(event[1], self.lg),
+                              self.msg_other_color, self.border_color, self.msg_font_color))
+
+            # Display the message of the owner once sent.
+            elif event[0] == "Message Sent":
+                __, msg_send, recipient, is_sent = event
+
+                if is_sent:
+                    title = self.controller.data_server[1] + (f" > {recipient}" if recipient else "")
+                    batch.append((title, msg_send, self.bg_color, self.border_color, self.font_color))
+
+                # Informs the user that the recipient has left the server.
+                else:
+                    batch.append((localize((SYSTEM,), self.lg), localize((NOT_ONLINE, recipient), self.lg),
+                                  self.msg_other_color, self.border_color, self.msg_font_color))
+
+            elif event[0] == "User Deleted":
+                # Informs the user than the user has been correctly excluded or banned.
+                if event[2] and event[3]:
+                    self.lbl_dlt_user["text"] = ["The user has been banned.", "L'utilisateur a été banni."][self.lg]
+
+                elif event[2]:
+                    self.lbl_dlt_user["text"] = ["The user has been excluded.", "L'utilisateur a été exclu."][self.lg]
+
+                # Informs the user if no user with this name has been found on the server.
+                else:
+                    self.lbl_dlt_user["text"] = ["No user with this name was found.", 
+                                                 "Aucun utilisateur n'a été trouvé."][self.lg]
+
+            elif event[0] == "Search Result":
+                self.display_results(event[1])
+
+            # Informs the user of the number of banned words loaded.
+            elif event[0] == "Banned Words":
+                self.lbl_banned_words["text"] = [f"{event[1]} banned words have been loaded.",
+                                                 f"{event[1]} mots interdits ont été chargés."][self.lg]
+
+            # Informs the user if the address of the other server is incorrect.
+            elif event[0] == "Address Banned":
+                if event[2]:
+                    self.lbl_ban["text"] = [f"{event[1]} has been banned.", f"{event[1]} a été banni."][self.lg]
+
+                else:
+                    self.lbl_ban["text"] = ["The address must be an IP or IP/mask.", "L'adresse doit être une IP ou IP/masque."][self.lg]
+
+            elif event[0] == "Unbanned":
+                if event[2]:
+                    self.lbl_ban["text"] = [f"{event[1]} is no longer banned.", f"{event[1]} n'est plus banni."][self.lg]
+
+                else:
+                    self.lbl_ban["text"] = [f"{event[1]} was not banned.", f"{event[1]} n'était pas banni."][self.lg]
+
+            elif event[0] == "Peer Added":
+                if event[2]:
+                    self.lbl_peer["text"] = [f"The server {event[1]} will be linked.", f"Le serveur {event[1]} va être relié."][self.lg]
+
+                else:
+                    self.lbl_peer["text"] = ["The address must be in the form IP:port.", "L'adresse doit être de la forme IP:port."][self.lg]
+
+        # Display all the messages with a single layout of the message box.
+        self.frm_scroll_msg.display_messages(batch)
+
+        # Manage the display of online users in the server, with the name of the server owner first.
+        # Click on a user to send him a private message.
+        if online_users is not None:
+            self.frm_on_user.update_users(online_users, self.bg_color, self.font_color, self.controller.data_server[1],
+                                          command=self.select_recipient)
+
+        self.after_id = self.after(50, self.process_events)
+
+    def destroy(self):
+        """Stop displaying the events before destroying the menu."""
+        if self.after_id:
+            self.after_cancel(self.after_id)
+
+        super().destroy()
 
     def send_message(self):
         """Manage the sending and displaying of the message."""
@@ -666,15 +957,31 @@ class ServerMenu(tk.Frame):
 
         # Check if the message is blank.
         if msg_send != "\n":
-            # Send the message. 
-            self.controller.server.send_message(msg_send)
-
-            # Display the message.
-            self.after(20, self.frm_scroll_msg.display_message(self.controller.data_server[1], msg_send, self.bg_color, self.border_color, self.font_color))
+            # Send the message, it is displayed when the server has sent it.
+            self.controller.server.commands.put(["Send Message", msg_send, self.recipient])
 
         # Cleans up the user text box.
         self.txtbox.delete("1.0", "end")
 
+    def select_recipient(self, user_name):
+        """
+        Select the user who receives the private messages.
+
+        Arg:
+            - user_name (str): The name of the recipient, None to send the messages to all users.
+        """
+        # The user can't send a private message to himself.
+        if user_name == self.controller.data_server[1]:
+            return
+
+        self.recipient = user_name
+
+        if user_name:
+            self.lbl_recipient["text"] = [f"To : {user_name} (click to cancel)", f"À : {user_name} (cliquez pour annuler)"][self.lg]
+
+        else:
+            self.lbl_recipient["text"] = ["To : everyone", "À : tout le monde"][self.lg]
+
     def change_password(self):
         """Change the server password."""
         # Get the new password entered by the user.
@@ -682,7 +989,7 @@ class ServerMenu(tk.Frame):
 
         # The password can't be null.
         if len(new_password) > 0:
-            self.controller.server.password = new_password
+            self.controller.server.commands.put(["Change Password", new_password])
         
             # Clean up the entry.
             self.etr_new_password.delete(0, "end")
@@ -692,20 +999,80 @@ class ServerMenu(tk.Frame):
         else:
             self.lbl_new_pass["text"] = ["The password can't be null.", "Le mots de passe ne peut pas être vide."][self.lg]
 
-    def delete_user(self):
-        """Ban user from the server."""
+    def delete_user(self, ban:bool=False):
+        """
+        Exclude a user from the server. The result is displayed when the server has executed the command.
+
+        Arg:
+            - ban (bool): If true the name and the IP address of the user are also banned.
+        """
+        # Get the name of user who will be excluded.
+        self.controller.server.commands.put(["Delete User", self.etr_dlt_user.get(), ban])
+        # Clean up the entry.
+        self.etr_dlt_user.delete(0, "end")
+
+    def ban_address(self):
+        """Ban an IP address or a network, the result is displayed when the server has executed the command."""
+        self.controller.server.commands.put(["Ban Address", self.etr_ban.get()])
+        # Clean up the entry.
+        self.etr_ban.delete(0, "end")
+
+    def unban(self):
+        """Remove an address, a network or a name from the bans."""
+        self.controller.server.commands.put(["Unban", self.etr_ban.get()])
+        # Clean up the entry.
+        self.etr_ban.delete(0, "end")
+
+    def add_peer(self):
+        """Link the server with another server, the users of both servers share the same room."""
+        self.controller.server.commands.put(["Add Peer", self.etr_peer.get()])
+        # Clean up the entry.
+        self.etr_peer.delete(0, "end")
+
+    def search_messages(self):
+        """Search the old messages matching the words entered by the user, the results are displayed when received."""
+        self.controller.server.commands.put(["Search", self.etr_search.get(), 50])
+
+    def display_results(self, results:list):
+        """
+        Display the messages found by a search.
+
+        Arg:
+            - results (list): The ID, the author, the time and the text of each message found.
+        """
+        # Delete the results of the previous search.
+        for widget in self.frm_search.frm_scrollable.winfo_children():
+            widget.destroy()
+
+        if not results:
+            tk.Label(self.frm_search.frm_scrollable, text=localize((NO_RESULTS,), self.lg),
+                     bg=self.canvas_color, fg=self.font_color, font=("Courier 9")).pack(anchor="w", padx=2, pady=2)
+
+        # Create a label for each message found.
+        for __, author, timestamp, text in results:
+            txt_title = "%s, %s" % (author, time.strftime("%d/%m %H:%M", time.localtime(timestamp)))
+            tk.Label(self.frm_search.frm_scrollable, text=txt_title, bg=self.canvas_color, fg=self.font_color, 
+                     font=("Courier 9 bold")).pack(anchor="w", padx=2)
+            tk.Label(self.frm_search.frm_scrollable, text=textwrap.fill(text, 38), bg=self.canvas_color, fg=self.font_color,
+                     font=("Courier 9"), justify="left").pack(anchor="w", padx=2, pady=(0, 4))
+
+    def load_banned_words(self):
+        """Load a file containing a banned word per line, and mask these words in the messages of the clients."""
+        path = filedialog.askopenfilename(title=["Banned Words", "Mots Interdits"][self.lg],
+                                          filetypes=[("Text", "*.txt"), ("All", "*.*")])
+
+        # The user has closed the dialog without choosing a file.
+        if not path:
+            return
+
         try:
-            # Get the name of user who will be banned.
-            self.controller.server.delete_user(self.etr_dlt_user.get())
-            # Clean up the entry.
-            self.etr_dlt_user.delete(0, "end")
-            # Informs the user than the user has been correctly banned.
-            self.lbl_dlt_user["text"] = ["The user has been banned.", "L'utilisateur a été exclu."][self.lg]
+            # The number of banned words loaded is displayed when the server has loaded them.
+            with open(path, encoding="utf-8") as file:
+                self.controller.server.commands.put(["Load Banned Words", file.read().splitlines()])
 
-        # Informs the user if no user with this name has been found on the server.
-        except ValueError:
-            self.lbl_dlt_user["text"] = ["No user with this name was found.", 
-                                         "Aucun utilisateur n'a été trouvé."][self.lg]
+        # Informs the user if the file can't be read.
+        except (OSError, UnicodeDecodeError):
+            self.lbl_banned_words["text"] = ["The file could not be read.", "Le fichier n'a pas pu être lu."][self.lg]
 
 
 class ClientMenu(tk.Frame):
@@ -743,6 +1110,22 @@ class ClientMenu(tk.Frame):
         self.frm_scroll_msg = ft.ScrollableFrameMessage(self, c_width=400, c_height=500, highlightbackground=self.border_color,
                                                         highlightthickness=1, bg=self.canvas_color)
         self.frm_scroll_msg.pack(side="left", fill="y", padx=10, pady=10)
+
+        # Display the last messages of the conversation kept on the disk, the older messages are loaded when scrolling up.
+        # The conversation is identified by the address and the name of the server, and the name of the user.
+        if self.controller.message_cache is None:
+            from cache import MessageCache
+            self.controller.message_cache = MessageCache()
+
+        self.cache_key = "%s:%s/%s/%s" % (self.controller.data_client[1], self.controller.data_client[2],
+                                          self.controller.client.data_server[0], self.controller.data_client[0])
+        self.controller.message_cache.open(self.cache_key)
+        self.oldest_id = None
+
+        history = self.load_history()
+        if history:
+            self.frm_scroll_msg.display_messages(history)
+            self.frm_scroll_msg.load_command = self.load_older_messages
         
         # Create a new frame for the widgets to the right of the message box.
         frm_right = tk.Frame(self, bg=self.bg_color)
@@ -766,6 +1149,22 @@ class ClientMenu(tk.Frame):
         frm_txtbox = tk.Frame(frm_right, bg=self.bg_color)
         frm_txtbox.pack(fill="both")
 
+        # Create a frame where the progress of the file transfers will be displayed.
+        self.transfer_bars = {}
+        self.frm_transfers = tk.Frame(frm_txtbox, bg=self.bg_color)
+        self.frm_transfers.pack(side="top", fill="x")
+
+        # Create a text displaying the users who are typing.
+        self.lbl_typing = tk.Label(frm_txtbox, font=("Courier 9 italic"), bg=self.bg_color, fg=self.font_color, anchor="w")
+        self.lbl_typing.pack(side="top", fill="x")
+
+        # Create a text displaying the recipient of the private messages, click on it to send to all users again.
+        self.recipient = None
+        self.lbl_recipient = ft.TextButton(frm_txtbox, hover_color="#FFBEBE", command=lambda: self.select_recipient(None),
+                                           font=("Courier 9"), bg=self.bg_color, fg=self.font_color, anchor="w")
+        self.lbl_recipient.pack(side="top", fill="x")
+        self.select_recipient(None)
+
         # Create vertical scrollbar attached to text box.
         vbar_txtbox = ttk.Scrollbar(frm_txtbox)
         vbar_txtbox.pack(side="right", fill="y")
@@ -777,67 +1176,107 @@ class ClientMenu(tk.Frame):
         vbar_txtbox.config(command=self.txtbox.yview)
         self.txtbox.pack(expand=True, fill="x")
 
+        # Inform the other users when the user is typing.
+        self.txtbox.bind("<KeyRelease>", self.notify_typing)
+
         # Create a button to send a message.
         self.btn_send = ttk.Button(frm_txtbox, text=["Send", "Envoyer"][self.lg], command=self.send_message)
-        self.btn_send.pack(side="bottom", anchor="e", pady=3)
+        self.btn_send.pack(side="right", anchor="e", pady=3)
+
+        # Create a button to share a file.
+        ttk.Button(frm_txtbox, text=["File", "Fichier"][self.lg], command=self.send_file).pack(side="right", anchor="e", pady=3)
         
-        # Create a thread in parallel to the menu creation.
-        trd_main = Thread(target=self.main)
-        trd_main.start()
+        # Start receiving the messages in another thread, the events are displayed by the GUI thread.
+        self.after_id = None
+        self.controller.client.start_receiving()
+        self.process_events()
 
-    def main(self):
-        """Main method used to update receive messages and displaying online users."""
-        try:
-            while not self.controller.stop:
-                # Manage the display of online users in the server.
-                # Check if a user update request has been asked.
-                if self.controller.client.updt_user:
-                    # Delete all widgets in the "Online User Tab".
-                    for user in self.frm_on_user.frm_scrollable.winfo_children():
-                        user.destroy()
-
-                    # Add a widget for the name of the server owner.
-                    self.frm_on_user.display_user(self.controller.client.data_server[1], self.bg_color, self.font_color, "moderator")
-
-                    # Create new widget for each online user.
-                    for online_user in range(len(self.controller.client.data_user["Online_User"])):
-                        self.frm_on_user.display_user(self.controller.client.data_user["Online_User"][online_user], self.bg_color, self.font_color)
-
-                    # The user's update request is complete.
-                    self.controller.client.updt_user = False
-
-                # Manage the display of received messages.
-                # Receive messages sent by the server.
-                self.controller.client.receive_message()
-
-                # Check for new message.
-                if self.controller.client.new_msg:
-                    # Get the message
-                    msg_rcv = self.controller.client.message_recv
-
-                    # Translation for the message.
-                    # Check if the message is a simple str or if it contains a list of multiple translations.
-                    if isinstance(msg_rcv[0], list):
-                        msg_rcv[0] = msg_rcv[0][self.lg]
-
-                    if isinstance(msg_rcv[1], list):
-                        msg_rcv[1] = msg_rcv[1][self.lg]
-
-                    # Create new widget fot the message.
-                    self.frm_scroll_msg.display_message(msg_rcv[0], msg_rcv[1], self.msg_other_color, self.border_color, self.msg_font_color)
-                    # The message is displayed.
-                    self.controller.client.new_msg = False
-
-                # Stop the main controller if the client is disconnected.
-                if self.controller.client.is_stopped:
-                    self.controller.stop = True
-
-                    # Go to Home Menu when the client is not connected.
-                    self.btn_send.configure(text=["Back to Home Menu", "Retourner au Menu"], command=self.controller.go_home, width=19)
-
-        # Avoid an error when the user return to home because the loop has been stopped.
-        except AttributeError:
-            pass
+    def process_events(self, batch_size:int=200):
+        """
+        Display the events received by the client (messages, online users and file transfers).
+        The events are taken by batch from the queue, then the method is called again a few milliseconds later.
+
+        Arg:
+            - batch_size (int): The maximum number of events displayed at each call.
+        """
+        client = self.controller.client
+
+        # The client has been closed by the user.
+        if client is None:
+            return
+
+        online_users = None
+        typing_users = None
+        updt_transfer = False
+
+        # List of the messages received, displayed together at the end.
+        batch = []
+
+        for __ in range(batch_size):
+            try:
+                event = client.events.get_nowait()
+
+            except queue.Empty:
+                break
+
+            # Only the last lists of online users and of users who are typing are displayed.
+            if event[0] == "Update User":
+                online_users = event[1]
+
+            elif event[0] == "Typing":
+                typing_users = event[1]
+
+            elif event[0] == "Transfer":
+                updt_transfer = True
+
+            # Display the received messages.
+            elif event[0] in ("Message", "Exit Server"):
+                # Translation for the message.
+                # The system messages are displayed with the template of the language.
+                author = localize(event[1], self.lg)
+                message = localize(event[2], self.lg)
+
+                batch.append((author, message, self.msg_other_color, self.border_color, self.msg_font_color))
+
+                # Keep the messages of the users in the cache, the system messages and the search results are not kept.
+                if event[0] == "Message" and event[1] not in ((SYSTEM,), (SEARCH,)):
+                    self.controller.message_cache.add(self.cache_key, author, message)
+
+            # Display the errors of the client as system messages.
+            elif event[0] == "Error":
+                batch.append((localize((SYSTEM,), self.lg), localize(event[1], self.lg),
+                              self.msg_other_color, self.border_color, self.msg_font_color))
+
+            # Go to Home Menu when the client is not connected.
+            if event[0] == "Exit Server":
+                self.controller.stop = True
+                self.btn_send.configure(text=["Back to Home Menu", "Retourner au Menu"][self.lg], command=self.controller.go_home, width=19)
+
+        # Display all the messages with a single layout of the message box.
+        self.frm_scroll_msg.display_messages(batch)
+
+        # Manage the display of online users in the server, with the name of the server owner first.
+        # Click on a user to send him a private message.
+        if online_users is not None:
+            self.frm_on_user.update_users(online_users, self.bg_color, self.font_color, client.data_server[1],
+                                          command=self.select_recipient)
+
+        # Display the users who are typing.
+        if typing_users is not None:
+            self.display_typing(typing_users)
+
+        # Manage the display of the file transfers.
+        if updt_transfer:
+            self.update_transfers()
+
+        self.after_id = self.after(50, self.process_events)
+
+    def destroy(self):
+        """Stop displaying the events before destroying the menu."""
+        if self.after_id:
+            self.after_cancel(self.after_id)
+
+        super().destroy()
 
     def send_message(self):
         """Manage the sending and displaying of the message."""
@@ -845,21 +1284,145 @@ class ClientMenu(tk.Frame):
         # Get the sent message to display.
         msg_send = self.txtbox.get("1.0", "end")
 
+        # The "/search" command asks the server the old messages matching the words, it is not displayed.
+        if msg_send.startswith("/search "):
+            self.controller.client.search(msg_send[len("/search "):].strip())
+
         # Check if the message is blank.
-        if msg_send != "\n":
-            # Send the message.
-            self.controller.client.send_message(msg_send)
+        elif msg_send != "\n":
+            # Send the message, privately if a recipient is selected.
+            if self.recipient:
+                self.controller.client.send_direct_message(self.recipient, msg_send)
+
+            else:
+                self.controller.client.send_message(msg_send)
 
-            # Display the message.
-            self.frm_scroll_msg.display_message(self.controller.data_client[0], msg_send, self.bg_color, self.border_color, self.font_color)
+            # Display the message and keep it in the cache.
+            title = self.controller.data_client[0] + (f" > {self.recipient}" if self.recipient else "")
+            self.frm_scroll_msg.display_message(title, msg_send, self.bg_color, self.border_color, self.font_color)
+            self.controller.message_cache.add(self.cache_key, title, msg_send, own=True)
 
         # Cleans up the user text box
         self.txtbox.delete("1.0", "end")
 
+    def notify_typing(self, event):
+        """Inform the server that the user is typing, or that he has stopped typing if the text box is empty."""
+        client = self.controller.client
+
+        if client is None or not client.is_connected:
+            return
+
+        if self.txtbox.get("1.0", "end").strip():
+            client.notify_typing()
+
+        else:
+            client.stop_typing()
+
+    def display_typing(self, typing_users:list):
+        """
+        Display the users who are typing under the message box.
+
+        Arg:
+            - typing_users (list): The names of the users who are typing.
+        """
+        if not typing_users:
+            self.lbl_typing["text"] = ""
+
+        elif len(typing_users) == 1:
+            self.lbl_typing["text"] = [f"{typing_users[0]} is typing...", f"{typing_users[0]} est en train d'écrire..."][self.lg]
+
+        elif len(typing_users) <= 3:
+            names = ", ".join(typing_users[:-1])
+            self.lbl_typing["text"] = [f"{names} and {typing_users[-1]} are typing...",
+                                       f"{names} et {typing_users[-1]} sont en train d'écrire..."][self.lg]
+
+        else:
+            self.lbl_typing["text"] = [f"{len(typing_users)} users are typing...",
+                                       f"{len(typing_users)} utilisateurs sont en train d'écrire..."][self.lg]
+
+    def load_history(self):
+        """Returns the messages of the conversation older than the messages displayed, read in the cache."""
+        rows = self.controller.message_cache.load(self.cache_key, self.oldest_id)
+
+        if rows:
+            self.oldest_id = rows[0][0]
+
+        # The messages sent by the user have the colors of the user.
+        return [(author, text, self.bg_color, self.border_color, self.font_color, timestamp) if own else
+                (author, text, self.msg_other_color, self.border_color, self.msg_font_color, timestamp)
+                for __, author, text, timestamp, own in rows]
+
+    def load_older_messages(self):
+        """
+        Add the previous page of messages at the beginning of the message box.
+
+        Returns the number of messages added.
+        """
+        history = self.load_history()
+        self.frm_scroll_msg.insert_messages(history)
+
+        return len(history)
+
+    def send_file(self):
+        """Choose a file and share it with the recipient, or with all users."""
+        path = filedialog.askopenfilename(title=["Share a file", "Partager un fichier"][self.lg])
+
+        # The user has closed the dialog without choosing a file.
+        if path:
+            self.controller.client.offer_file(path, self.recipient)
+
+    def update_transfers(self):
+        """Create and update the progress bars of the file transfers."""
+        for transfer_id, transfer in list(self.controller.client.transfers.items()):
+            bar = self.transfer_bars.get(transfer_id)
+
+            # Create a progress bar for the new transfers.
+            if bar is None:
+                accept_command = None
+                if transfer["Direction"] == "download":
+                    accept_command = lambda transfer_id=transfer_id: self.controller.client.accept_file(transfer_id)
+
+                    # Informs the user that a file is offered.
+                    self.frm_scroll_msg.display_message(transfer["Sender"], 
+                                                        [f"Shares the file {transfer['Name']}.", f"Partage le fichier {transfer['Name']}."][self.lg],
+                                                        self.msg_other_color, self.border_color, self.msg_font_color)
+
+                bar = ft.FileTransferBar(self.frm_transfers, transfer["Name"], transfer["Size"], self.lg, self.font_color, self.bg_color,
+                                         accept_command, lambda transfer_id=transfer_id: self.controller.client.cancel_transfer(transfer_id))
+                bar.pack(fill="x", pady=1)
+                self.transfer_bars[transfer_id] = bar
+
+            # Update the progress and remove the bar a few seconds after the end of the transfer.
+            if not bar.is_finished:
+                bar.update_transfer(transfer["State"], transfer["Done"])
+
+                if bar.is_finished:
+                    self.after(5000, bar.destroy)
+
+    def select_recipient(self, user_name):
+        """
+        Select the user who receives the private messages.
+
+        Arg:
+            - user_name (str): The name of the recipient, None to send the messages to all users.
+        """
+        # The user can't send a private message to himself.
+        if user_name == self.controller.data_client[0]:
+            return
+
+        self.recipient = user_name
+
+        if user_name:
+            self.lbl_recipient["text"] = [f"To : {user_name} (click to cancel)", f"À : {user_name} (cliquez pour annuler)"][self.lg]
+
+        else:
+            self.lbl_recipient["text"] = ["To : everyone", "À : tout le monde"][self.lg]
+
 
 if __name__ == "__main__":
     try:
-        application = MainController()
+        # With the option --process, the network doesn't share the process of the graphical user interface.
+        application = MainController(use_process="--process" in sys.argv)
         application.mainloop()
 
     # Prevents to error when the script execution.
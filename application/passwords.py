@@ -0,0 +1,239 @@
+"""
+Description:
+    Functions and class used to protect the password of the server. The password is never kept in plain text,
+    only its hash, derived with a salt by scrypt, or by PBKDF2 on the systems where scrypt is not available.
+    The derivation is slow on purpose, so the passwords of the clients are verified in a pool of workers
+    and the server loop is not blocked while users join. The hash functions release the GIL, so the threads
+    of the pool run on several cores.
+    The servers linked by the federation prove that they know the password with a key derived from it.
+
+Packages:
+    - concurrent.futures
+    - hashlib
+    - hmac
+    - os
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import hashlib
+import hmac
+import os
+
+# Cost of scrypt (about 16 MB and 50 ms per derivation), and the number of iterations of PBKDF2.
+SCRYPT_N = 16384
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = 200000
+
+# Size in bytes of the salt and of the hash.
+SALT_SIZE = 16
+HASH_SIZE = 32
+
+# Salt of the key of the relay links, the same on all the servers so that they derive the same key.
+LINK_SALT = b"online_chat federation link"
+
+
+def derive(password:str, algorithm:str, salt:bytes, params:list):
+    """
+    Derive the hash of a password.
+
+    Args:
+        - password (str): The password.
+        - algorithm (str): "scrypt" or "pbkdf2_sha256".
+        - salt (bytes): The salt of the hash.
+        - params (list): The costs of the algorithm, [n, r, p] for scrypt and [iterations] for PBKDF2.
+
+    Returns the hash.
+
+    Raises ValueError if the algorithm is unknown.
+    """
+    if algorithm == "scrypt":
+        n, r, p = params
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=HASH_SIZE)
+
+    if algorithm == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, params[0], dklen=HASH_SIZE)
+
+    raise ValueError(f"Unknown algorithm: {algorithm}.")
+
+
+def hash_password(password:str):
+    """
+    Hash a password with a new salt.
+
+    Arg:
+        - password (str): The password.
+
+    Returns the hash in the form "algorithm$params$salt$hash", the params, the salt and the hash in hexadecimal.
+    """
+    salt = os.urandom(SALT_SIZE)
+
+    if hasattr(hashlib, "scrypt"):
+        algorithm, params = "scrypt", [SCRYPT_N, SCRYPT_R, SCRYPT_P]
+
+    else:
+        algorithm, params = "pbkdf2_sha256", [PBKDF2_ITERATIONS]
+
+    digest = derive(password, algorithm, salt, params)
+
+    return "$".join([algorithm, ",".join(str(param) for param in params), salt.hex(), digest.hex()])
+
+
+def verify_password(password:str, password_hash:str):
+    """
+    Check if a password matches a hash. This function is at module level to be usable by a process pool.
+
+    Args:
+        - password (str): The password to check.
+        - password_hash (str): The hash given by hash_password.
+
+    Returns true if the password is correct.
+    """
+    # The password sent by a client may not be a text.
+    if not isinstance(password, str):
+        return False
+
+    algorithm, params, salt, digest = password_hash.split("$")
+    expected = bytes.fromhex(digest)
+
+    # The comparison takes the same time whatever the number of correct bytes.
+    return hmac.compare_digest(derive(password, algorithm, bytes.fromhex(salt), [int(param) for param in params.split(",")]), expected)
+
+
+def derive_link_key(password:str):
+    """
+    Derive the key used by the relay links, so the servers don't keep the password itself.
+    PBKDF2 is used because it is available on all the systems, the servers must derive the same key.
+
+    Arg:
+        - password (str): The password of the server.
+
+    Returns the key.
+    """
+    return derive(password, "pbkdf2_sha256", LINK_SALT, [PBKDF2_ITERATIONS])
+
+
+def sign_link(link_key:bytes, node_id:str):
+    """
+    Create the proof sent by a server when it opens a link, which shows that it knows the password.
+
+    Args:
+        - link_key (bytes): The key given by derive_link_key.
+        - node_id (str): The ID of the node which opens the link.
+
+    Returns the proof in hexadecimal.
+    """
+    return hmac.new(link_key, node_id.encode(), hashlib.sha256).hexdigest()
+
+
+def verify_link(link_key:bytes, node_id:str, proof):
+    """
+    Check the proof sent by a server which opens a link.
+
+    Args:
+        - link_key (bytes): The key given by derive_link_key.
+        - node_id (str): The ID of the node which opens the link.
+        - proof: The proof sent by the node.
+
+    Returns true if the node knows the password.
+    """
+    # The proof sent by the other node may not be a text.
+    if not isinstance(proof, str):
+        return False
+
+    # The comparison takes the same time whatever the number of correct bytes.
+    return hmac.compare_digest(sign_link(link_key, node_id).encode(), proof.encode())
+
+
+class PasswordVerifier:
+    """
+    Verify the passwords of the clients in a pool of workers, the results are collected by the server loop.
+
+    Args:
+        - password (str): The password of the server.
+        - workers (int): The number of workers in the pool, by default the number of processors.
+        - use_process (bool): If true the workers are processes, else threads.
+    """
+    def __init__(self, password:str, workers:int=None, use_process:bool=False):
+        self.workers = workers or os.cpu_count() or 1
+        self.use_process = use_process
+        self.set_password(password)
+
+        # Dictionary containing the verification being done for each connection.
+        self.pending = {}
+
+        # The pool is only created when the first password is verified.
+        self.executor = None
+
+    def set_password(self, password:str):
+        """
+        Replace the password of the server. The verifications already started use the previous password.
+
+        Arg:
+            - password (str): The new password.
+        """
+        self.password_hash = hash_password(password)
+
+    def submit(self, connection, password:str):
+        """
+        Send a password to verify to the workers.
+
+        Args:
+            - connection : The connection of the client who has sent the password.
+            - password (str): The password sent by the client.
+        """
+        if self.executor is None:
+            pool = ProcessPoolExecutor if self.use_process else ThreadPoolExecutor
+            self.executor = pool(max_workers=self.workers)
+
+        self.pending[connection] = self.executor.submit(verify_password, password, self.password_hash)
+
+    def cancel(self, connection):
+        """
+        Forget the verification of a connection closed before its end.
+
+        Arg:
+            - connection : The connection of the client.
+        """
+        future = self.pending.pop(connection, None)
+
+        if future is not None:
+            future.cancel()
+
+    def collect(self):
+        """
+        Get the verifications which are complete.
+
+        Returns a list containing the connection and true if the password is correct.
+        """
+        results = []
+
+        for connection, future in list(self.pending.items()):
+            if not future.done():
+                continue
+
+            del self.pending[connection]
+
+            try:
+                is_valid = future.result()
+
+            # A hash which can't be read refuses the client without stopping the server.
+            except Exception as e:
+                print(e)
+                is_valid = False
+
+            results.append((connection, is_valid))
+
+        return results
+
+    def close(self):
+        """Stop the workers and forget the verifications being done."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+        self.pending.clear()
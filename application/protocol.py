@@ -0,0 +1,341 @@
+"""
+Description:
+    Functions and class used to cut the data exchanged between the server and the clients in frames.
+    Each frame starts with a header containing its type and its length, so several messages sent together
+    or a message received in several parts are read correctly.
+
+    There are two types of frames:
+        - the object frames contain a pickled message (text, list or dictionary).
+        - the chunk frames contain a part of a file, after the ID of the file transfer.
+
+    The clients of the same machine as the server can use its Unix domain socket, whose path depends on the port.
+    The socket is kept in a directory of the user which launched the server, that the other users can't open.
+
+Packages:
+    - os
+    - pickle
+    - socket
+    - stat
+    - struct
+    - tempfile
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import os
+import pickle
+import socket
+import stat
+import struct
+import tempfile
+
+# Header of each frame: the type (1 byte) and the length of the content (4 bytes).
+HEADER = struct.Struct("!BI")
+
+# Header of the chunk frames: the ID of the file transfer (4 bytes).
+CHUNK_HEADER = struct.Struct("!I")
+
+FRAME_OBJECT = 0
+FRAME_CHUNK = 1
+
+# Size of the parts of file sent in the chunk frames.
+CHUNK_SIZE = 16384
+
+# Frames longer than this size are refused, to protect the memory of the server.
+MAX_FRAME_SIZE = 1048576
+
+# The first frame of a connection only contains the data of the user, a longer frame is refused.
+MAX_HANDSHAKE_SIZE = 4096
+
+
+def unix_socket_path(port:int):
+    """
+    Get the path of the Unix domain socket of the server launched on a port by the current user.
+    The socket is in a directory of the user, in his runtime directory if the system gives one.
+
+    Arg:
+        - port (int): The port of the server.
+
+    Returns the path, None if the system doesn't have Unix domain sockets.
+    """
+    if not hasattr(socket, "AF_UNIX") or not hasattr(os, "getuid"):
+        return None
+
+    directory = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+
+    return os.path.join(directory, f"online_chat-{os.getuid()}", f"online_chat_{port}.sock")
+
+
+def make_unix_socket_directory(path:str):
+    """
+    Create the directory of a Unix domain socket, readable only by the current user.
+
+    Arg:
+        - path (str): The path of the socket.
+
+    Raises PermissionError if the directory already exists and belongs to another user.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    if not is_private(directory):
+        raise PermissionError(f"The directory {directory} can be used by other users.")
+
+
+def is_private(path:str):
+    """
+    Check that a file or a directory belongs to the current user and that the other users can't use it.
+    The links are refused, they could lead to a file of another user.
+
+    Arg:
+        - path (str): The path of the file or the directory.
+
+    Returns true if only the current user can use it.
+    """
+    try:
+        status = os.lstat(path)
+
+    except OSError:
+        return False
+
+    return not stat.S_ISLNK(status.st_mode) and status.st_uid == os.getuid() and not status.st_mode & 0o077
+
+
+def is_trusted_unix_socket(path:str):
+    """
+    Check that a Unix domain socket has been created by the current user, before connecting to it.
+
+    Arg:
+        - path (str): The path of the socket.
+
+    Returns true if the socket and its directory belong to the current user.
+    """
+    try:
+        status = os.lstat(path)
+
+    except OSError:
+        return False
+
+    return stat.S_ISSOCK(status.st_mode) and status.st_uid == os.getuid() and is_private(os.path.dirname(path))
+
+
+def pack_object(message):
+    """
+    Create an object frame.
+
+    Arg:
+        - message: The message to send.
+
+    Returns the bytes of the frame.
+    """
+    return pack_pickled(pickle.dumps(message))
+
+
+def pack_pickled(payload:bytes):
+    """
+    Create an object frame from a message already pickled.
+
+    Arg:
+        - payload (bytes): The pickled message.
+
+    Returns the bytes of the frame.
+    """
+    return HEADER.pack(FRAME_OBJECT, len(payload)) + payload
+
+
+def pack_chunk_header(transfer_id:int, size:int):
+    """
+    Create the header of a chunk frame, the part of file must be sent just after.
+
+    Args:
+        - transfer_id (int): The ID of the file transfer.
+        - size (int): The size of the part of file.
+
+    Returns the bytes of the header.
+    """
+    return HEADER.pack(FRAME_CHUNK, CHUNK_HEADER.size + size) + CHUNK_HEADER.pack(transfer_id)
+
+
+def send_file_part(connection, file, offset:int, size:int):
+    """
+    Send a part of a file to a connection which doesn't block, without waiting for the whole part to be sent.
+    The part is copied from the file to the connection by the system when it can, without passing through Python.
+
+    Args:
+        - connection : The connection.
+        - file : The file, opened in binary mode.
+        - offset (int): The position of the part in the file.
+        - size (int): The size of the part.
+
+    Returns the number of bytes sent, 0 at the end of the file.
+
+    Raises BlockingIOError if the connection is full.
+    """
+    if hasattr(os, "sendfile"):
+        return os.sendfile(connection.fileno(), file.fileno(), offset, size)
+
+    file.seek(offset)
+    data = file.read(size)
+
+    return connection.send(data) if data else 0
+
+
+def pack_chunk(transfer_id:int, data:bytes):
+    """
+    Create a chunk frame.
+
+    Args:
+        - transfer_id (int): The ID of the file transfer.
+        - data (bytes): The part of file.
+
+    Returns the bytes of the frame.
+    """
+    return pack_chunk_header(transfer_id, len(data)) + data
+
+
+class FrameReader:
+    """
+    Store the data received from a connection and cut it in frames.
+    The data is received directly in a buffer, and the frames are read in place.
+
+    Args:
+        - size (int): The initial size of the buffer, it grows as the data of a longer frame arrives.
+        - max_size (int): The maximum length of the frames accepted.
+    """
+    def __init__(self, size:int=4096, max_size:int=MAX_FRAME_SIZE):
+        self.buffer = bytearray(size)
+        self.max_size = max_size
+
+        # View on the buffer, used to read and write parts of the buffer without copying them.
+        self.view = memoryview(self.buffer)
+
+        # The unread data is between the start and the end index.
+        self.start = 0
+        self.end = 0
+
+    def reserve(self, size:int):
+        """
+        Make sure there is enough free space at the end of the buffer.
+        The unread data is moved to the beginning of the buffer only when the space is missing.
+
+        Arg:
+            - size (int): The number of bytes needed after the unread data.
+        """
+        # All the data has been read, the buffer is reused from the beginning.
+        if self.start == self.end:
+            self.start = self.end = 0
+
+        if len(self.buffer) - self.end >= size:
+            return
+
+        unread = self.end - self.start
+
+        # The buffer is too small, a larger one is created.
+        if unread + size > len(self.buffer):
+            buffer = bytearray(max(unread + size, 2 * len(self.buffer)))
+            buffer[:unread] = self.view[self.start:self.end]
+            self.buffer = buffer
+            self.view = memoryview(buffer)
+
+        # Move the unread data to the beginning of the buffer.
+        else:
+            self.buffer[:unread] = self.view[self.start:self.end]
+
+        self.start, self.end = 0, unread
+
+    def recv_into(self, connection, size:int=4096):
+        """
+        Receive data from the connection directly in the buffer.
+
+        Args:
+            - connection : The connection to read.
+            - size (int): The minimum free space given to the connection.
+
+        Returns the number of bytes received, 0 if the connection is closed.
+        """
+        # The free space for a long frame grows with the data already received,
+        # so that a header alone doesn't reserve the whole length announced.
+        unread = self.end - self.start
+        if unread >= HEADER.size:
+            __, length = HEADER.unpack_from(self.buffer, self.start)
+            size = max(size, min(min(length, self.max_size) + HEADER.size - unread, unread))
+
+        self.reserve(size)
+
+        nb_bytes = connection.recv_into(self.view[self.end:])
+
+        self.end += nb_bytes
+        return nb_bytes
+
+    def feed(self, data:bytes):
+        """
+        Add data received by another way to the buffer.
+
+        Arg:
+            - data (bytes): The data received.
+        """
+        self.reserve(len(data))
+        self.buffer[self.end:self.end + len(data)] = data
+        self.end += len(data)
+
+    def has_frame(self):
+        """Returns true if the buffer contains a complete frame."""
+        if self.end - self.start < HEADER.size:
+            return False
+
+        __, length = HEADER.unpack_from(self.buffer, self.start)
+        return self.end - self.start >= HEADER.size + length
+
+    def next_frame(self):
+        """
+        Remove the first frame from the buffer.
+
+        Returns a tuple containing the type and the content of the frame: the message for the object frames,
+        the ID of the file transfer and the part of file for the chunk frames. Returns None if no frame is complete.
+        The part of file is a view on the buffer, it must be used before the next reception.
+
+        Raises ValueError if the frame is too long or has an unknown type.
+        """
+        start = self.start
+        if self.end - start < HEADER.size:
+            return None
+
+        kind, length = HEADER.unpack_from(self.buffer, start)
+
+        if length > self.max_size or kind > FRAME_CHUNK:
+            raise ValueError("The frame received is incorrect.")
+
+        begin = start + HEADER.size
+        end = begin + length
+        if self.end < end:
+            return None
+
+        self.start = end
+
+        if kind == FRAME_OBJECT:
+            # The message is decoded directly from the buffer, without copying it.
+            return kind, pickle.loads(self.view[begin:end])
+
+        transfer_id, = CHUNK_HEADER.unpack_from(self.buffer, begin)
+        return kind, (transfer_id, self.view[begin + CHUNK_HEADER.size:end])
+
+
+def receive_frame(connection, reader:FrameReader):
+    """
+    Wait until a complete frame is received from a blocking connection.
+
+    Args:
+        - connection : The connection to read.
+        - reader (FrameReader): The reader of the connection.
+
+    Returns the frame, see FrameReader.next_frame.
+
+    Raises ConnectionResetError if the connection is closed before the end of the frame.
+    """
+    while not reader.has_frame():
+        if reader.recv_into(connection) == 0:
+            raise ConnectionResetError("The connection has been closed.")
+
+    return reader.next_frame()
@@ -0,0 +1,240 @@
+"""
+Description:
+    Class used to search the messages sent on the server by word, author and time.
+    The messages are indexed as they are sent, in segments of fixed size. Each segment maps the words
+    to the ID of the messages containing them, with compressed lists of IDs.
+    The oldest segments are deleted to keep the memory bounded.
+
+Packages:
+    - datetime
+    - re
+    - time
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+from datetime import datetime
+import re
+import time
+
+
+def encode_varint(value:int, buffer:bytearray):
+    """
+    Add an integer to the buffer, with 7 bits per byte.
+
+    Args:
+        - value (int): The positive integer to add.
+        - buffer (bytearray): The buffer where the integer is written.
+    """
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+
+    buffer.append(value)
+
+
+def decode_postings(buffer:bytearray, first_id:int):
+    """
+    Read a list of message IDs written as differences between successive IDs.
+
+    Args:
+        - buffer (bytearray): The compressed list of IDs.
+        - first_id (int): The ID from which the first difference is computed.
+
+    Returns the list of message IDs.
+    """
+    ids = []
+    value = shift = 0
+    current_id = first_id
+
+    for byte in buffer:
+        value |= (byte & 0x7F) << shift
+
+        if byte & 0x80:
+            shift += 7
+
+        else:
+            current_id += value
+            ids.append(current_id)
+            value = shift = 0
+
+    return ids
+
+
+def tokenize(text:str):
+    """Returns the list of lowercase words in the text."""
+    return re.findall(r"\w+", text.casefold())
+
+
+def parse_time(text:str):
+    """
+    Convert a date ("2020-05-30T12:00") or an hour of the current day ("12:00") in timestamp.
+
+    Raises ValueError if the text is not a date.
+    """
+    if re.fullmatch(r"\d{1,2}:\d{2}", text):
+        text = datetime.now().strftime("%Y-%m-%d") + "T" + text.zfill(5)
+
+    return datetime.fromisoformat(text).timestamp()
+
+
+class Segment:
+    """
+    Part of the index containing a fixed number of consecutive messages.
+
+    Arg:
+        - first_id (int): The ID of the first message of the segment.
+    """
+    def __init__(self, first_id:int):
+        self.first_id = first_id
+
+        # List containing the author, the time and the text of each message.
+        self.messages = []
+
+        # Dictionary containing for each word the compressed list of IDs and the last ID added.
+        self.postings = {}
+
+        self.start_time = None
+        self.end_time = None
+
+    def add(self, message_id:int, author:str, timestamp:float, text:str):
+        """Index a message in the segment."""
+        self.messages.append((author, timestamp, text))
+
+        if self.start_time is None:
+            self.start_time = timestamp
+        self.end_time = timestamp
+
+        for token in set(tokenize(text)):
+            posting = self.postings.get(token)
+
+            if posting is None:
+                posting = self.postings[token] = [bytearray(), self.first_id - 1]
+
+            encode_varint(message_id - posting[1], posting[0])
+            posting[1] = message_id
+
+    def lookup(self, token:str):
+        """Returns the set of IDs of the messages containing the word."""
+        posting = self.postings.get(token)
+
+        if posting is None:
+            return set()
+
+        return set(decode_postings(posting[0], self.first_id - 1))
+
+    def get(self, message_id:int):
+        """Returns the author, the time and the text of a message."""
+        return self.messages[message_id - self.first_id]
+
+
+class SearchIndex:
+    """
+    Create an index of the messages.
+
+    Args:
+        - segment_size (int): The number of messages in a segment.
+        - max_segments (int): The number of segments kept, the oldest are deleted.
+    """
+    def __init__(self, segment_size:int=1000, max_segments:int=50):
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+
+        self.segments = []
+        self.next_id = 0
+
+    def add(self, author:str, text:str, timestamp:float=None):
+        """
+        Index a new message.
+
+        Args:
+            - author (str): The name of the user who has sent the message.
+            - text (str): The message.
+            - timestamp (float): The time of the message, by default the current time.
+
+        Returns the ID of the message.
+        """
+        if not self.segments or len(self.segments[-1].messages) >= self.segment_size:
+            self.segments.append(Segment(self.next_id))
+
+            # Delete the oldest segment.
+            if len(self.segments) > self.max_segments:
+                del self.segments[0]
+
+        message_id = self.next_id
+        self.segments[-1].add(message_id, author, timestamp or time.time(), text)
+        self.next_id += 1
+
+        return message_id
+
+    def search(self, query:str, author:str=None, start:float=None, end:float=None, limit:int=20):
+        """
+        Search the messages matching the query.
+        The words of the query must all be in the message, "OR" separates several alternatives.
+        The query can contain the filters "from:name", "after:date" and "before:date".
+
+        Args:
+            - query (str): The words to search.
+            - author (str): Only the messages of this user are returned.
+            - start (float): Only the messages sent after this time are returned.
+            - end (float): Only the messages sent before this time are returned.
+            - limit (int): The maximum number of messages returned.
+
+        Returns a list containing the ID, the author, the time and the text of the messages, from the most recent.
+        """
+        alternatives = [[]]
+
+        for word in query.split():
+            if word == "OR":
+                alternatives.append([])
+
+            elif word.startswith("from:"):
+                author = word[5:]
+
+            elif word.startswith("after:"):
+                start = parse_time(word[6:])
+
+            elif word.startswith("before:"):
+                end = parse_time(word[7:])
+
+            else:
+                alternatives[-1].extend(tokenize(word))
+
+        alternatives = [tokens for tokens in alternatives if tokens]
+        author = author.casefold() if author else None
+        results = []
+
+        # Read the segments from the most recent.
+        for segment in reversed(self.segments):
+            # Skip the segments outside the time range.
+            if (start and segment.end_time < start) or (end and segment.start_time > end):
+                continue
+
+            if alternatives:
+                ids = set()
+                for tokens in alternatives:
+                    # Intersect the lists of IDs from the shortest.
+                    postings = sorted((segment.lookup(token) for token in tokens), key=len)
+                    ids |= set.intersection(*postings)
+
+            # Without words, all the messages matching the filters are returned.
+            else:
+                ids = range(segment.first_id, segment.first_id + len(segment.messages))
+
+            for message_id in sorted(ids, reverse=True):
+                msg_author, timestamp, text = segment.get(message_id)
+
+                if author and msg_author.casefold() != author:
+                    continue
+
+                if (start and timestamp < start) or (end and timestamp > end):
+                    continue
+
+                results.append((message_id, msg_author, timestamp, text))
+
+                if len(results) >= limit:
+                    return results
+
+        return results
@@ -2,20 +2,117 @@
 Description:
     Class used to launch and manage server on a specific IP address and port. The server can be protected with a password.
     The server receives all messages from the clients and resends them to the other clients.
+    The CPU-heavy work on the messages is done by a pipeline of workers outside of the server loop.
+    The messages are indexed to be searched by the server owner and the clients.
+    The users can send private messages to each other, routed with the name of the recipient.
+    The users can share files, each file is stored once on the disk of the server then sent by chunks to the recipients.
+    The server runs in its own thread. The menu sends it commands through a queue and receives the messages
+    and the online users through another queue, so the data of the server is only used by its thread.
+    The messages sent to all users are numbered and the last ones are kept. A client whose connection is lost
+    reconnects with the token of his session, and receives the messages sent since the last one he has received.
+    The clients which ask for it are informed of the users who are typing. The list is sent at most once per interval,
+    and the users who have stopped typing without informing the server are forgotten after a timeout.
+    The server can also listen on a Unix domain socket, for the clients of the same machine and the same user.
+    Several servers can be linked, so that their users share one room: the messages sent to all users
+    and the online users are relayed to the other servers by the federation.
+
+    The traffic received from the clients can be recorded in a capture file, to be replayed on another server.
+
+    The connections of the banned addresses, and of the addresses which connect too often, are closed as soon as
+    they are accepted, before reading their data. The bans are kept in a file.
+
+    The handshake of the new connections doesn't block the server loop: the data of the user is read when it arrives,
+    and the password, kept only as a salted hash, is verified in a pool of workers. A client reconnecting with
+    a valid session is accepted without verifying the password.
+
+    The server can be launched without the graphical user interface:
+        python server.py server_name owner_name address_ip port password [--peer IP:port ...] [--capture path] [--ban-file path] [--unix-socket]
+            [--pool inline|thread|process] [--workers n]
 
 Packages:
+    - argparse
+    - os
+    - collections
+    - heapq
     - pickle
+    - queue
+    - secrets
     - select
+    - shutil
     - socket
+    - tempfile
+    - threading
+    - time
 """
 
 __author__ = ("Manitas Bahri")
 __version__ = "1.0"
 __date__ = "2020/05"
 
+import argparse
+from collections import deque
+import heapq
+import os
 import pickle
+import queue
+import secrets
 import select
+import shutil
 import socket
+import tempfile
+import threading
+import time
+
+from admission import BanList, RateLimiter, parse_address
+from capture import TrafficCapture
+from catalog import BAN_LIST_FAILED, KICKED, PRIVATE, SERVER_CLOSED, STAGE_FAILED, UNIX_SOCKET_FAILED, USER_LEFT, localize
+from content_filter import ContentFilter
+from federation import Federation
+from passwords import PasswordVerifier
+from pipeline import POOL_KINDS, MessagePipeline
+from protocol import CHUNK_SIZE, FRAME_CHUNK, MAX_FRAME_SIZE, MAX_HANDSHAKE_SIZE, FrameReader, make_unix_socket_directory, pack_chunk_header, pack_object, send_file_part, unix_socket_path
+from search import SearchIndex
+
+# Files larger than this size are refused.
+MAX_FILE_SIZE = 1073741824
+
+# Number of messages kept to be sent again to the clients who reconnect.
+HISTORY_SIZE = 1000
+
+# Time in seconds during which a client whose connection is lost can reconnect without the password.
+SESSION_TIMEOUT = 300
+
+# Minimum time in seconds between two lists of the users who are typing,
+# and time after which a user who has not informed the server that he is still typing is forgotten.
+TYPING_INTERVAL = 1.0
+TYPING_TIMEOUT = 5.0
+
+# Time in seconds given to a new connection to send its data, and maximum number of handshakes at the same time.
+# The new connections wait in the backlog of the listeners while the maximum is reached.
+HANDSHAKE_TIMEOUT = 10.0
+MAX_HANDSHAKES = 256
+
+# Time in seconds given to the thread of the server to stop, after the time given to inform the clients.
+STOP_DELAY = 1.0
+
+# Number of frames waiting to be sent to a client which doesn't read them, before the client is disconnected.
+MAX_PENDING_FRAMES = 4096
+
+# Number of connections waiting to be accepted by a listener.
+LISTEN_BACKLOG = 128
+
+# Types of the arguments of the list messages sent by the clients, and the number of arguments required.
+# The arguments after the required ones are optional.
+LIST_COMMANDS = {
+    "Typing": ((bool,), 1),
+    "File Offer": ((int, str, int, (str, type(None))), 3),
+    "File Accept": ((int,), 1),
+    "File Cancel": ((int,), 1),
+}
+
+# Frames sent to the connections refused before reading their data, packed once.
+BANNED_FRAME = pack_object(["server connection refused", "banned"])
+RATE_LIMITED_FRAME = pack_object(["server connection refused", "rate limit"])
 
 
 class Server:
@@ -28,21 +125,97 @@ class Server:
         - address_ip (str) : The address IP used to launch the server.
         - port (str) : The port where the server will be created.
         - password (str) : The server can be password protected to prevent intrusion.
+        - pipeline (MessagePipeline) : The pipeline of workers used to process the messages before sending them.
+        - peers (list) : The addresses of the other servers to link, in the form "IP:port".
+        - ban_file (str) : The file where the bans are kept, by default in the folder of the user.
+        - unix_socket (bool) : If true the server also listens on a Unix domain socket, only usable by the same user.
     """
-    def __init__(self, server_name, user_name, address_ip, port, password):
+    def __init__(self, server_name, user_name, address_ip, port, password, pipeline=None, peers=None, ban_file=None,
+                 unix_socket=False):
         self.server_name = server_name
         self.owner_name = user_name
         self.host = address_ip
         self.port = port
-        self.password = password
+        self.pipeline = pipeline or MessagePipeline()
+        self.content_filter = None
+        self.search_index = SearchIndex()
+
+        # Hash of the password, the passwords of the clients are verified by a pool of workers.
+        self.password_verifier = PasswordVerifier(password)
+
+        # Relay links with the other servers, the peers are dialed when the server is launched.
+        self.federation = Federation(password)
+        self.peers = peers or []
+
+        # Addresses and names banned, and the limit of the connection attempts of each address.
+        self.ban_list = BanList(ban_file)
+        self.rate_limiter = RateLimiter()
+
+        # Dictionary containing the frame reader, the data of the user (None until it is received)
+        # and the start time of each connection which has not finished its handshake.
+        self.handshakes = {}
 
         # Create dictionary containing data of online users.
         self.data_online_client = {"User_Name":[], "Address":[]}
 
+        # Dictionary containing the connection of each online user, by lowercase name.
+        self.clients_by_name = {}
+
+        # Dictionary containing the frame reader of each online user connection.
+        self.readers = {}
+
+        # Queue of the commands sent by the menu (message, password, ban...), executed by the server thread.
+        self.commands = queue.Queue()
+
+        # Queue of the events sent to the menu (messages, online users, results of the commands).
+        self.events = queue.Queue()
+
+        # Dictionary containing the files shared by the users, by ID of transfer.
+        self.transfers = {}
+        self.next_transfer_id = 1
+        self.spool_dir = None
+
+        # List of the files being sent to the users.
+        self.downloads = []
+
+        # Dictionary containing the data not yet sent to each client whose connection is full, by connection.
+        # Each item is a frame, or a part of file given by the file, the offset and the size.
+        # The data is sent without blocking when the connection is ready, so a client which doesn't read never stops the server.
+        self.outgoing = {}
+
+        # Number of the last message sent to all users, and the last messages with their number, author and frame.
+        self.sequence = 0
+        self.history = deque(maxlen=HISTORY_SIZE)
+
+        # Dictionary containing the lowercase name and the expiry time of each session, by token.
+        # The expiry time is None while the client is connected.
+        self.sessions = {}
+
+        # Heap of the expiry times of the sessions kept for a reconnection, with their token.
+        self.session_expiries = []
+
+        # Dictionary containing the session token of each online user connection.
+        self.client_sessions = {}
+
+        # Dictionary containing the name and the expiry time of the users who are typing, by connection.
+        self.typing = {}
+
+        # Connections of the clients informed of the users who are typing, the last list sent and the time it was sent.
+        self.typing_clients = set()
+        self.typing_names = []
+        self.typing_time = 0
+
+        # Capture of the traffic received, None if the traffic is not recorded.
+        self.capture = None
+
+        # Sockets where the clients connect: the TCP socket, and the Unix domain socket if it is asked.
+        self.listeners = []
+        self.use_unix_socket = unix_socket
+        self.unix_path = None
+
         # Define variables.
         self.is_launched = False
-        self.updt_user = False
-        self.new_msg = False
+        self.thread = None
 
     def create_connection(self):
         """Create the server connection according to the IP address and the port."""
@@ -57,13 +230,23 @@ class Server:
             # Create server connection.
             self.server_connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.server_connection.bind((self.host, self.port))
-            self.server_connection.listen(1)
+            self.server_connection.listen(LISTEN_BACKLOG)
+            self.server_connection.setblocking(False)
+            self.listeners = [self.server_connection]
+
+            # Listen on the Unix domain socket, the server is launched even if it can't be created.
+            if self.use_unix_socket:
+                self.create_unix_socket()
             
             # Informs the user of the server launch.
             self.msg_report = [f"The server has been launched on the port {self.port}.",
                                f"Le serveur a été lancé sur le port {self.port}."]
             self.is_launched = True
-            self.updt_user = True
+            self.events.put(["Update User", []])
+
+            # Link the server with the other servers.
+            for address in self.peers:
+                self.federation.add_peer(address)
         
         # Reports an error to the user when launching the server.
         except ValueError as ve:
@@ -74,56 +257,169 @@ class Server:
             self.msg_report = [f"The server could not be launched. Please check the IP address and port.\nError : {e}",
                                f"Le serveur n'a pas pu être lancé. Veuillez vérifier l'adresse IP et le port.\nErreur : {e}"]
 
-    def main(self):
+    def create_unix_socket(self):
         """
-        Starts the server on the server connection.
-        Then accept new clients and manage the reception and sending of messages to other clients.
+        Create the Unix domain socket of the server, named with the port, on the systems which have Unix domain sockets.
+        The file of a previous server is replaced, the port is no longer used by this server since the TCP socket is bound.
+        The socket is created in a directory that only the user of the server can use.
         """
-        if self.is_launched:
+        path = unix_socket_path(self.port)
+
+        if path is None:
+            return
+
+        try:
+            make_unix_socket_directory(path)
+
+            if os.path.lexists(path):
+                os.remove(path)
+
+            unix_connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            unix_connection.bind(path)
+            unix_connection.listen(LISTEN_BACKLOG)
+            unix_connection.setblocking(False)
+
+        except OSError as e:
+            self.events.put(["Error", (UNIX_SOCKET_FAILED, str(e))])
+            return
+
+        self.listeners.append(unix_connection)
+        self.unix_path = path
+
+    def start(self):
+        """Start the thread running the server."""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """Execute the commands of the menu and manage the clients until the server is closed."""
+        while self.is_launched:
+            self.execute_commands()
+            self.main()
+
+    def execute_commands(self):
+        """Execute the commands sent by the menu, and send their results to the menu."""
+        while True:
             try:
-                # Get the list of clients waiting to access the server.
-                waiting_clients, __, __ = select.select([self.server_connection], [], [], 0.05)
+                command = self.commands.get_nowait()
 
-                for client in waiting_clients:
-                    # Accepts all clients in the server.
-                    client_connection, __ = client.accept()
+            except queue.Empty:
+                return
 
-                    # The client send his data contain name and password.
-                    data_user = client_connection.recv(1024)
-                    data_user = pickle.loads(data_user)
+            # Send a message of the server owner.
+            if command[0] == "Send Message":
+                try:
+                    is_sent = self.send_message(command[1], command[2])
 
-                    # Check if the user can access the server.
-                    permission = self.check_data_user(data_user["User_Password"], data_user["User_Name"])
+                # Avoids an error when a client is excluded during the sending.
+                except OSError:
+                    is_sent = True
 
-                    if permission == True:
-                        # Send permission to access the server and the welcome message.
-                        msg_connection = ["server connection accepted", [self.server_name, self.owner_name]]
-                        client_connection.send(pickle.dumps(msg_connection))
+                self.events.put(["Message Sent", command[1], command[2], is_sent])
 
-                        # Add the client to the online users dictionnary.
-                        self.data_online_client["User_Name"].append(data_user["User_Name"])
-                        self.data_online_client["Address"].append(client_connection)
+            elif command[0] == "Change Password":
+                self.password_verifier.set_password(command[1])
+                self.federation.set_password(command[1])
 
-                        # Request to update the display of online users.
-                        self.updt_user = True
+            # Link the server with another server, the menu is informed if the address is incorrect.
+            elif command[0] == "Add Peer":
+                try:
+                    self.federation.add_peer(command[1])
+                    self.events.put(["Peer Added", command[1], True])
 
-                        # Send to client the new list of online users.
-                        updt_online_user = ["Update User", self.data_online_client["User_Name"]]
+                except ValueError:
+                    self.events.put(["Peer Added", command[1], False])
 
-                        for client in self.data_online_client["Address"]:
-                            client.send(pickle.dumps(updt_online_user))
+            # Exclude a user, and ban him if asked, the menu is informed if the user is not found.
+            elif command[0] == "Delete User":
+                try:
+                    self.delete_user(*command[1:])
+                    self.events.put(["User Deleted", command[1], True] + command[2:])
 
-                    else:
-                        # Send a message to the client indicating why they are not allowed to access the server. 
-                        msg_connection = ["server connection refused", permission]
-                        client_connection.send(pickle.dumps(msg_connection))
+                except ValueError:
+                    self.events.put(["User Deleted", command[1], False] + command[2:])
+
+            # Ban an IP address or a network, the menu is informed if the address is incorrect.
+            elif command[0] == "Ban Address":
+                try:
+                    self.events.put(["Address Banned", self.ban_address(command[1]), True])
+
+                except ValueError:
+                    self.events.put(["Address Banned", command[1], False])
+
+            # Remove an address, a network or a name from the bans, the menu is informed if it was not banned.
+            elif command[0] == "Unban":
+                self.events.put(["Unbanned", command[1], self.ban_list.unban(command[1])])
+
+            elif command[0] == "Search":
+                try:
+                    results = self.search_index.search(command[1], limit=command[2])
+
+                # The date of a filter is incorrect.
+                except ValueError:
+                    results = []
+
+                self.events.put(["Search Result", results])
+
+            # Record the traffic received in a file, the menu is informed if the file can't be created.
+            elif command[0] == "Start Capture":
+                self.events.put(["Capture Started", command[1], self.start_capture(command[1])])
+
+            elif command[0] == "Stop Capture":
+                self.stop_capture()
+
+            elif command[0] == "Load Banned Words":
+                self.events.put(["Banned Words", self.load_banned_words(command[1])])
+
+            # Close the server, the thread stops after this command.
+            elif command[0] == "Close Server":
+                self.events.put(["Server Closed", self.close_server(command[1])])
+                return
+
+    def stop(self, timeout:float=2.0):
+        """
+        Close the server from the menu and wait for the end of its thread.
+
+        Arg:
+            - timeout (float): The maximum time in seconds to inform the clients of server shutdown.
+
+        Returns false if the thread has not stopped in time, it is then left running in the background.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            self.commands.put(["Close Server", timeout])
+
+            # The thread has time to finish its loop and to close the workers after informing the clients.
+            self.thread.join(timeout + STOP_DELAY)
+
+            return not self.thread.is_alive()
+
+        # The thread is not started, the server is closed directly.
+        if self.is_launched:
+            self.close_server(timeout)
+
+        return True
+
+    def main(self):
+        """
+        Starts the server on the server connection.
+        Then accept new clients and manage the reception and sending of messages to other clients.
+        """
+        if self.is_launched:
+            try:
+                # Get the list of connections to read: the listeners where new clients are waiting,
+                # the new connections whose data is not yet received, the clients who sent a unread message
+                # and the relay links with the other servers, which are always read.
+                # When the pipeline is full, the messages are left in the connections until workers are free.
+                # The connections receiving a file or with data not yet sent are also waited, to send them the rest when they are ready.
+                waited_clients = [] if self.pipeline.is_full() else self.data_online_client["Address"]
+                listeners = self.listeners if len(self.handshakes) < MAX_HANDSHAKES else []
+                receiving_handshakes = [connection for connection, handshake in self.handshakes.items() if handshake["Data_User"] is None]
+                waited_connections = listeners + receiving_handshakes + waited_clients + self.federation.connections()
+                sending_clients = list({download["Client"] for download in self.downloads} | self.outgoing.keys())
 
-                        # Close the connection with this client.
-                        client_connection.close()
-                
-                # Get the list of clients who sent a unread message.
-                readable_clients, __, __ = select.select(self.data_online_client["Address"],
-                    [], [], 0.05)
+                # Wait less while passwords are verified, to accept the clients as soon as the verification ends.
+                timeout = 0.005 if self.password_verifier.pending else 0.05
+                readable_clients, writable_clients, __ = select.select(waited_connections, sending_clients, [], timeout)
 
             # Avoid an error if there are no client.
             except select.error:
@@ -131,160 +427,1397 @@ class Server:
         
             else:
                 for client in readable_clients:
-                    # Get the ID of the client who sent the message.
-                    for user in self.data_online_client["Address"]:
-                        if user == client:
-                            id_client = self.data_online_client["Address"].index(user)
+                    # A client or another server is waiting to access the server, on the TCP or the Unix socket.
+                    if client in self.listeners:
+                        try:
+                            self.accept_client(client)
+
+                        # Avoids an error when the connection is closed during the access.
+                        except OSError:
+                            pass
+
+                        continue
+
+                    # A new connection has sent its data.
+                    if client in self.handshakes:
+                        try:
+                            self.receive_handshake(client)
+
+                        # The connection is closed during the access, or the client has sent incorrect data.
+                        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+                            if client in self.handshakes:
+                                self.close_handshake(client)
+
+                            elif client not in self.readers and client not in self.federation.links:
+                                client.close()
+
+                        continue
+
+                    # Frames relayed by another server.
+                    if client in self.federation.links:
+                        self.handle_federation(self.federation.receive(client))
+                        continue
 
                     try:
-                        # Receive and decrypt the message.
-                        msg_recv = client.recv(1024)
-                        msg_recv = msg_recv.decode()
-
-                        # Create a list containing the author and message.
-                        self.data_msg_send = [self.data_online_client["User_Name"][id_client], msg_recv]
-                        
-                        # Check if the client want close the connection with the server.
-                        if msg_recv == "Close Client Connection":
-                            name = self.data_online_client["User_Name"][id_client]
-                            self.data_msg_send[1] = [f"{name} exit the server.", f"{name} quitte le serveur."]
-                            self.close_user(client, id_client)
-
-                        # Send the client's message to the other clients.
-                        self.data_msg_send = pickle.dumps(self.data_msg_send)
-                        for connection in self.data_online_client["Address"]:
-                            if connection != client:
-                                connection.send(self.data_msg_send)
-
-                        # Informs for new message.
-                        self.new_msg = True
-
-                    # Avoids an error when a client is excluded and there is no other client remaining in the server.
-                    except OSError:
-                        pass
-
-    def send_message(self, message:str):
+                        # Receive the data in the buffer of the client, then cut it in frames.
+                        reader = self.readers[client]
+
+                        # The connection has been closed by the client without informing the server.
+                        # His session is kept, so that he can reconnect.
+                        if reader.recv_into(client) == 0:
+                            self.keep_session(client)
+                            self.handle_message(client, "Close Client Connection")
+                            continue
+
+                        # Handle each frame received, until the client is closed.
+                        while client in self.readers:
+                            frame = reader.next_frame()
+
+                            if frame is None:
+                                break
+
+                            kind, content = frame
+                            if self.capture is not None:
+                                self.capture.frame(client, kind, content)
+
+                            if kind == FRAME_CHUNK:
+                                self.receive_chunk(client, *content)
+
+                            else:
+                                self.handle_message(client, content)
+
+                    # The connection of the client is broken, or the client has sent an incorrect frame. He is disconnected.
+                    except (OSError, ValueError, TypeError, IndexError, KeyError, pickle.UnpicklingError):
+                        try:
+                            self.keep_session(client)
+                            self.handle_message(client, "Close Client Connection")
+
+                        # Avoids an error when a client is excluded and there is no other client remaining in the server.
+                        except OSError:
+                            pass
+
+                # Send the next chunk of file to the clients ready to receive it.
+                self.send_chunks(writable_clients)
+
+            # Accept or refuse the clients whose password has been verified.
+            self.finish_handshakes()
+
+            # Send the messages processed by the workers to the other clients.
+            if self.pipeline.is_active():
+                for client, name, message, recipient in self.pipeline.collect():
+                    if recipient is None:
+                        self.relay_message(client, name, message)
+
+                    else:
+                        self.direct_message(client, name, recipient, message)
+
+                # Inform the menu of the messages dropped by an error of a stage.
+                for error in self.pipeline.errors:
+                    self.events.put(["Error", (STAGE_FAILED, str(error))])
+
+                self.pipeline.errors.clear()
+
+            # Inform the menu if the ban list can't be read or saved.
+            for error in self.ban_list.errors:
+                self.events.put(["Error", (BAN_LIST_FAILED, str(error))])
+
+            self.ban_list.errors.clear()
+
+            # Inform the clients of the users who are typing.
+            self.send_typing()
+
+            # Add the relay links opened with the other servers, and send them the online users regularly.
+            self.handle_federation(self.federation.refresh())
+
+    def accept_client(self, listener):
         """
-        Send a message to clients.
-        
+        Accept the new connections waiting on a listener, their data is read by receive_handshake when it arrives.
+
         Arg:
-            - message (str): Message to send to clients.
+            - listener : The TCP or Unix socket of the server where the connections are waiting.
         """
-        msg_send = pickle.dumps([self.owner_name, message])
+        while len(self.handshakes) < MAX_HANDSHAKES:
+            # The listener doesn't block, all the connections waiting are accepted.
+            try:
+                client_connection, address = listener.accept()
 
-        for client in self.data_online_client["Address"]:
-            client.send(msg_send)
+            except BlockingIOError:
+                return
+
+            client_connection.setblocking(True)
+
+            # The banned addresses, and the addresses which connect too often, are refused before reading any data.
+            # The clients of the same machine, like the benchmarks connecting many clients at once, are not limited.
+            # The connections of the Unix socket have no IP address.
+            ip = parse_address(address[0]) if isinstance(address, tuple) else None
+
+            if ip is not None and self.ban_list.is_banned_ip(ip):
+                self.close_refused(client_connection, BANNED_FRAME)
+                continue
 
-    def check_data_user(self, user_password:str , user_name:str):
+            if ip is not None and not ip.is_loopback and not self.rate_limiter.allow(str(ip)):
+                self.close_refused(client_connection, RATE_LIMITED_FRAME)
+                continue
+
+            self.handshakes[client_connection] = {"Reader":FrameReader(max_size=MAX_HANDSHAKE_SIZE), "Data_User":None, "Time":time.monotonic()}
+
+    def close_refused(self, client_connection, frame:bytes):
         """
-        Check data entered by user before accept the client connection.
-        
+        Inform a connection refused when it is accepted, without waiting, then close it.
+
         Args:
-            user_password (str): The password entered by the client.
-            user_name (str): The name of the client.
+            - client_connection : The new connection.
+            - frame (bytes): The frame explaining the refusal.
         """
-        same_name = False
-        
-        # Lowercase the name of the user.
-        user_name = user_name.lower()
+        try:
+            client_connection.setblocking(False)
+            client_connection.send(frame)
 
-        # Lowercase all name in the list.
-        online_user = [name.lower() for name in self.data_online_client["User_Name"]] 
-        
-        # Make sure the name is different from the other clients' names.
+        # The frame is not sent if the connection is not ready.
+        except OSError:
+            pass
+
+        client_connection.close()
+
+    def receive_handshake(self, client_connection):
+        """
+        Receive the data of a new connection, and check if the client can access the server.
+        The password is sent to the workers, the client is accepted or refused by finish_handshakes.
+
+        Arg:
+            - client_connection : The new connection.
+        """
+        handshake = self.handshakes[client_connection]
+        reader = handshake["Reader"]
+
+        # The client send his data contain name and password.
         try:
-            online_user.index(user_name)
+            if reader.recv_into(client_connection) == 0:
+                raise ConnectionResetError("The connection has been closed.")
 
-        except ValueError:
-            same_name = False
-        
-        else:
-            same_name = True
-        
-        # Check that the name is different from that of the owner.
-        if user_name == self.owner_name.lower():
-            same_name = True        
+            frame = reader.next_frame()
 
-        # If the name doesn't already exist and the password is correct, then the connection is accepted.
-        if user_password == self.password and not same_name:
-            return True
+        # The client has closed the connection or has sent an incorrect frame.
+        except (OSError, ValueError, pickle.UnpicklingError):
+            self.close_handshake(client_connection)
+            return
+
+        # The data is not completely received.
+        if frame is None:
+            return
+
+        __, data_user = frame
+
+        # The first frame must contain the data of the user, or of the server which opens a link.
+        if not self.is_valid_handshake(data_user):
+            self.close_handshake(client_connection)
+            return
+
+        del self.handshakes[client_connection]
 
-        # The connection with the server is refused.
-        # Name already exists.
-        elif same_name:
-            return "user name"        
+        # Another server opens a relay link.
+        if "Node_Id" in data_user:
+            self.handle_federation(self.federation.accept_link(client_connection, reader, data_user))
+            return
 
-        # Password incorrect.
-        elif user_password != self.password:
-            return "password"
+        # A client reconnecting with a valid session doesn't need the password.
+        token = self.resume_session(data_user)
 
-    def delete_user(self, user_name:str):
+        if token:
+            self.accept_user(client_connection, reader, data_user, token)
+            return
+
+        # The name is checked before the password, which takes longer.
+        permission = self.check_user_name(data_user["User_Name"])
+
+        if permission != True:
+            self.refuse_user(client_connection, permission)
+            return
+
+        handshake["Data_User"] = data_user
+        self.handshakes[client_connection] = handshake
+        self.password_verifier.submit(client_connection, data_user["User_Password"])
+
+    def is_valid_handshake(self, data_user):
         """
-        Ban a user from the server.
+        Check the first frame of a new connection, before using its data.
 
         Arg:
-            - user_name (str): The name of the user to ban.
+            - data_user: The content of the first frame.
+
+        Returns true if the frame contains the name and the password of a user, or the ID of another server, as texts.
         """
-        # Get the ID of the user to ban.
-        id_user = self.data_online_client["User_Name"].index(user_name)
+        if not isinstance(data_user, dict):
+            return False
 
-        # Get his address.
-        user_address = self.data_online_client["Address"][id_user]
-        
-        # Send a message to the user to inform them of their ban.
-        msg_exit = pickle.dumps(["Exit Server", ["You have been kicked out by a moderator.", "Vous avez été exclu du serveur."]])
-        user_address.send(msg_exit)
+        if "Node_Id" in data_user:
+            return isinstance(data_user["Node_Id"], str)
 
-        # Close the client connection.
-        user_address.close()
-        
-        # Delete user from online user dictionnary.
-        for key in self.data_online_client:
-            del self.data_online_client[key][id_user]
-        
-        # Update online users in the server.
-        self.updt_user = True
-        updt_online_user = ["Update User", self.data_online_client["User_Name"]]
-        
-        # Send the new online users list to all clients. 
-        for client in self.data_online_client["Address"]:
-            client.send(pickle.dumps(updt_online_user))
+        return isinstance(data_user.get("User_Name"), str) and isinstance(data_user.get("User_Password"), str)
 
-    def close_user(self, client, id_client):
+    def finish_handshakes(self):
+        """Accept or refuse the clients whose password has been verified, and close the connections which have not sent their data in time."""
+        for client_connection, is_valid in self.password_verifier.collect():
+            handshake = self.handshakes.pop(client_connection)
+            data_user = handshake["Data_User"]
+
+            # The name may have been taken by another user during the verification.
+            permission = self.check_user_name(data_user["User_Name"]) if is_valid else "password"
+
+            try:
+                if permission == True:
+                    self.accept_user(client_connection, handshake["Reader"], data_user)
+
+                else:
+                    self.refuse_user(client_connection, permission)
+
+            # Avoids an error when the connection is closed during the access.
+            except OSError:
+                pass
+
+        now = time.monotonic()
+        for client_connection, handshake in list(self.handshakes.items()):
+            if handshake["Data_User"] is None and now - handshake["Time"] > HANDSHAKE_TIMEOUT:
+                self.close_handshake(client_connection)
+
+    def close_handshake(self, client_connection):
         """
-        Uses to close the client connection.
-        
+        Close a new connection before the end of its handshake.
+
+        Arg:
+            - client_connection : The new connection.
+        """
+        self.handshakes.pop(client_connection, None)
+        self.password_verifier.cancel(client_connection)
+        client_connection.close()
+
+    def accept_user(self, client_connection, reader:FrameReader, data_user:dict, token:str=None):
+        """
+        Give access to the server to a client.
+
         Args:
-            - client : The client that will be closed.
-            - id_client : The ID corresponding to the client.
+            - client_connection : The connection of the client.
+            - reader (FrameReader): The reader of the connection, which may contain the next frames of the client.
+            - data_user (dict): The data sent by the client.
+            - token (str): The token of the session the client resumes, None for a new session.
         """
-        # Close the client connection.
-        client.close()
+        # Create a new session, or continue the session of the client.
+        is_resumed = token is not None
+        token = token or secrets.token_urlsafe(16)
+        self.sessions[token] = {"Name":data_user["User_Name"].casefold(), "Expiry":None}
+        self.client_sessions[client_connection] = token
 
-        # Delete user from online user dictionnary.
-        for key in self.data_online_client:
-            del self.data_online_client[key][id_client]
-        
-        # Update online users in the server.
-        self.updt_user = True
-        updt_online_user = ["Update User", self.data_online_client["User_Name"]]
-        
-        # Send the new online users list to all clients. 
-        for client in self.data_online_client["Address"]:
-            client.send(pickle.dumps(updt_online_user))
+        # Send permission to access the server and the welcome message,
+        # with the token of the session and the number of the last message sent.
+        msg_connection = ["server connection accepted", [self.server_name, self.owner_name], token, self.sequence]
+        self.send_frame(client_connection, pack_object(msg_connection))
 
-    def close_server(self):
-        """Close the server connection."""
-        for client in self.data_online_client["Address"]:
-            # Send a message to all clients to inform them of server shutdown.
-            exit_msg = ["Exit Server", ["The server has been closed.", "Le serveur a été fermé."]]
-            client.send(pickle.dumps(exit_msg))
+        # Add the client to the online users dictionnary.
+        self.data_online_client["User_Name"].append(data_user["User_Name"])
+        self.data_online_client["Address"].append(client_connection)
+        self.clients_by_name[data_user["User_Name"].casefold()] = client_connection
+        # The client can now send longer frames than its data.
+        reader.max_size = MAX_FRAME_SIZE
+        self.readers[client_connection] = reader
 
-            # Close the client connection.
-            client.close()
+        if self.capture is not None:
+            self.capture.connect(client_connection, data_user)
+
+        # Send to clients and to the menu the new list of online users.
+        self.update_users()
+
+        # The client is informed of the users who are typing if he has asked for it.
+        if data_user.get("Typing_Events"):
+            self.typing_clients.add(client_connection)
+
+            if self.typing_names:
+                self.send_frame(client_connection, pack_object(["Typing", self.typing_names]))
+
+        # Send again the messages the client has missed during the reconnection.
+        # The numbers of a new session may come from another server, or from this server before a restart.
+        if is_resumed and isinstance(data_user.get("Last_Sequence"), int):
+            self.resend_messages(client_connection, data_user["User_Name"], data_user["Last_Sequence"])
+
+    def refuse_user(self, client_connection, permission:str):
+        """
+        Refuse the access to the server to a client.
+
+        Args:
+            - client_connection : The connection of the client.
+            - permission (str): The reason of the refusal, "user name", "password" or "banned".
+        """
+        # Send a message to the client indicating why they are not allowed to access the server. 
+        msg_connection = ["server connection refused", permission]
+
+        try:
+            self.send_frame(client_connection, pack_object(msg_connection))
+
+        # Close the connection with this client.
+        finally:
+            self.outgoing.pop(client_connection, None)
+            client_connection.close()
+
+    def handle_message(self, client, msg_recv):
+        """
+        Handle a message received from a client.
+
+        Args:
+            - client : The connection of the client who has sent the message.
+            - msg_recv : The message, a text or a list for the file transfers.
+        """
+        # Ignore the messages of the clients already disconnected.
+        if client not in self.readers:
+            return
+
+        # Get the ID and the name of the client who sent the message.
+        id_client = self.data_online_client["Address"].index(client)
+        name = self.data_online_client["User_Name"][id_client]
+
+        # A user who sends a message has stopped typing.
+        if isinstance(msg_recv, str):
+            self.typing.pop(client, None)
+
+        # The client shares a file, or informs that the user is typing.
+        if isinstance(msg_recv, list):
+            if not self.is_valid_command(msg_recv):
+                pass
+
+            elif msg_recv[0] == "Typing":
+                self.set_typing(client, name, msg_recv[1])
+
+            elif msg_recv[0] == "File Offer":
+                self.offer_file(client, name, *msg_recv[1:])
+
+            elif msg_recv[0] == "File Accept":
+                self.accept_file(client, msg_recv[1])
+
+            elif msg_recv[0] == "File Cancel":
+                self.cancel_file(client, msg_recv[1])
+
+        # Ignore the unknown messages.
+        elif not isinstance(msg_recv, str):
+            pass
+
+        # Check if the client want close the connection with the server.
+        elif msg_recv == "Close Client Connection":
+            self.close_user(client, id_client)
+
+            # The other users are informed after the last messages of the user, still processed by the pipeline.
+            if self.pipeline.is_waiting(client):
+                self.pipeline.defer(client, name, (USER_LEFT, name))
+
+            else:
+                self.relay_message(client, name, (USER_LEFT, name))
+
+        # The client searches old messages.
+        elif msg_recv.startswith("/search "):
+            self.search_messages(client, msg_recv[len("/search "):])
+
+        # The client sends a private message, the recipient name is on the first line.
+        elif msg_recv.startswith("/msg "):
+            recipient, __, message = msg_recv[len("/msg "):].partition("\n")
+
+            if self.pipeline.is_active():
+                self.pipeline.submit(client, name, message, recipient)
+
+            else:
+                self.direct_message(client, name, recipient, message)
+
+        # Send the message to the workers before sending it to the other clients.
+        elif self.pipeline.is_active():
+            self.pipeline.submit(client, name, msg_recv)
+
+        else:
+            self.relay_message(client, name, msg_recv)
+
+    def is_valid_command(self, msg_recv:list):
+        """
+        Check a list message sent by a client before reading its arguments.
+
+        Arg:
+            - msg_recv (list): The message, its first item is the name of the command.
+
+        Returns true if the arguments have the expected number and types, the unknown commands are ignored later.
+        """
+        if not msg_recv or not isinstance(msg_recv[0], str):
+            return False
+
+        if msg_recv[0] not in LIST_COMMANDS:
+            return True
+
+        types, nb_required = LIST_COMMANDS[msg_recv[0]]
+        args = msg_recv[1:]
+
+        if not nb_required <= len(args) <= len(types):
+            return False
+
+        return all(isinstance(arg, arg_type) for arg, arg_type in zip(args, types))
+
+    def send_frame(self, connection, frame:bytes):
+        """
+        Send a frame to a client.
         
-        # The server is no longer launched.
-        self.is_launched = False
+        Args:
+            - connection : The connection of the client.
+            - frame (bytes): The frame to send.
+        """
+        # Data is already waiting for the client, the frame is sent after it.
+        if connection in self.outgoing:
+            pending = self.outgoing[connection]
+            pending.append(memoryview(frame))
+
+            # The client doesn't read its data, its connection is shut down and it is disconnected when read.
+            if len(pending) > MAX_PENDING_FRAMES:
+                del self.outgoing[connection]
+                connection.shutdown(socket.SHUT_RDWR)
+
+            return
+
+        # The part of the frame which doesn't fit in the connection is kept and sent at the next loops.
+        self.outgoing[connection] = deque([memoryview(frame)])
+        self.flush_outgoing(connection)
+
+    def relay_message(self, client, name:str, message, federate:bool=True):
+        """
+        Send the message of a client to the other clients.
+
+        Args:
+            - client : The connection of the client who has sent the message, None if it comes from another server.
+            - name (str): The name of the client.
+            - message : The message to send.
+            - federate (bool): If true, the message is also sent to the other servers.
+        """
+        # Create a list containing the author, the message and its number.
+        frame = self.pack_message(name, message)
+
+        # Index the messages of the clients, the system messages are not indexed.
+        if isinstance(message, str):
+            self.search_index.add(name, message)
+
+        for connection in self.data_online_client["Address"]:
+            if connection != client:
+                try:
+                    self.send_frame(connection, frame)
+
+                # Avoids an error when a client is excluded during the sending.
+                except OSError:
+                    pass
+
+        # Display the message in the server menu.
+        self.events.put(["Message", name, message])
+
+        if federate:
+            self.federation.send_message(name, message)
+
+    def handle_federation(self, events:list):
+        """
+        Handle the events of the relay links: send the messages of the other servers to the clients,
+        the private messages to their recipient, and the new list of online users if the users of the other servers
+        have changed. The errors of the links are reported to the menu.
+
+        Arg:
+            - events (list): The events returned by the federation.
+        """
+        users_changed = False
+
+        for event in events:
+            if event[0] == "Message":
+                self.relay_message(None, event[1], event[2], federate=False)
+
+            elif event[0] == "Private":
+                self.deliver_private(*event[1:])
+
+            elif event[0] == "Update User":
+                users_changed = True
+
+            elif event[0] == "Error":
+                self.events.put(event)
+
+        if users_changed:
+            self.update_users()
+
+    def pack_message(self, name:str, message):
+        """
+        Create the frame of a message sent to all users, with a new number.
+        The frame is kept to be sent again to the clients who reconnect.
+
+        Args:
+            - name (str): The name of the author.
+            - message : The message.
+
+        Returns the bytes of the frame.
+        """
+        self.sequence += 1
+        frame = pack_object([name, message, self.sequence])
+        self.history.append((self.sequence, name.casefold(), frame))
+
+        return frame
+
+    def resume_session(self, data_user:dict):
+        """
+        Check the session of a client who reconnects.
+        If the previous connection of the client is still open, it is closed.
+
+        Arg:
+            - data_user (dict): The data sent by the client.
+
+        Returns the token of the session, None if the session is not valid.
+        """
+        self.expire_sessions()
+
+        # A token or a sequence number of another type is not a session.
+        token = data_user.get("Session_Token")
+        if not isinstance(token, str) or not isinstance(data_user.get("Last_Sequence", 0), int):
+            return None
+
+        session = self.sessions.get(token)
+
+        if session is None or session["Name"] != data_user["User_Name"].casefold():
+            return None
+
+        # The server has not yet noticed that the previous connection is lost.
+        old_connection = self.clients_by_name.get(session["Name"])
+        if old_connection is not None:
+            self.keep_session(old_connection)
+            self.close_user(old_connection, self.data_online_client["Address"].index(old_connection))
+
+        return token
+
+    def keep_session(self, client):
+        """
+        Keep the session of a client whose connection is lost, until the session timeout.
+
+        Arg:
+            - client : The connection of the client.
+        """
+        session = self.sessions.get(self.client_sessions.get(client))
+
+        if session is not None:
+            session["Expiry"] = time.time() + SESSION_TIMEOUT
+            heapq.heappush(self.session_expiries, (session["Expiry"], self.client_sessions[client]))
+
+    def expire_sessions(self):
+        """Forget the sessions whose timeout has elapsed, the earliest expiry time is at the top of the heap."""
+        now = time.time()
+
+        while self.session_expiries and self.session_expiries[0][0] <= now:
+            expiry, token = heapq.heappop(self.session_expiries)
+            session = self.sessions.get(token)
+
+            # The session may have been resumed, or kept again with a later expiry time.
+            if session is not None and session["Expiry"] == expiry:
+                del self.sessions[token]
+
+    def resend_messages(self, client, name:str, last_sequence:int):
+        """
+        Send to a client who reconnects the messages sent after the last message he has received.
+
+        Args:
+            - client : The connection of the client.
+            - name (str): The name of the client, his own messages are not sent.
+            - last_sequence (int): The number of the last message received by the client.
+        """
+        name = name.casefold()
+
+        for sequence, author, frame in self.history:
+            if sequence > last_sequence and author != name:
+                self.send_frame(client, frame)
+
+    def direct_message(self, client, name:str, recipient:str, message:str):
+        """
+        Send the private message of a client to the recipient only.
+        If the recipient is not online, the client receives an error.
+
+        Args:
+            - client : The connection of the client who has sent the message.
+            - name (str): The name of the client.
+            - recipient (str): The name of the user who receives the message.
+            - message (str): The message to send.
+        """
+        try:
+            # The private messages sent to the owner are displayed in the server menu.
+            if recipient.casefold() == self.owner_name.casefold():
+                self.events.put(["Message", (PRIVATE, name), message])
+
+            elif recipient.casefold() in self.clients_by_name:
+                self.send_frame(self.clients_by_name[recipient.casefold()], pack_object(["Direct Message", name, message]))
+
+            # The recipient is a user of another server.
+            elif not self.federation.send_private(name, recipient, message):
+                self.send_frame(client, pack_object(["Direct Message Error", recipient]))
+
+        # Avoids an error when a client is excluded during the sending.
+        except OSError:
+            pass
+
+    def deliver_private(self, name:str, recipient:str, message:str):
+        """
+        Send a private message relayed by another server to its recipient.
+        The message is dropped if the recipient has left the server in the meantime.
+
+        Args:
+            - name (str): The name of the author.
+            - recipient (str): The name of the user who receives the message.
+            - message (str): The message.
+        """
+        try:
+            if recipient.casefold() == self.owner_name.casefold():
+                self.events.put(["Message", (PRIVATE, name), message])
+
+            elif recipient.casefold() in self.clients_by_name:
+                self.send_frame(self.clients_by_name[recipient.casefold()], pack_object(["Direct Message", name, message]))
+
+        # Avoids an error when the recipient is excluded during the sending.
+        except OSError:
+            pass
+
+    def search_messages(self, client, query:str):
+        """
+        Send to a client the messages matching his search.
+
+        Args:
+            - client : The connection of the client who has sent the search.
+            - query (str): The words to search, with the optional filters "from:name", "after:date" and "before:date".
+        """
+        try:
+            results = self.search_index.search(query, limit=20)
+
+        # The date of a filter is incorrect.
+        except ValueError:
+            results = []
+
+        results = [[author, time.strftime("%H:%M", time.localtime(timestamp)), text]
+                   for __, author, timestamp, text in results]
+
+        self.send_frame(client, pack_object(["Search Result", results]))
+
+    def set_typing(self, client, name:str, is_typing:bool):
+        """
+        Update the state of a user who is typing. The clients are informed later by send_typing.
+
+        Args:
+            - client : The connection of the client.
+            - name (str): The name of the client.
+            - is_typing (bool): If true, the user is typing, else he has stopped typing.
+        """
+        if is_typing:
+            self.typing[client] = (name, time.monotonic() + TYPING_TIMEOUT)
+
+        else:
+            self.typing.pop(client, None)
+
+    def send_typing(self):
+        """
+        Send the list of the users who are typing to the clients who have asked for it.
+        The list is sent at most once per interval, and only if it has changed since the last list sent.
+        """
+        now = time.monotonic()
+
+        if now - self.typing_time < TYPING_INTERVAL:
+            return
+
+        self.typing_time = now
+
+        # Forget the users who have stopped typing without informing the server.
+        for client, (__, expiry) in list(self.typing.items()):
+            if expiry < now:
+                del self.typing[client]
+
+        names = sorted(name for name, __ in self.typing.values())
+        if names == self.typing_names:
+            return
+
+        self.typing_names = names
+        frame = pack_object(["Typing", names])
+
+        for client in self.typing_clients:
+            try:
+                self.send_frame(client, frame)
+
+            # Avoids an error when a client is excluded during the sending.
+            except OSError:
+                pass
+
+    def offer_file(self, client, name:str, token:int, file_name:str, size:int, recipient:str=None):
+        """
+        Prepare the reception of a file shared by a client.
+        The client receives the ID of the transfer and can send the chunks of the file.
+
+        Args:
+            - client : The connection of the client who shares the file.
+            - name (str): The name of the client.
+            - token (int): The number given by the client to the file.
+            - file_name (str): The name of the file.
+            - size (int): The size of the file in bytes.
+            - recipient (str): The name of the user who receives the file, by default all the clients receive it.
+        """
+        # Refuse the files too large or sent to a user who is not online.
+        if size < 0 or size > MAX_FILE_SIZE or (recipient and recipient.casefold() not in self.clients_by_name):
+            self.send_frame(client, pack_object(["File Refused", token]))
+            return
+
+        # The files are stored in a temporary folder deleted when the server is closed.
+        if self.spool_dir is None:
+            self.spool_dir = tempfile.mkdtemp(prefix="online_chat_")
+
+        transfer_id = self.next_transfer_id
+        self.next_transfer_id += 1
+
+        self.transfers[transfer_id] = {"Name":os.path.basename(file_name), "Size":size, "Received":0,
+                                       "Sender":name, "Client":client, "Recipient":recipient,
+                                       "File":open(os.path.join(self.spool_dir, str(transfer_id)), "w+b")}
+
+        self.send_frame(client, pack_object(["File Upload", token, transfer_id]))
+
+        # An empty file is immediately complete.
+        if size == 0:
+            self.complete_file(transfer_id)
+
+    def receive_chunk(self, client, transfer_id:int, data:bytes):
+        """
+        Write a chunk of file sent by a client on the disk, and acknowledge it.
+
+        Args:
+            - client : The connection of the client who shares the file.
+            - transfer_id (int): The ID of the transfer.
+            - data (bytes): The chunk of file.
+        """
+        transfer = self.transfers.get(transfer_id)
+
+        # Ignore the chunks of cancelled transfers.
+        if transfer is None or transfer["Client"] != client or transfer["Received"] >= transfer["Size"]:
+            return
+
+        data = data[:transfer["Size"] - transfer["Received"]]
+        transfer["File"].write(data)
+        transfer["Received"] += len(data)
+
+        # The client sends the next chunks only when the previous ones are acknowledged.
+        self.send_frame(client, pack_object(["File Ack", transfer_id, transfer["Received"]]))
+
+        if transfer["Received"] == transfer["Size"]:
+            self.complete_file(transfer_id)
+
+    def complete_file(self, transfer_id:int):
+        """
+        Offer a file completely received to its recipients.
+
+        Arg:
+            - transfer_id (int): The ID of the transfer.
+        """
+        transfer = self.transfers[transfer_id]
+        transfer["File"].flush()
+
+        offer = pack_object(["File Offer", transfer_id, transfer["Sender"], transfer["Name"], transfer["Size"]])
+
+        if transfer["Recipient"]:
+            recipients = [self.clients_by_name.get(transfer["Recipient"].casefold())]
+
+        else:
+            recipients = [connection for connection in self.data_online_client["Address"] if connection != transfer["Client"]]
+
+        for connection in recipients:
+            try:
+                if connection is not None:
+                    self.send_frame(connection, offer)
+
+            # Avoids an error when a client is excluded during the sending.
+            except OSError:
+                pass
+
+    def accept_file(self, client, transfer_id:int):
+        """
+        Start to send a file to a client who has accepted it.
+
+        Args:
+            - client : The connection of the client who receives the file.
+            - transfer_id (int): The ID of the transfer.
+        """
+        transfer = self.transfers.get(transfer_id)
+
+        # The file no longer exists.
+        if transfer is None or transfer["Received"] < transfer["Size"]:
+            self.send_frame(client, pack_object(["File Cancel", transfer_id]))
+
+        else:
+            self.downloads.append({"Client":client, "ID":transfer_id, "Offset":0})
+
+    def cancel_file(self, client, transfer_id:int):
+        """
+        Cancel the sending or the reception of a file by a client.
+
+        Args:
+            - client : The connection of the client who cancels the transfer.
+            - transfer_id (int): The ID of the transfer.
+        """
+        # The client stops receiving the file.
+        self.downloads = [download for download in self.downloads
+                          if download["Client"] != client or download["ID"] != transfer_id]
+
+        # The client stops sending the file, the file is deleted.
+        transfer = self.transfers.get(transfer_id)
+        if transfer is not None and transfer["Client"] == client and transfer["Received"] < transfer["Size"]:
+            self.delete_file(transfer_id)
+
+    def delete_file(self, transfer_id:int):
+        """
+        Delete a shared file from the disk of the server.
+
+        Arg:
+            - transfer_id (int): The ID of the transfer.
+        """
+        transfer = self.transfers.pop(transfer_id)
+
+        # The parts of the file not yet sent are read, so that the chunks already started are complete.
+        for pending in self.outgoing.values():
+            for i, item in enumerate(pending):
+                if isinstance(item, list) and item[0] is transfer["File"]:
+                    transfer["File"].seek(item[1])
+                    pending[i] = memoryview(transfer["File"].read(item[2]))
+
+        transfer["File"].close()
+
+        try:
+            os.remove(transfer["File"].name)
+
+        except OSError:
+            pass
+
+    def send_chunks(self, writable_clients:list):
+        """
+        Send the data waiting for each client ready to receive it, and the next chunk of its files.
+        Only one chunk is added by file at each loop, once the previous chunks are sent, so the files never delay the messages.
+        The connections don't block: a slow client receives the rest of its chunk at the next loops, without stopping the server.
+
+        Arg:
+            - writable_clients (list): The connections ready to receive data.
+        """
+        for client in writable_clients:
+            if client not in self.outgoing:
+                for download in [download for download in self.downloads if download["Client"] == client]:
+                    self.add_chunk(download)
+
+            # The client has no file left to receive.
+            if client not in self.outgoing:
+                continue
+
+            try:
+                self.flush_outgoing(client)
+
+            # The client has been disconnected.
+            except OSError:
+                self.outgoing.pop(client, None)
+                self.downloads = [download for download in self.downloads if download["Client"] != client]
+
+    def add_chunk(self, download:dict):
+        """
+        Add the next chunk of a file to the data to send to the client who receives it.
+
+        Arg:
+            - download (dict): The download of the file by the client.
+        """
+        transfer = self.transfers.get(download["ID"])
+        size = min(CHUNK_SIZE, transfer["Size"] - download["Offset"]) if transfer else 0
+
+        if size > 0:
+            pending = self.outgoing.setdefault(download["Client"], deque())
+            pending.append(memoryview(pack_chunk_header(download["ID"], size)))
+            pending.append([transfer["File"], download["Offset"], size])
+
+            download["Offset"] += size
+
+        # The file has been completely added.
+        if size == 0 or download["Offset"] >= transfer["Size"]:
+            self.downloads.remove(download)
+
+    def flush_outgoing(self, client):
+        """
+        Send to a client the data waiting for it, until its connection is full.
+
+        Arg:
+            - client : The connection of the client.
+        """
+        pending = self.outgoing[client]
+        client.setblocking(False)
+
+        try:
+            while pending:
+                item = pending[0]
+
+                if isinstance(item, memoryview):
+                    nb_bytes = client.send(item)
+                    pending[0] = item = item[nb_bytes:]
+                    is_sent = not item
+
+                else:
+                    nb_bytes = send_file_part(client, *item)
+                    item[1] += nb_bytes
+                    item[2] -= nb_bytes
+                    is_sent = item[2] == 0
+
+                    # The file is shorter than expected.
+                    if nb_bytes == 0 and not is_sent:
+                        raise OSError("The shared file has been truncated.")
+
+                if is_sent:
+                    pending.popleft()
+
+                # The connection is full, the rest is sent when it is ready again.
+                else:
+                    break
+
+        except BlockingIOError:
+            pass
+
+        # The connection is broken, the data is forgotten.
+        except OSError:
+            self.outgoing.pop(client, None)
+            raise
+
+        finally:
+            client.setblocking(True)
+
+        if not pending:
+            del self.outgoing[client]
+
+    def pending_data(self, client):
+        """
+        Read the data waiting to be sent to a client, the parts of file are read from the disk.
+
+        Arg:
+            - client : The connection of the client.
+
+        Returns the bytes of the data.
+        """
+        data = bytearray()
+
+        for item in self.outgoing.get(client, ()):
+            if isinstance(item, memoryview):
+                data += item
+
+            else:
+                item[0].seek(item[1])
+                data += item[0].read(item[2])
+
+        return bytes(data)
+
+    def start_capture(self, path:str):
+        """
+        Start recording the traffic received from the clients, the clients already connected are not recorded.
+
+        Arg:
+            - path (str): The path of the capture file.
+
+        Returns true if the capture has started.
+        """
+        self.stop_capture()
+
+        try:
+            self.capture = TrafficCapture(path)
+
+        except OSError as e:
+            print(e)
+            return False
+
+        return True
+
+    def stop_capture(self):
+        """Stop recording the traffic and close the capture file."""
+        if self.capture is not None:
+            self.capture.close()
+            self.capture = None
+
+    def forget_client(self, client):
+        """
+        Forget the frame reader, the file transfers and the session of a disconnected client.
+
+        Arg:
+            - client : The connection of the client.
+        """
+        self.readers.pop(client, None)
+        self.typing.pop(client, None)
+
+        if self.capture is not None:
+            self.capture.disconnect(client)
+
+        self.typing_clients.discard(client)
+        self.downloads = [download for download in self.downloads if download["Client"] != client]
+        self.outgoing.pop(client, None)
+
+        # The session is deleted, unless it is kept for a reconnection.
+        token = self.client_sessions.pop(client, None)
+        if token in self.sessions and self.sessions[token]["Expiry"] is None:
+            del self.sessions[token]
+
+        # Delete the files the client was sending.
+        for transfer_id, transfer in list(self.transfers.items()):
+            if transfer["Client"] == client and transfer["Received"] < transfer["Size"]:
+                self.delete_file(transfer_id)
+
+    def load_banned_words(self, patterns):
+        """
+        Replace the list of banned words masked in the messages of the clients.
+        The filter is added to the pipeline the first time banned words are loaded.
+
+        Arg:
+            - patterns (list): The banned words.
+
+        Returns the number of banned words loaded.
+        """
+        if self.content_filter is None:
+            self.content_filter = ContentFilter(patterns)
+            self.pipeline.add_stage(self.content_filter)
+
+        # The workers receive the new banned words.
+        else:
+            self.content_filter.load(patterns)
+            self.pipeline.update_stages()
+
+        return self.content_filter.nb_patterns
+
+    def send_message(self, message:str, recipient:str=None):
+        """
+        Send a message to clients.
+        
+        Args:
+            - message (str): Message to send to clients.
+            - recipient (str): The name of the user who receives the message, by default all the clients receive it.
+
+        Returns false if the recipient is not online.
+        """
+        # Send a private message only to the recipient.
+        if recipient is not None:
+            connection = self.clients_by_name.get(recipient.casefold())
+
+            # The recipient may be a user of another server.
+            if connection is None:
+                return self.federation.send_private(self.owner_name, recipient, message)
+
+            self.send_frame(connection, pack_object(["Direct Message", self.owner_name, message]))
+            return True
+
+        msg_send = self.pack_message(self.owner_name, message)
+        self.search_index.add(self.owner_name, message)
+
+        for client in self.data_online_client["Address"]:
+            self.send_frame(client, msg_send)
+
+        self.federation.send_message(self.owner_name, message)
+
+        return True
+
+    def check_user_name(self, user_name:str):
+        """
+        Check the name entered by user before accept the client connection, the password is verified by the workers.
+        
+        Arg:
+            user_name (str): The name of the client.
+
+        Returns true if the name is free, else "user name", or "banned" if the name is banned.
+        """
+        if self.ban_list.is_banned_name(user_name):
+            return "banned"
+
+        # Make sure the name is different from the other clients' names.
+        same_name = user_name.casefold() in self.clients_by_name
+
+        # The names of the users of the other servers are also taken.
+        if user_name.casefold() in (name.casefold() for name in self.federation.remote_users()):
+            same_name = True
+        
+        # Check that the name is different from that of the owner.
+        if user_name.casefold() == self.owner_name.casefold():
+            same_name = True        
+
+        # The connection with the server is refused, the name already exists.
+        if same_name:
+            return "user name"
+
+        return True
+
+    def delete_user(self, user_name:str, ban:bool=False):
+        """
+        Exclude a user from the server.
+
+        Args:
+            - user_name (str): The name of the user to exclude.
+            - ban (bool): If true the name and the IP address of the user are also banned, so he can't connect again.
+        """
+        # Get the ID of the user to exclude.
+        id_user = self.data_online_client["User_Name"].index(user_name)
+
+        # Get his address.
+        user_address = self.data_online_client["Address"][id_user]
+
+        # If asked, the user can't connect again. The address of the machine of the server is not banned,
+        # it would ban all its users.
+        if ban:
+            self.ban_list.ban_name(user_name)
+            ip = self.peer_address(user_address)
+
+            if ip is not None and not ip.is_loopback:
+                self.ban_list.ban_address(str(ip))
+        
+        # Send a message to the user to inform them of their ban.
+        msg_exit = pack_object(["Exit Server", (KICKED,)])
+
+        try:
+            self.send_frame(user_address, msg_exit)
+
+        # The user is excluded even if his connection is already broken.
+        except OSError:
+            pass
+
+        # Close the client connection.
+        user_address.close()
+        self.forget_client(user_address)
+        
+        # Delete user from online user dictionnary.
+        for key in self.data_online_client:
+            del self.data_online_client[key][id_user]
+        del self.clients_by_name[user_name.casefold()]
+        
+        # Update online users in the server.
+        self.update_users()
+
+    def ban_address(self, entry:str):
+        """
+        Ban an IP address or a network, the online users connected from it are excluded.
+
+        Arg:
+            - entry (str): The IP address or the network, like "192.168.1.10" or "192.168.1.0/24".
+
+        Returns the address or the network in its standard form.
+
+        Raises ValueError if the entry is not an IP address or a network.
+        """
+        entry = self.ban_list.ban_address(entry)
+
+        for user_name, connection in list(zip(self.data_online_client["User_Name"], self.data_online_client["Address"])):
+            ip = self.peer_address(connection)
+
+            if ip is not None and self.ban_list.is_banned_ip(ip):
+                self.delete_user(user_name)
+
+        return entry
+
+    def peer_address(self, connection):
+        """
+        Get the IP address of a client.
+
+        Arg:
+            - connection : The connection of the client.
+
+        Returns the IP address, None for the clients of the Unix socket.
+        """
+        try:
+            address = connection.getpeername()
+
+        # The connection is already closed.
+        except OSError:
+            return None
+
+        return parse_address(address[0]) if isinstance(address, tuple) else None
+
+    def update_users(self):
+        """
+        Send the new list of online users to all clients and to the server menu.
+        The users of the other servers are added after the users of this server.
+        """
+        online_users = self.data_online_client["User_Name"] + self.federation.remote_users()
+        updt_online_user = pack_object(["Update User", online_users])
+
+        for client in self.data_online_client["Address"]:
+            try:
+                self.send_frame(client, updt_online_user)
+
+            # A broken connection doesn't stop the update, the client is disconnected when his connection is read.
+            except OSError:
+                pass
+
+        # The menu receives a list which is not modified by the server afterwards.
+        self.events.put(["Update User", online_users])
+
+        # Inform the other servers if the users of this server have changed.
+        self.federation.set_users([self.owner_name] + self.data_online_client["User_Name"])
+
+    def close_user(self, client, id_client):
+        """
+        Uses to close the client connection.
+        
+        Args:
+            - client : The client that will be closed.
+            - id_client : The ID corresponding to the client.
+        """
+        # Close the client connection.
+        client.close()
+        self.forget_client(client)
+
+        # Delete user from online user dictionnary.
+        del self.clients_by_name[self.data_online_client["User_Name"][id_client].casefold()]
+        for key in self.data_online_client:
+            del self.data_online_client[key][id_client]
+        
+        # Update online users in the server.
+        self.update_users()
+
+    def close_server(self, timeout:float=2.0):
+        """
+        Close the server connection.
+        The exit message is sent to all clients in parallel, the shutdown can't last longer than the timeout.
+
+        Arg:
+            - timeout (float): The maximum time in seconds to inform the clients of server shutdown.
+
+        Returns the number of clients informed before the timeout.
+        """
+        # Create the exit message only once for all clients.
+        exit_msg = pack_object(["Exit Server", (SERVER_CLOSED,)])
+
+        # Dictionary containing the part of the message not yet sent to each client.
+        pending_clients = {}
+        for client in self.data_online_client["Address"]:
+            try:
+                client.setblocking(False)
+
+                # The chunk of file partly sent to the client is completed before the message.
+                pending_clients[client] = memoryview(self.pending_data(client) + exit_msg)
+
+            # Avoid an error if the client connection is already closed.
+            except OSError:
+                pass
+
+        nb_informed = 0
+        deadline = time.monotonic() + timeout
+
+        # Send the message to all clients whose connection is ready until the deadline.
+        while pending_clients:
+            remaining_time = deadline - time.monotonic()
+            if remaining_time <= 0:
+                break
+
+            try:
+                __, writable_clients, __ = select.select([], list(pending_clients), [], remaining_time)
+
+            except (OSError, ValueError):
+                break
+
+            for client in writable_clients:
+                try:
+                    nb_bytes = client.send(pending_clients[client])
+
+                # The client connection is not ready.
+                except BlockingIOError:
+                    continue
+
+                # The client connection is broken.
+                except OSError:
+                    del pending_clients[client]
+                    continue
+
+                # The whole message is sent.
+                if nb_bytes == len(pending_clients[client]):
+                    del pending_clients[client]
+                    nb_informed += 1
+
+                else:
+                    pending_clients[client] = pending_clients[client][nb_bytes:]
+
+        # Close all client connections, even those which have not been informed.
+        for client in self.data_online_client["Address"]:
+            client.close()
+
+        for key in self.data_online_client:
+            self.data_online_client[key].clear()
+        self.clients_by_name.clear()
+        self.readers.clear()
+        self.downloads.clear()
+        self.outgoing.clear()
+        self.sessions.clear()
+        self.session_expiries.clear()
+        self.client_sessions.clear()
+
+        # Close the connections which have not finished their handshake.
+        for client_connection in self.handshakes:
+            client_connection.close()
+
+        self.handshakes.clear()
+        self.password_verifier.close()
+
+        # Delete the shared files.
+        for transfer_id in list(self.transfers):
+            self.delete_file(transfer_id)
+
+        if self.spool_dir is not None:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+        
+        # The server is no longer launched.
+        self.is_launched = False
+
+        # Stop the workers of the pipeline, close the relay links and the capture file.
+        self.pipeline.close()
+        self.federation.close()
+        self.stop_capture()
+
+        # Close the TCP and Unix sockets of the server.
+        for listener in self.listeners:
+            listener.close()
+
+        if self.unix_path is not None:
+            try:
+                os.remove(self.unix_path)
+
+            # The file has already been deleted.
+            except OSError:
+                pass
+
+        return nb_informed
+
+
+if __name__ == "__main__":
+    # Launch a server without the graphical user interface, the messages are printed.
+    parser = argparse.ArgumentParser(description="Launch an Online Chat server.")
+    parser.add_argument("server_name")
+    parser.add_argument("owner_name")
+    parser.add_argument("address_ip")
+    parser.add_argument("port")
+    parser.add_argument("password")
+    parser.add_argument("--peer", action="append", default=[], help="address IP:port of another server to link")
+    parser.add_argument("--capture", help="file where the traffic received is recorded")
+    parser.add_argument("--quiet", action="store_true", help="don't print the messages and the online users")
+    parser.add_argument("--ban-file", help="file where the banned addresses and names are kept")
+    parser.add_argument("--unix-socket", action="store_true", help="also listen on a Unix domain socket for the same user")
+    parser.add_argument("--pool", choices=POOL_KINDS, default="inline", help="where the stages of the pipeline are called")
+    parser.add_argument("--workers", type=int, default=4, help="number of workers of the thread or process pool")
+    args = parser.parse_args()
+
+    server = Server(args.server_name, args.owner_name, args.address_ip, args.port, args.password,
+                    pipeline=MessagePipeline(args.workers, args.pool), peers=args.peer, ban_file=args.ban_file,
+                    unix_socket=args.unix_socket)
+    server.create_connection()
+    print(server.msg_report[0], flush=True)
+
+    if server.is_launched:
+        if args.capture:
+            server.start_capture(args.capture)
+
+        server.start()
+
+        try:
+            while server.thread.is_alive():
+                try:
+                    event = server.events.get(timeout=0.5)
+
+                except queue.Empty:
+                    continue
+
+                if event[0] in ("Message", "Update User") and not args.quiet:
+                    print(*event, flush=True)
+
+                elif event[0] == "Error":
+                    print(localize(event[1], 0), flush=True)
 
-        # Close the server connection.
-        self.server_connection.close()
+        # Close the server with Ctrl+C.
+        except KeyboardInterrupt:
+            if not server.stop():
+                print("The server has not stopped in time.", flush=True)
@@ -0,0 +1,147 @@
+"""
+Description:
+    Benchmark of the filter of banned words with 10 000 banned words on a stream of chat messages.
+    The Aho-Corasick filter is compared with a naive search of each banned word in each message.
+    The filter is also measured in the message pipeline of the server, inline and with threads and processes,
+    where each worker receives the filter once when it starts. The cost of sending the filter with each message is given for comparison.
+
+    Usage:
+        python benchmarks/benchmark_filter.py [nb_patterns] [nb_messages]
+
+Packages:
+    - os
+    - pickle
+    - random
+    - sys
+    - time
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import os
+import pickle
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "application"))
+
+from content_filter import ContentFilter
+from pipeline import MessagePipeline
+
+
+def random_word(rand, min_length:int=3, max_length:int=10):
+    """Returns a random lowercase word."""
+    return "".join(rand.choice("abcdefghijklmnopqrstuvwxyz") for __ in range(rand.randint(min_length, max_length)))
+
+
+def create_stream(rand, patterns, nb_messages:int):
+    """
+    Create a stream of chat messages made of common words, where 5% of the messages contain a banned word.
+
+    Returns the list of messages.
+    """
+    vocabulary = [random_word(rand, 2, 8) for __ in range(2000)]
+    messages = []
+
+    for __ in range(nb_messages):
+        words = [rand.choice(vocabulary) for __ in range(rand.randint(3, 30))]
+
+        if rand.random() < 0.05:
+            words.insert(rand.randrange(len(words)), rand.choice(patterns))
+
+        messages.append(" ".join(words))
+
+    return messages
+
+
+def naive_filter(patterns, message:str):
+    """Mask the banned words by searching each of them in the message."""
+    lower_message = message.lower()
+
+    for pattern in patterns:
+        if pattern in lower_message:
+            message = message.replace(pattern, "*" * len(pattern))
+
+    return message
+
+
+def collect(pipeline:MessagePipeline):
+    """Collect the messages processed, and wait a little if none is complete. Returns the number of messages."""
+    nb_done = len(pipeline.collect())
+
+    if not nb_done:
+        time.sleep(0.001)
+
+    return nb_done
+
+
+def pipeline_rate(content_filter:ContentFilter, messages:list, pool:str):
+    """
+    Filter the messages in a pipeline of 2 workers, or inline, the start of the workers is included.
+
+    Returns the number of messages filtered per second.
+    """
+    pipeline = MessagePipeline(workers=2, pool=pool)
+    nb_done = 0
+
+    start = time.perf_counter()
+    pipeline.add_stage(content_filter)
+
+    for message in messages:
+        # Wait for free workers, like the server which stops reading the clients.
+        while pipeline.is_full():
+            nb_done += collect(pipeline)
+
+        pipeline.submit("bench", "bench", message)
+
+    while nb_done < len(messages):
+        nb_done += collect(pipeline)
+
+    elapsed = time.perf_counter() - start
+    pipeline.close()
+
+    return len(messages) / elapsed
+
+
+def main(nb_patterns:int=10000, nb_messages:int=20000):
+    rand = random.Random(0)
+    patterns = list({random_word(rand, 5, 12) for __ in range(nb_patterns)})
+    messages = create_stream(rand, patterns, nb_messages)
+    total_chars = sum(len(message) for message in messages)
+
+    start = time.perf_counter()
+    content_filter = ContentFilter(patterns)
+    compile_time = time.perf_counter() - start
+    print(f"Compilation of {len(patterns)} banned words : {compile_time * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    for message in messages:
+        content_filter("bench", message)
+    automaton_time = time.perf_counter() - start
+    print(f"Aho-Corasick : {nb_messages / automaton_time:,.0f} messages/s, {total_chars / automaton_time / 1e6:.2f} M chars/s")
+
+    # The naive search is much slower, so it is measured on a part of the stream only.
+    sample = messages[:max(1, nb_messages // 20)]
+    start = time.perf_counter()
+    for message in sample:
+        naive_filter(patterns, message)
+    naive_time = time.perf_counter() - start
+    print(f"Naive search : {len(sample) / naive_time:,.0f} messages/s")
+
+    print(f"Speedup : x{(nb_messages / automaton_time) / (len(sample) / naive_time):.1f}")
+
+    for pool, name in (("inline", "Pipeline inline"), ("thread", "Pipeline of 2 threads"), ("process", "Pipeline of 2 processes")):
+        rate = pipeline_rate(content_filter, messages, pool)
+        print(f"{name} : {rate:,.0f} messages/s")
+
+    # Time spent for each message when the filter was sent with it to the processes.
+    start = time.perf_counter()
+    pickle.loads(pickle.dumps([content_filter]))
+    print(f"Filter sent with each message : {(time.perf_counter() - start) * 1000:.1f} ms per message")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,178 @@
+"""
+Description:
+    Benchmark of the reception of the frames, before and after the use of a preallocated buffer.
+    The old reception allocates a new bytes object for each recv and copies each frame before decoding it.
+    The new reception receives the data directly in the buffer of the connection and decodes the frames in place.
+
+    The old reception is the frame reader and the receive loop of the server before the preallocated buffer, unchanged.
+    The memory allocated by both receptions is measured by tracemalloc with the same rule: for each call which
+    receives data or reads a frame, the peak of memory during the call minus the memory before the call,
+    minus the memory used by the measure itself. The calls which receive data and those which read a frame are
+    counted apart, the second include the decoding of the messages, which is the same for both receptions.
+
+    Usage:
+        python benchmarks/benchmark_receive.py [nb_messages]
+
+Packages:
+    - os
+    - pickle
+    - socket
+    - sys
+    - threading
+    - time
+    - tracemalloc
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import os
+import pickle
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "application"))
+
+from protocol import CHUNK_HEADER, FRAME_CHUNK, FRAME_OBJECT, HEADER, MAX_FRAME_SIZE, FrameReader, pack_object
+
+
+class BaselineReader:
+    """Frame reader used before the preallocated buffer, with the receive loop of the server: recv, feed, next_frame."""
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def receive(self, connection):
+        data = connection.recv(65536)
+        self.feed(data)
+        return len(data)
+
+    def feed(self, data:bytes):
+        self.buffer += data
+
+    def next_frame(self):
+        if len(self.buffer) < HEADER.size:
+            return None
+
+        kind, length = HEADER.unpack_from(self.buffer)
+
+        if length > MAX_FRAME_SIZE or kind not in (FRAME_OBJECT, FRAME_CHUNK):
+            raise ValueError("The frame received is incorrect.")
+
+        end = HEADER.size + length
+        if len(self.buffer) < end:
+            return None
+
+        payload = bytes(self.buffer[HEADER.size:end])
+        del self.buffer[:end]
+
+        if kind == FRAME_OBJECT:
+            return kind, pickle.loads(payload)
+
+        transfer_id, = CHUNK_HEADER.unpack_from(payload)
+        return kind, (transfer_id, payload[CHUNK_HEADER.size:])
+
+
+class BufferReader(FrameReader):
+    """Frame reader of the application, with the receive loop of the server: recv_into, next_frame."""
+    def receive(self, connection):
+        return self.recv_into(connection)
+
+
+def traced_call(function, stats:list, overhead:int, *args):
+    """
+    Call a function and add the memory it has allocated to the statistics.
+
+    Args:
+        - function: The function to call.
+        - stats (list): The number of calls which have allocated memory and the number of bytes allocated.
+        - overhead (int): The number of bytes allocated by the measure, see measure_overhead.
+
+    Returns the result of the function.
+    """
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+
+    result = function(*args)
+
+    allocated = tracemalloc.get_traced_memory()[1] - before - overhead
+    if allocated > 0:
+        stats[0] += 1
+        stats[1] += allocated
+
+    return result
+
+
+def measure_overhead():
+    """Returns the number of bytes counted by traced_call for a function which allocates nothing."""
+    stats = [0, 0]
+    traced_call(lambda: None, stats, 0)
+
+    return stats[1]
+
+
+def run(reader, data:bytes, nb_messages:int, trace:bool=False):
+    """
+    Send the data through a pair of connections and read all the messages.
+    The memory is traced in a separate run, because tracing slows down the reception.
+
+    Returns the time taken, and the number of calls which have allocated memory and the bytes allocated,
+    for the calls which receive data and for those which read a frame.
+    """
+    sender, receiver = socket.socketpair()
+    trd_sender = threading.Thread(target=lambda: (sender.sendall(data), sender.close()))
+    receive_stats = [0, 0]
+    frame_stats = [0, 0]
+
+    # The functions are called directly, or through the tracing of their allocations.
+    if trace:
+        tracemalloc.start()
+        overhead = measure_overhead()
+        call = lambda function, stats, *args: traced_call(function, stats, overhead, *args)
+
+    else:
+        call = lambda function, stats, *args: function(*args)
+
+    start = time.perf_counter()
+    trd_sender.start()
+
+    nb_received = 0
+    while nb_received < nb_messages:
+        if call(reader.next_frame, frame_stats) is not None:
+            nb_received += 1
+
+        elif call(reader.receive, receive_stats, receiver) == 0:
+            break
+
+    duration = time.perf_counter() - start
+
+    if trace:
+        tracemalloc.stop()
+
+    trd_sender.join()
+    receiver.close()
+
+    return duration, receive_stats, frame_stats
+
+
+def main(nb_messages:int=200000):
+    # Stream of short chat messages, as relayed by the server.
+    messages = [["user%d" % (i % 50), "message number %d of the benchmark" % i] for i in range(nb_messages)]
+    data = b"".join(pack_object(message) for message in messages)
+
+    print(f"{nb_messages} messages, {len(data) / 1e6:.1f} MB")
+
+    for name, reader_class in (("recv + copy", BaselineReader), ("recv_into + memoryview", BufferReader)):
+        duration = min(run(reader_class(), data, nb_messages)[0] for __ in range(3))
+
+        __, receive_stats, frame_stats = run(reader_class(), data, nb_messages, trace=True)
+        print(f"{name:<24}: {nb_messages / duration:>10,.0f} messages/s")
+        print(f"    receptions : {receive_stats[0]:>7} allocating calls, {receive_stats[1] / nb_messages:>6.1f} bytes per message")
+        print(f"    frames     : {frame_stats[0]:>7} allocating calls, {frame_stats[1] / nb_messages:>6.1f} bytes per message")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,139 @@
+"""
+Description:
+    Benchmark of the display of large batches of messages in the message box.
+    Three displays are compared:
+        - the old message box, which creates a frame and two labels per message and scrolls after each message.
+        - the virtualized message box, with one call to display_message per message.
+        - the virtualized message box, with one call to display_messages for the whole batch.
+    The time includes the layout done by Tk until the messages are drawn.
+
+    A X display is needed. Without the DISPLAY variable, the benchmark starts a virtual display with Xvfb.
+
+    Usage:
+        python benchmarks/benchmark_render.py [nb_messages]
+
+Packages:
+    - os
+    - shutil
+    - subprocess
+    - sys
+    - textwrap
+    - time
+    - tkinter
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import os
+import shutil
+import subprocess
+import sys
+import textwrap
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "application"))
+
+import features as ft
+
+
+class LegacyMessageBox(ft.ScrollableFrame):
+    """Message box used before the virtualization: a frame and two labels per message, kept forever."""
+    def display_message(self, user_name, message, bg_color, bd_color, font_color):
+        bubble_frame = tk.Frame(self.frm_scrollable, bg=bg_color, highlightbackground=bd_color, highlightthickness=1)
+        bubble_frame.pack(fill="x", expand=True, padx=5, pady=5)
+
+        tk.Label(bubble_frame, text="%s, 12:00" % user_name, font=("Courier 9 bold"), bg=bg_color, fg=font_color).pack(anchor="w")
+        tk.Label(bubble_frame, text=textwrap.fill(message, 48), font=("Courier 10"), bg=bg_color, justify="left", fg=font_color).pack(anchor="w")
+
+        self.after(30, lambda: self.canvas.yview_moveto(1))
+
+
+def start_display():
+    """
+    Start a virtual display if there is no display.
+
+    Returns the process of the virtual display, None if a display already exists.
+    """
+    if os.environ.get("DISPLAY"):
+        return None
+
+    if shutil.which("Xvfb") is None:
+        sys.exit("No display is available, please install Xvfb or set the DISPLAY variable.")
+
+    process = subprocess.Popen(["Xvfb", ":99", "-screen", "0", "1280x1024x24"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = ":99"
+    time.sleep(1)
+
+    return process
+
+
+def run(root, box_class, batch:list, use_batch:bool):
+    """
+    Display the batch of messages in a new message box.
+
+    Returns the time taken and the number of widgets created.
+    """
+    box = box_class(root, c_width=400, c_height=500, bg="#FFFFFF")
+    box.pack()
+    root.update()
+
+    nb_widgets = sum(1 for __ in iter_widgets(box))
+    start = time.perf_counter()
+
+    if use_batch:
+        box.display_messages(batch)
+
+    else:
+        for message in batch:
+            box.display_message(*message)
+
+    # Wait until Tk has done the layout and drawn the messages.
+    root.update()
+    time.sleep(0.05)
+    root.update()
+
+    duration = time.perf_counter() - start
+    nb_widgets = sum(1 for __ in iter_widgets(box)) - nb_widgets
+
+    box.destroy()
+    return duration, nb_widgets
+
+
+def iter_widgets(widget):
+    """Returns all the widgets contained in a widget."""
+    for child in widget.winfo_children():
+        yield child
+        yield from iter_widgets(child)
+
+
+def main(nb_messages:int=5000):
+    display = start_display()
+
+    try:
+        root = tk.Tk()
+        root.geometry("790x600")
+
+        # Batch of chat messages of different lengths, as received after a reconnection.
+        batch = [("user%d" % (i % 50), "message number %d " % i * (1 + i % 4), "#FFFDCD", "#DDE3E9", "#000000")
+                 for i in range(nb_messages)]
+
+        print(f"{nb_messages} messages")
+
+        for name, box_class, use_batch in (("frame per message", LegacyMessageBox, False),
+                                           ("virtualized, per message", ft.ScrollableFrameMessage, False),
+                                           ("virtualized, batch", ft.ScrollableFrameMessage, True)):
+            duration, nb_widgets = run(root, box_class, batch, use_batch)
+            print(f"{name:<26}: {duration * 1000:>9,.0f} ms, {nb_messages / duration:>10,.0f} messages/s, {nb_widgets:>7} widgets")
+
+        root.destroy()
+
+    finally:
+        if display is not None:
+            display.terminate()
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
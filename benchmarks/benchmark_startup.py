@@ -0,0 +1,135 @@
+"""
+Description:
+    Benchmark of the startup of the application, tracked over the releases.
+    Two times are measured, each one in a new Python process:
+        - the import of the manager, read with the option -X importtime of Python.
+          The slowest modules are displayed, and the network modules must not be imported before they are used.
+        - the time to the first frame, from the launch of Python until the home menu is drawn.
+    The results can be added to the file startup_history.csv with the option --record, to compare the releases.
+
+    A X display is needed for the first frame. Without the DISPLAY variable, the benchmark starts a virtual display with Xvfb.
+
+    Usage:
+        python benchmarks/benchmark_startup.py [nb_runs] [--record]
+
+Packages:
+    - csv
+    - os
+    - subprocess
+    - sys
+    - time
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import csv
+import os
+import subprocess
+import sys
+import time
+
+from benchmark_render import start_display
+
+APPLICATION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "application")
+HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_history.csv")
+
+# Modules which must only be imported when a server or a client is created.
+NETWORK_MODULES = ("server", "client", "engine", "cache", "pipeline", "search", "protocol", "socket", "select", "pickle",
+                   "multiprocessing", "sqlite3")
+
+# Script executed in the child process to measure the time to the first frame.
+FIRST_FRAME = """
+import sys, time
+import manager
+application = manager.MainController()
+application.update()
+print(time.perf_counter() - float(sys.argv[1]))
+application.destroy()
+"""
+
+
+def measure_imports():
+    """
+    Import the manager in a new process with the option -X importtime.
+
+    Returns the total time in seconds, and a dictionary containing the own time and the cumulative time of each module.
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import manager"], cwd=APPLICATION,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+
+    # Each line is "import time: self [us] | cumulative | imported package".
+    modules = {}
+
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(own) / 1e6, int(cumulative) / 1e6)
+
+    return modules["manager"][1], modules
+
+
+def measure_first_frame():
+    """Returns the time in seconds from the launch of Python until the home menu is drawn."""
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-c", FIRST_FRAME, str(start)], cwd=APPLICATION,
+                             stdout=subprocess.PIPE, text=True, check=True)
+
+    # The child process uses the same clock as this process, the time includes the launch of Python.
+    return float(process.stdout.split()[-1])
+
+
+def record(import_time:float, first_frame:float, network_modules:list):
+    """Add the results to the history of the startup times."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APPLICATION, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True).stdout.strip()
+
+    # The commit is not known outside of the repository.
+    except OSError:
+        commit = ""
+
+    new_file = not os.path.exists(HISTORY)
+
+    with open(HISTORY, "a", newline="") as file:
+        writer = csv.writer(file)
+
+        if new_file:
+            writer.writerow(["date", "commit", "import_ms", "first_frame_ms", "network_modules"])
+
+        writer.writerow([time.strftime("%Y-%m-%d"), commit, round(import_time * 1000, 1), round(first_frame * 1000, 1),
+                         " ".join(network_modules)])
+
+
+def main(nb_runs:int=5):
+    display = start_display()
+
+    try:
+        # The best time of the runs is kept, the first runs can be slowed down by the disk.
+        import_time, modules = min((measure_imports() for __ in range(nb_runs)), key=lambda result: result[0])
+        first_frame = min(measure_first_frame() for __ in range(nb_runs))
+
+    finally:
+        if display is not None:
+            display.terminate()
+
+    print(f"import manager : {import_time * 1000:>7,.1f} ms")
+    print(f"first frame    : {first_frame * 1000:>7,.1f} ms")
+
+    print("\nslowest modules (cumulative, own):")
+    for name, (own, cumulative) in sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[1:11]:
+        print(f"    {name:<30} {cumulative * 1000:>7,.1f} ms {own * 1000:>7,.1f} ms")
+
+    network_modules = [name for name in NETWORK_MODULES if name in modules]
+    print("\nnetwork modules imported at startup:", ", ".join(network_modules) or "none")
+
+    if "--record" in sys.argv:
+        record(import_time, first_frame, network_modules)
+        print(f"results added to {HISTORY}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:] if arg.isdigit()][:1])
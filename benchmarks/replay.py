@@ -0,0 +1,296 @@
+"""
+Description:
+    Replay a capture file recorded by a server (option --capture of server.py) on a new server,
+    to reproduce the traffic of a real server instead of a synthetic one.
+    A headless client is connected for each client recorded, and sends its messages at the time of the capture
+    divided by the speed, or as fast as possible. The messages received by the clients are read and ignored.
+    An observer client measures the latency of the messages sent to all users, from the sending to the reception.
+    The file transfers are not replayed, because the IDs of the transfers are given by the new server.
+
+    Usage:
+        python benchmarks/replay.py capture_file [--speed N | --max]
+
+Packages:
+    - argparse
+    - collections
+    - os
+    - queue
+    - selectors
+    - signal
+    - socket
+    - subprocess
+    - sys
+    - threading
+    - time
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import argparse
+from collections import defaultdict, deque
+import os
+import queue
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+APPLICATION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "application")
+sys.path.insert(0, APPLICATION)
+
+from capture import RECORD_CHUNK, RECORD_CONNECT, RECORD_DISCONNECT, RECORD_MESSAGE, read_capture
+from client import Client
+from protocol import pack_object, receive_frame
+
+PORT = 48760
+PASSWORD = "replay"
+
+# Time in seconds to wait for the last messages after the end of the replay.
+DRAIN_DELAY = 2.0
+
+
+def launch_server(port:int):
+    """Launch a new server in another process, and wait until it accepts the connections."""
+    process = subprocess.Popen([sys.executable, "server.py", "replay", "owner", "127.0.0.1", str(port), PASSWORD, "--quiet"],
+                               cwd=APPLICATION, stdout=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+
+        except OSError:
+            if time.monotonic() > deadline or process.poll() is not None:
+                process.kill()
+                sys.exit("The server could not be launched.")
+
+            time.sleep(0.05)
+
+
+class Replay:
+    """
+    Replay the records of a capture on a server.
+
+    Args:
+        - port (int): The port of the server.
+        - speed (float): The speed of the replay, None to replay as fast as possible.
+    """
+    def __init__(self, port:int, speed:float):
+        self.port = port
+        self.speed = speed
+
+        # Dictionary containing the client of each connection recorded.
+        self.clients = {}
+
+        # Times of sending of the messages not yet received by the observer, by author and text.
+        self.pending = defaultdict(deque)
+        self.latencies = []
+        self.lock = threading.Lock()
+
+        # Queue of the connections to drain or to close, read by the draining thread.
+        # The connections are only closed by this thread, after they are unregistered from its selector.
+        self.new_connections = queue.Queue()
+
+        self.stats = {"connections":0, "refused":0, "messages":0, "skipped":0}
+        self.is_running = True
+
+    def create_client(self, data_user:dict):
+        """
+        Connect a headless client with the data of a user recorded.
+
+        Returns the client, None if the server has refused the connection.
+        """
+        client = Client(data_user["User_Name"], "127.0.0.1", self.port, PASSWORD)
+        client.use_unix_socket = False
+        client.data_user.update({key: value for key, value in data_user.items() if key not in ("Online_User", "Last_Sequence")})
+        client.data_user["User_Password"] = PASSWORD
+
+        if client.connect()[0] != "server connection accepted":
+            client.server_connection.close()
+            return None
+
+        return client
+
+    def observe(self, observer:Client):
+        """Receive the messages sent to all users, and measure their latency. This method is executed in a thread."""
+        while self.is_running:
+            try:
+                __, message = receive_frame(observer.server_connection, observer.reader)
+
+            except (OSError, ValueError):
+                return
+
+            now = time.perf_counter()
+
+            # The messages sent to all users contain the author, the text and the number of the message.
+            if isinstance(message, list) and len(message) == 3 and isinstance(message[1], str):
+                with self.lock:
+                    times = self.pending.get((message[0], message[1]))
+
+                    if times:
+                        self.latencies.append(now - times.popleft())
+
+    def drain(self):
+        """Read and ignore the data received by the clients, so that the server is never blocked. This method is executed in a thread."""
+        selector = selectors.DefaultSelector()
+
+        while self.is_running:
+            while not self.new_connections.empty():
+                connection, is_closed = self.new_connections.get()
+
+                if is_closed:
+                    if connection.fileno() != -1 and connection.fileno() in selector.get_map():
+                        selector.unregister(connection)
+
+                    connection.close()
+
+                # The connection may have been closed by the server during the replay.
+                elif connection.fileno() != -1:
+                    selector.register(connection, selectors.EVENT_READ)
+
+            if not selector.get_map():
+                time.sleep(0.01)
+                continue
+
+            for key, __ in selector.select(0.05):
+                try:
+                    data = key.fileobj.recv(65536)
+
+                except OSError:
+                    data = b""
+
+                if not data:
+                    selector.unregister(key.fileobj)
+
+    def run(self, records):
+        """
+        Replay the records.
+
+        Arg:
+            - records: The records of the capture, see read_capture.
+
+        Returns the time of the capture and the time of the replay in seconds.
+        """
+        observer = self.create_client({"User_Name":"replay observer"})
+        threading.Thread(target=self.observe, args=(observer,), daemon=True).start()
+        trd_drain = threading.Thread(target=self.drain, daemon=True)
+        trd_drain.start()
+
+        start = time.perf_counter()
+        timestamp = 0
+
+        for timestamp, connection_id, kind, content in records:
+            # Wait until the time of the record.
+            if self.speed is not None:
+                delay = start + timestamp / self.speed - time.perf_counter()
+
+                if delay > 0:
+                    time.sleep(delay)
+
+            client = self.clients.get(connection_id)
+
+            try:
+                if kind == RECORD_CONNECT:
+                    client = self.create_client(content)
+
+                    if client is None:
+                        self.stats["refused"] += 1
+
+                    else:
+                        self.stats["connections"] += 1
+                        self.clients[connection_id] = client
+                        self.new_connections.put((client.server_connection, False))
+
+                elif client is None or kind == RECORD_CHUNK:
+                    self.stats["skipped"] += 1
+
+                elif kind == RECORD_DISCONNECT:
+                    self.new_connections.put((client.server_connection, True))
+                    del self.clients[connection_id]
+
+                # The file transfers are not replayed.
+                elif kind == RECORD_MESSAGE and isinstance(content, list) and content[0] != "Typing":
+                    self.stats["skipped"] += 1
+
+                elif kind == RECORD_MESSAGE:
+                    # The messages sent to all users are received by the observer.
+                    if isinstance(content, str) and not content.startswith("/") and content != "Close Client Connection":
+                        with self.lock:
+                            self.pending[(client.user_name, content)].append(time.perf_counter())
+
+                    client.send_frame(pack_object(content))
+                    self.stats["messages"] += 1
+
+            # The server has closed the connection of the client.
+            except OSError:
+                client = self.clients.pop(connection_id, None)
+
+                if client is not None:
+                    self.new_connections.put((client.server_connection, True))
+
+        duration = time.perf_counter() - start
+
+        # Wait for the last messages.
+        deadline = time.monotonic() + DRAIN_DELAY
+        while time.monotonic() < deadline and any(self.pending.values()):
+            time.sleep(0.05)
+
+        # The connections are closed when the draining thread no longer uses them.
+        self.is_running = False
+        trd_drain.join()
+
+        while not self.new_connections.empty():
+            self.new_connections.get()[0].close()
+
+        for client in list(self.clients.values()) + [observer]:
+            client.server_connection.close()
+
+        return timestamp, duration
+
+
+def percentile(values:list, ratio:float):
+    """Returns the value below which a ratio of the sorted values are."""
+    return values[min(int(len(values) * ratio), len(values) - 1)] if values else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a capture file on a new server.")
+    parser.add_argument("capture_file")
+    parser.add_argument("--speed", type=float, default=1.0, help="speed of the replay, 1 for the real time")
+    parser.add_argument("--max", action="store_true", help="replay as fast as possible")
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    records = list(read_capture(args.capture_file))
+    process = launch_server(args.port)
+
+    try:
+        replay = Replay(args.port, None if args.max else args.speed)
+        capture_time, replay_time = replay.run(records)
+
+    finally:
+        process.send_signal(signal.SIGINT)
+        process.wait()
+
+    latencies = sorted(replay.latencies)
+    stats = replay.stats
+    nb_expected = len(latencies) + sum(len(times) for times in replay.pending.values())
+
+    print(f"{len(records)} records, {capture_time:.1f} s captured, replayed in {replay_time:.1f} s "
+          f"({'max' if args.max else f'{args.speed:g}x'} speed)")
+    print(f"connections : {stats['connections']} accepted, {stats['refused']} refused")
+    print(f"messages    : {stats['messages']} sent, {stats['messages'] / max(replay_time, 1e-9):,.0f} messages/s, "
+          f"{stats['skipped']} records not replayed")
+    print(f"latency     : {len(latencies)}/{nb_expected} received, median {percentile(latencies, 0.5) * 1000:.2f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.2f} ms, p99 {percentile(latencies, 0.99) * 1000:.2f} ms, "
+          f"max {percentile(latencies, 1) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
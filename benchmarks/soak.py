@@ -0,0 +1,281 @@
+"""
+Description:
+    Soak test of the server, to find the slow leaks of memory, file descriptors, threads and CPU.
+    The server runs in this process, and bot clients run in a child process. The bots send messages and
+    the typing notifications, and are replaced regularly: some close their connection properly, the others
+    lose it without informing the server.
+
+    At each interval, the test samples the memory (RSS) and the open file descriptors of the process,
+    the number of threads, the CPU used by the thread of the server, and the connections of the server.
+    At the end, the growth of each value per hour is computed by linear regression, after the warm-up,
+    and the test fails if a growth is higher than its maximum. The lines of code which have allocated
+    the most memory since the warm-up are displayed with tracemalloc.
+
+    The file descriptors and the CPU of the thread are read in /proc, on the other systems the number
+    of file descriptors is not sampled and the CPU of the whole process is used.
+
+    Usage:
+        python benchmarks/soak.py [--duration 3600] [--interval 60] [--bots 50] [--churn 0.05]
+
+Packages:
+    - argparse
+    - multiprocessing
+    - os
+    - random
+    - resource
+    - sys
+    - threading
+    - time
+    - tracemalloc
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "application"))
+
+from client import Client
+from server import Server
+
+PASSWORD = "soak"
+
+# Names of the values sampled, with their unit, and the option giving the maximum growth per hour.
+VALUES = (("rss", "MB", "max_rss_slope"), ("fds", "fds", "max_fd_slope"), ("threads", "threads", "max_thread_slope"),
+          ("cpu", "%", "max_cpu_slope"))
+
+
+def run_bots(port:int, nb_bots:int, churn:float, message_delay:float, stop):
+    """
+    Connect the bots and make them send messages until the test is stopped. This function is executed in the child process.
+
+    Args:
+        - port (int): The port of the server.
+        - nb_bots (int): The number of bots connected at the same time.
+        - churn (float): The part of the bots replaced each second.
+        - message_delay (float): The average time in seconds between two messages of a bot.
+        - stop (multiprocessing.Event): Event set at the end of the test.
+    """
+    bots = []
+    nb_created = 0
+    last_churn = time.monotonic()
+
+    while not stop.is_set():
+        # Replace the bots which have left.
+        while len(bots) < nb_bots:
+            nb_created += 1
+            bot = Client(f"bot{nb_created}", "127.0.0.1", port, PASSWORD)
+            bot.create_connection()
+
+            if bot.is_connected:
+                bot.start_receiving()
+                bots.append(bot)
+
+        for bot in bots:
+            # The events received are read and ignored, like a menu would do.
+            while not bot.events.empty():
+                bot.events.get_nowait()
+
+            if random.random() < 0.1 / message_delay:
+                try:
+                    bot.notify_typing()
+                    bot.send_message(f"message {random.random()} " * random.randint(1, 20))
+
+                except OSError:
+                    pass
+
+        # Replace a part of the bots, half close their connection properly and half lose it.
+        if time.monotonic() - last_churn >= 1:
+            last_churn = time.monotonic()
+
+            for bot in random.sample(bots, min(len(bots), round(churn * nb_bots))):
+                bots.remove(bot)
+
+                if random.random() < 0.5:
+                    bot.close()
+
+                else:
+                    bot.is_connected = False
+
+                bot.server_connection.close()
+
+        time.sleep(0.1)
+
+    for bot in bots:
+        bot.close()
+        bot.server_connection.close()
+
+
+def read_rss():
+    """Returns the memory used by the process in MB."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1048576
+
+    # Without /proc, the maximum memory used is read.
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def read_fds():
+    """Returns the number of file descriptors open by the process, None if they can't be counted."""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+
+    except OSError:
+        return None
+
+
+def read_cpu_time(thread:threading.Thread):
+    """Returns the CPU time in seconds used by a thread, or by the process if the time of the thread can't be read."""
+    try:
+        with open(f"/proc/self/task/{thread.native_id}/stat") as file:
+            fields = file.read().rpartition(")")[2].split()
+
+        # The user time and the system time, in clock ticks.
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    except (OSError, AttributeError):
+        return time.process_time()
+
+
+def slope(samples:list, key:str):
+    """
+    Compute the growth of a value by linear regression.
+
+    Args:
+        - samples (list): The samples, each one contains the time in seconds and the values.
+        - key (str): The name of the value.
+
+    Returns the growth per hour, None if there are not enough samples.
+    """
+    points = [(sample["time"], sample[key]) for sample in samples if sample[key] is not None]
+
+    if len(points) < 2:
+        return None
+
+    mean_x = sum(x for x, __ in points) / len(points)
+    mean_y = sum(y for __, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, __ in points)
+
+    if variance == 0:
+        return None
+
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance * 3600
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test of the server.")
+    parser.add_argument("--duration", type=float, default=3600, help="duration of the test in seconds")
+    parser.add_argument("--interval", type=float, default=60, help="time in seconds between two samples")
+    parser.add_argument("--warmup", type=float, default=None, help="time in seconds ignored at the beginning, by default 10%% of the duration")
+    parser.add_argument("--bots", type=int, default=50, help="number of bots connected at the same time")
+    parser.add_argument("--churn", type=float, default=0.05, help="part of the bots replaced each second")
+    parser.add_argument("--message-delay", type=float, default=2.0, help="average time in seconds between two messages of a bot")
+    parser.add_argument("--port", type=int, default=48770)
+    parser.add_argument("--max-rss-slope", type=float, default=20.0, help="maximum growth of the memory in MB per hour")
+    parser.add_argument("--max-fd-slope", type=float, default=10.0, help="maximum growth of the file descriptors per hour")
+    parser.add_argument("--max-thread-slope", type=float, default=5.0, help="maximum growth of the threads per hour")
+    parser.add_argument("--max-cpu-slope", type=float, default=10.0, help="maximum growth of the CPU of the server loop in %% per hour")
+    args = parser.parse_args()
+
+    warmup = args.duration / 10 if args.warmup is None else args.warmup
+    tracemalloc.start(10)
+
+    server = Server("soak", "owner", "127.0.0.1", args.port, PASSWORD)
+    server.create_connection()
+
+    if not server.is_launched:
+        sys.exit(server.msg_report[0])
+
+    server.start()
+
+    # The bots don't share the memory and the file descriptors of the server.
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    bots = context.Process(target=run_bots, args=(args.port, args.bots, args.churn, args.message_delay, stop), daemon=True)
+    bots.start()
+
+    samples = []
+    reference = None
+    start = time.monotonic()
+    cpu_time = read_cpu_time(server.thread)
+
+    print(f"{'time':>8} {'rss MB':>8} {'fds':>6} {'threads':>8} {'cpu %':>6} {'users':>6} {'closed':>7} {'sessions':>9}")
+
+    try:
+        while time.monotonic() - start < args.duration:
+            time.sleep(args.interval)
+
+            # Drain the events of the server, like the menu would do.
+            while not server.events.empty():
+                server.events.get_nowait()
+
+            now = time.monotonic() - start
+            new_cpu_time = read_cpu_time(server.thread)
+
+            # The connections of the server must be forgotten when they are closed.
+            connections = list(server.data_online_client["Address"])
+            sample = {"time":now, "rss":read_rss(), "fds":read_fds(), "threads":threading.active_count(),
+                      "cpu":(new_cpu_time - cpu_time) / args.interval * 100, "users":len(connections),
+                      "closed":sum(1 for connection in connections if connection.fileno() == -1),
+                      "sessions":len(server.sessions)}
+            cpu_time = new_cpu_time
+
+            print(f"{now:>8.0f} {sample['rss']:>8.1f} {sample['fds'] if sample['fds'] is not None else '-':>6} "
+                  f"{sample['threads']:>8} {sample['cpu']:>6.1f} {sample['users']:>6} {sample['closed']:>7} {sample['sessions']:>9}",
+                  flush=True)
+
+            if now >= warmup:
+                samples.append(sample)
+
+                if reference is None:
+                    reference = tracemalloc.take_snapshot()
+
+    finally:
+        stop.set()
+        bots.join(10)
+        server.stop()
+
+    # Lines of code which have allocated the most memory since the warm-up.
+    if reference is not None:
+        print("\ntop allocations since the warm-up:")
+        for statistic in tracemalloc.take_snapshot().compare_to(reference, "lineno")[:10]:
+            print(f"    {statistic}")
+
+    # Compare the growth of each value with its maximum.
+    failed = False
+    print("\ngrowth per hour after the warm-up:")
+
+    for key, unit, option in VALUES:
+        growth = slope(samples, key)
+        maximum = getattr(args, option)
+
+        if growth is None:
+            print(f"    {key:<8}: not enough samples")
+            continue
+
+        is_failed = growth > maximum
+        failed = failed or is_failed
+        print(f"    {key:<8}: {growth:>+9.2f} {unit}/h (maximum {maximum:g}) {'FAILED' if is_failed else 'ok'}")
+
+    # The closed connections must not remain in the online users.
+    if samples and samples[-1]["closed"] > 0:
+        print(f"    {samples[-1]['closed']} closed connections remain in the online users FAILED")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
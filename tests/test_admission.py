@@ -0,0 +1,149 @@
+"""
+Description:
+    Tests of the ban list and of the rate limiter: the networks at the edges of the prefix trie (/0 and /32),
+    the IPv4 addresses mapped in IPv6, the names, the file of the list and the limit of the connection attempts.
+
+    Usage:
+        python -m pytest tests
+
+Packages:
+    - os
+    - pytest
+    - sys
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "application"))
+
+import admission
+from admission import BanList, RateLimiter, parse_address
+
+
+@pytest.fixture
+def ban_list(tmp_path):
+    """Empty ban list saved in a temporary folder."""
+    return BanList(str(tmp_path / "bans.json"))
+
+
+def test_network_zero_bans_all_addresses(ban_list):
+    assert ban_list.ban_address("0.0.0.0/0") == "0.0.0.0/0"
+
+    assert ban_list.is_banned_address("1.2.3.4")
+    assert ban_list.is_banned_address("255.255.255.255")
+    assert not ban_list.is_banned_address("::1")
+
+
+def test_network_32_is_single_address(ban_list):
+    assert ban_list.ban_address("10.0.0.1/32") == "10.0.0.1"
+
+    assert ban_list.addresses == {"10.0.0.1"}
+    assert ban_list.is_banned_address("10.0.0.1")
+    assert not ban_list.is_banned_address("10.0.0.0")
+    assert not ban_list.is_banned_address("10.0.0.2")
+
+
+def test_network_bounds(ban_list):
+    ban_list.ban_address("192.168.1.77/24")
+
+    assert ban_list.networks == {"192.168.1.0/24"}
+    assert ban_list.is_banned_address("192.168.1.0")
+    assert ban_list.is_banned_address("192.168.1.255")
+    assert not ban_list.is_banned_address("192.168.0.255")
+    assert not ban_list.is_banned_address("192.168.2.0")
+
+
+def test_ipv6_network(ban_list):
+    ban_list.ban_address("2001:db8::/32")
+
+    assert ban_list.is_banned_address("2001:db8:ffff::1")
+    assert not ban_list.is_banned_address("2001:db9::1")
+    assert not ban_list.is_banned_address("32.1.13.184")
+
+
+def test_ipv4_mapped_ipv6(ban_list):
+    ban_list.ban_address("203.0.113.0/24")
+    ban_list.ban_address("198.51.100.7")
+
+    assert parse_address("::ffff:203.0.113.9") == parse_address("203.0.113.9")
+    assert ban_list.is_banned_address("::ffff:203.0.113.9")
+    assert ban_list.is_banned_address("::ffff:198.51.100.7")
+    assert not ban_list.is_banned_address("::ffff:198.51.100.8")
+
+
+def test_unix_socket_not_banned(ban_list):
+    ban_list.ban_address("0.0.0.0/0")
+
+    assert parse_address("") is None
+    assert not ban_list.is_banned_address("")
+
+
+def test_incorrect_address(ban_list):
+    with pytest.raises(ValueError):
+        ban_list.ban_address("10.0.0.300")
+
+
+def test_unban(ban_list):
+    ban_list.ban_address("10.0.0.0/8")
+    ban_list.ban_address("10.1.0.0/16")
+
+    assert ban_list.unban("10.0.0.0/8")
+    assert not ban_list.unban("10.0.0.0/8")
+
+    assert ban_list.is_banned_address("10.1.2.3")
+    assert not ban_list.is_banned_address("10.2.0.0")
+
+
+def test_names(ban_list):
+    ban_list.ban_name("Mallory")
+
+    assert ban_list.is_banned_name("MALLORY")
+    assert ban_list.unban("mallory")
+    assert not ban_list.is_banned_name("Mallory")
+
+
+def test_list_saved(ban_list):
+    ban_list.ban_address("10.0.0.0/8")
+    ban_list.ban_address("192.0.2.1")
+    ban_list.ban_name("Mallory")
+
+    loaded = BanList(ban_list.path)
+
+    assert loaded.is_banned_address("10.20.30.40")
+    assert loaded.is_banned_address("192.0.2.1")
+    assert loaded.is_banned_name("mallory")
+    assert loaded.errors == []
+
+
+def test_incorrect_file(tmp_path):
+    path = tmp_path / "bans.json"
+    path.write_text("{not json")
+
+    ban_list = BanList(str(path))
+
+    assert len(ban_list.errors) == 1
+    assert not ban_list.is_banned_address("10.0.0.1")
+
+
+def test_rate_limit():
+    limiter = RateLimiter(rate=0.001, burst=3)
+
+    assert [limiter.allow("192.0.2.1") for __ in range(4)] == [True, True, True, False]
+    assert limiter.allow("192.0.2.2")
+
+
+def test_rate_limit_forgets_least_recent(monkeypatch):
+    monkeypatch.setattr(admission, "MAX_TRACKED", 3)
+    limiter = RateLimiter(rate=0.001, burst=1)
+
+    for address in ("192.0.2.1", "192.0.2.2", "192.0.2.3", "192.0.2.1", "192.0.2.4"):
+        limiter.allow(address)
+
+    assert list(limiter.buckets) == ["192.0.2.3", "192.0.2.1", "192.0.2.4"]
@@ -0,0 +1,63 @@
+"""
+Description:
+    Tests of the catalog of the system messages: the messages given as a tuple of an ID and its parameters,
+    the bilingual lists sent by the previous servers, the texts and the IDs unknown to this version.
+
+    Usage:
+        python -m pytest tests
+
+Packages:
+    - os
+    - pickle
+    - sys
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "application"))
+
+from catalog import KICKED, PRIVATE, SEARCH_RESULTS, SYSTEM, TEMPLATES, USER_LEFT, localize
+
+
+def test_tuple_without_parameter():
+    assert localize((SYSTEM,), 0) == "System"
+    assert localize((KICKED,), 1) == "Vous avez été exclu du serveur."
+
+
+def test_tuple_with_parameters():
+    assert localize((USER_LEFT, "Alice"), 0) == "Alice exit the server."
+    assert localize((PRIVATE, "Bob"), 1) == "Bob (privé)"
+    assert localize((SEARCH_RESULTS, 3, "hello"), 0) == "3 messages found : hello"
+
+
+def test_tuple_received_from_server():
+    # The tuples are sent pickled by the server.
+    message = pickle.loads(pickle.dumps(["Exit Server", (KICKED,)]))
+
+    assert localize(message[1], 0) == "You have been kicked out by a moderator."
+
+
+def test_legacy_list():
+    assert localize(["Alice exit the server.", "Alice quitte le serveur."], 0) == "Alice exit the server."
+    assert localize(["Alice exit the server.", "Alice quitte le serveur."], 1) == "Alice quitte le serveur."
+
+
+def test_text():
+    assert localize("hello", 1) == "hello"
+
+
+def test_unknown_id():
+    # A message of a newer server is displayed with its parameters only.
+    assert localize((999, "Alice", 3), 0) == "Alice 3"
+
+
+def test_templates_have_both_languages():
+    for templates in TEMPLATES.values():
+        assert len(templates) == 2
+        assert templates[0].count("{}") == templates[1].count("{}")
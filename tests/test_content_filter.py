@@ -0,0 +1,90 @@
+"""
+Description:
+    Tests of the filter of banned words: the banned words which overlap or are suffixes of each other,
+    the case of the letters, the block mode and the reloading of the words.
+
+    Usage:
+        python -m pytest tests
+
+Packages:
+    - os
+    - pytest
+    - sys
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "application"))
+
+from content_filter import ContentFilter
+
+
+def test_overlapping_words():
+    content_filter = ContentFilter(["abcd", "cdef"])
+
+    assert content_filter.find("xabcdefx") == [(1, 5), (3, 7)]
+    assert content_filter("user", "xabcdefx") == "x******x"
+
+
+def test_word_suffix_of_another():
+    # "he" ends with "she" and is covered by it, "hers" is found after the failure link from "she" to "he".
+    content_filter = ContentFilter(["he", "she", "hers"])
+
+    assert content_filter.find("ushers") == [(1, 4), (2, 6)]
+    assert content_filter("user", "ushers") == "u*****"
+
+
+def test_word_inside_another():
+    content_filter = ContentFilter(["bad", "badword"])
+
+    assert content_filter("user", "a badword here") == "a ******* here"
+    assert content_filter("user", "a bad one") == "a *** one"
+
+
+def test_repeated_word():
+    assert ContentFilter(["aa"]).find("aaaa") == [(0, 2), (1, 3), (2, 4)]
+
+
+def test_case_ignored():
+    content_filter = ContentFilter(["Secret"])
+
+    assert content_filter("user", "my SECRET and my secret") == "my ****** and my ******"
+    assert ContentFilter(["Secret"], ignore_case=False)("user", "my secret") == "my secret"
+
+
+def test_case_ignored_with_longer_lowercase():
+    # "İ" gives two characters when lowercased, the other words must still be found at their place.
+    assert ContentFilter(["bad"])("user", "BAD word İ") == "*** word İ"
+    assert ContentFilter(["bad"])("user", "İ BAD İ bad") == "İ *** İ ***"
+    assert ContentFilter(["İx"]).find("a İX") == [(2, 4)]
+
+
+def test_message_without_banned_word():
+    content_filter = ContentFilter(["bad", "", "  "])
+
+    assert content_filter.nb_patterns == 1
+    assert content_filter("user", "a good message") == "a good message"
+
+
+def test_block_mode():
+    content_filter = ContentFilter(["bad"], mode="block")
+
+    assert content_filter("user", "a bad message") is None
+    assert content_filter("user", "a good message") == "a good message"
+
+    with pytest.raises(ValueError):
+        ContentFilter(["bad"], mode="hide")
+
+
+def test_reload_words():
+    content_filter = ContentFilter(["old"])
+    content_filter.load(["new"])
+
+    assert content_filter("user", "old and new") == "old and ***"
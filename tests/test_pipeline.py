@@ -0,0 +1,121 @@
+"""
+Description:
+    Tests of the message pipeline: the order of the messages of each sender, the errors of the stages,
+    the stages of several pipelines and of several versions, and the messages which skip the stages.
+
+    Usage:
+        python -m pytest tests
+
+Packages:
+    - os
+    - pytest
+    - sys
+    - time
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "application"))
+
+import pipeline
+from pipeline import MessagePipeline
+
+
+def upper(author, message):
+    return message.upper()
+
+
+def slow_upper(author, message):
+    time.sleep(0.05)
+    return message.upper()
+
+
+def fail(author, message):
+    if message == "boom":
+        raise ValueError("stage failed")
+
+    return message
+
+
+def collect_all(message_pipeline:MessagePipeline, nb_messages:int):
+    """Collect the messages until the expected number is reached, dropped messages included."""
+    results = []
+    deadline = time.monotonic() + 5
+
+    while len(results) + len(message_pipeline.errors) < nb_messages and time.monotonic() < deadline:
+        results += message_pipeline.collect()
+        time.sleep(0.001)
+
+    return [result[2] for result in results]
+
+
+@pytest.mark.parametrize("pool", ["inline", "thread"])
+def test_order_and_errors(pool):
+    message_pipeline = MessagePipeline(workers=2, pool=pool)
+    message_pipeline.add_stage(fail)
+
+    for message in ["a", "boom", "b"]:
+        message_pipeline.submit("sender", "alice", message)
+
+    assert collect_all(message_pipeline, 3) == ["a", "b"]
+    assert [str(error) for error in message_pipeline.errors] == ["stage failed"]
+    message_pipeline.close()
+
+
+def test_unknown_pool():
+    with pytest.raises(ValueError):
+        MessagePipeline(pool="fiber")
+
+
+def test_pipelines_keep_their_stages():
+    first, second = MessagePipeline(workers=1, pool="thread"), MessagePipeline(workers=1, pool="thread")
+    first.add_stage(upper)
+    second.add_stage(fail)
+
+    first.submit("sender", "alice", "hello")
+    second.submit("sender", "alice", "hello")
+
+    assert collect_all(first, 1) == ["HELLO"]
+    assert collect_all(second, 1) == ["hello"]
+
+    first.close()
+    second.close()
+
+
+def test_previous_stages_forgotten():
+    message_pipeline = MessagePipeline(workers=1, pool="thread")
+    message_pipeline.add_stage(fail)
+    message_pipeline.submit("sender", "alice", "hello")
+    assert collect_all(message_pipeline, 1) == ["hello"]
+
+    message_pipeline.add_stage(upper)
+    message_pipeline.submit("sender", "alice", "hello")
+    assert collect_all(message_pipeline, 1) == ["HELLO"]
+
+    # Only the stages of the current version are kept for the pipeline.
+    assert [key for key in pipeline.worker_stages if key[0] == message_pipeline.id] == [(message_pipeline.id, 2)]
+
+    message_pipeline.close()
+    assert not [key for key in pipeline.worker_stages if key[0] == message_pipeline.id]
+
+
+def test_deferred_message_after_sender_messages():
+    message_pipeline = MessagePipeline(workers=1, pool="thread")
+    message_pipeline.add_stage(slow_upper)
+
+    message_pipeline.submit("sender", "alice", "last message")
+    assert message_pipeline.is_waiting("sender")
+
+    message_pipeline.defer("sender", "alice", ("left", "alice"))
+
+    assert collect_all(message_pipeline, 2) == ["LAST MESSAGE", ("left", "alice")]
+    assert not message_pipeline.is_waiting("sender")
+    message_pipeline.close()
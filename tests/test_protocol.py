@@ -0,0 +1,169 @@
+"""
+Description:
+    Tests of the frames exchanged between the server and the clients: the frames received in several parts
+    or together, the chunk frames, the growth of the buffer and the incorrect frames.
+
+    Usage:
+        python -m pytest tests
+
+Packages:
+    - os
+    - pytest
+    - socket
+    - sys
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import os
+import socket
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "application"))
+
+from protocol import (FRAME_CHUNK, FRAME_OBJECT, HEADER, FrameReader, is_trusted_unix_socket, make_unix_socket_directory,
+                      pack_chunk, pack_object, receive_frame)
+
+
+class PartsConnection:
+    """
+    Connection giving the data in the parts chosen by the test, one part by recv_into.
+
+    Arg:
+        - parts (list): The parts of data received, an empty connection is closed.
+    """
+    def __init__(self, parts):
+        self.parts = list(parts)
+
+    def recv_into(self, view):
+        if not self.parts:
+            return 0
+
+        part = self.parts.pop(0)
+        view[:len(part)] = part
+
+        return len(part)
+
+
+def test_frame_split_across_receptions():
+    frame = pack_object(["Message", "alice", "hello"])
+    connection = PartsConnection([frame[:2], frame[2:HEADER.size + 1], frame[HEADER.size + 1:-1], frame[-1:]])
+    reader = FrameReader()
+
+    # The frame is not complete until its last byte is received.
+    for __ in range(3):
+        reader.recv_into(connection)
+        assert not reader.has_frame()
+        assert reader.next_frame() is None
+
+    reader.recv_into(connection)
+    assert reader.next_frame() == (FRAME_OBJECT, ["Message", "alice", "hello"])
+    assert reader.next_frame() is None
+
+
+def test_frame_received_byte_by_byte():
+    frame = pack_object("hello")
+    reader = FrameReader()
+
+    assert receive_frame(PartsConnection([frame[i:i + 1] for i in range(len(frame))]), reader) == (FRAME_OBJECT, "hello")
+
+
+def test_several_frames_in_one_reception():
+    data = pack_object("first") + pack_chunk(7, b"data") + pack_object("third")[:-2]
+    reader = FrameReader()
+    reader.recv_into(PartsConnection([data]))
+
+    assert reader.next_frame() == (FRAME_OBJECT, "first")
+
+    kind, (transfer_id, chunk) = reader.next_frame()
+    assert (kind, transfer_id, bytes(chunk)) == (FRAME_CHUNK, 7, b"data")
+
+    # The end of the last frame is missing.
+    assert reader.next_frame() is None
+
+
+def test_frame_longer_than_buffer():
+    message = "x" * 10000
+    frame = pack_object(message)
+    reader = FrameReader(size=64)
+
+    assert receive_frame(PartsConnection([frame[:50], frame[50:5000], frame[5000:]]), reader) == (FRAME_OBJECT, message)
+    assert len(reader.buffer) >= len(frame)
+
+
+def test_header_alone_does_not_reserve_frame():
+    reader = FrameReader()
+    connection = PartsConnection([HEADER.pack(FRAME_OBJECT, 1000000), b"x" * 100])
+
+    reader.recv_into(connection)
+    reader.recv_into(connection)
+
+    # The buffer only grows with the data received, not with the length announced.
+    assert len(reader.buffer) < 65536
+    assert reader.next_frame() is None
+
+
+def test_frames_through_socket():
+    sender, receiver = socket.socketpair()
+    reader = FrameReader()
+
+    try:
+        for i in range(100):
+            sender.sendall(pack_object(i))
+
+        assert [receive_frame(receiver, reader)[1] for __ in range(100)] == list(range(100))
+
+    finally:
+        sender.close()
+        receiver.close()
+
+
+def test_connection_closed_during_frame():
+    frame = pack_object("hello")
+
+    with pytest.raises(ConnectionResetError):
+        receive_frame(PartsConnection([frame[:-1]]), FrameReader())
+
+
+def test_incorrect_frame():
+    reader = FrameReader()
+    reader.feed(HEADER.pack(9, 4) + b"data")
+
+    with pytest.raises(ValueError):
+        reader.next_frame()
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX") or not hasattr(os, "getuid"), reason="no Unix domain sockets")
+def test_unix_socket_in_private_directory(tmp_path):
+    path = str(tmp_path / "sockets" / "server.sock")
+    make_unix_socket_directory(path)
+
+    assert os.stat(os.path.dirname(path)).st_mode & 0o777 == 0o700
+    assert not is_trusted_unix_socket(path)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        listener.bind(path)
+        assert is_trusted_unix_socket(path)
+
+        # The other users could replace the socket of a directory they can write.
+        os.chmod(os.path.dirname(path), 0o777)
+        assert not is_trusted_unix_socket(path)
+
+        with pytest.raises(PermissionError):
+            make_unix_socket_directory(path)
+
+    finally:
+        listener.close()
+
+
+def test_frame_longer_than_maximum():
+    reader = FrameReader(max_size=16)
+    reader.feed(pack_object("x" * 100))
+
+    with pytest.raises(ValueError):
+        reader.next_frame()
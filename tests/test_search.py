@@ -0,0 +1,108 @@
+"""
+Description:
+    Tests of the search in the messages: the words, the alternatives separated by OR, the filters
+    "from:", "after:" and "before:", the segments and the deletion of the oldest segments.
+
+    Usage:
+        python -m pytest tests
+
+Packages:
+    - datetime
+    - os
+    - pytest
+    - sys
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+from datetime import datetime
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "application"))
+
+from search import SearchIndex, decode_postings, encode_varint
+
+
+def timestamp(text:str):
+    """Returns the timestamp of a date."""
+    return datetime.fromisoformat(text).timestamp()
+
+
+@pytest.fixture
+def index():
+    """Index of a few messages sent on 2020-05-30, with a small segment size to search in several segments."""
+    index = SearchIndex(segment_size=2)
+    index.add("Alice", "Hello everyone", timestamp("2020-05-30T09:00"))
+    index.add("Bob", "hello Alice, the meeting is at noon", timestamp("2020-05-30T10:00"))
+    index.add("alice", "The meeting is cancelled", timestamp("2020-05-30T11:00"))
+    index.add("Carol", "Lunch at noon?", timestamp("2020-05-30T12:00"))
+    index.add("Bob", "bye", timestamp("2020-05-30T13:00"))
+
+    return index
+
+
+def texts(results):
+    """Returns the texts of the results."""
+    return [result[3] for result in results]
+
+
+def test_words(index):
+    assert texts(index.search("meeting")) == ["The meeting is cancelled", "hello Alice, the meeting is at noon"]
+    assert texts(index.search("MEETING noon")) == ["hello Alice, the meeting is at noon"]
+    assert index.search("nothing") == []
+
+
+def test_or(index):
+    assert texts(index.search("lunch OR bye")) == ["bye", "Lunch at noon?"]
+    assert texts(index.search("meeting cancelled OR hello everyone")) == ["The meeting is cancelled", "Hello everyone"]
+
+
+def test_from(index):
+    assert texts(index.search("meeting from:ALICE")) == ["The meeting is cancelled"]
+    assert texts(index.search("from:alice")) == ["The meeting is cancelled", "Hello everyone"]
+    assert texts(index.search("hello", author="bob")) == ["hello Alice, the meeting is at noon"]
+
+
+def test_after_before(index):
+    assert texts(index.search("after:2020-05-30T11:30")) == ["bye", "Lunch at noon?"]
+    assert texts(index.search("before:2020-05-30T09:30")) == ["Hello everyone"]
+    assert texts(index.search("noon after:2020-05-30T09:30 before:2020-05-30T12:30")) == ["Lunch at noon?",
+                                                                                      "hello Alice, the meeting is at noon"]
+
+
+def test_filters_combined_with_or(index):
+    assert texts(index.search("hello OR lunch from:bob")) == ["hello Alice, the meeting is at noon"]
+
+
+def test_incorrect_date(index):
+    with pytest.raises(ValueError):
+        index.search("after:tomorrow")
+
+
+def test_limit(index):
+    assert len(index.search("from:bob", limit=1)) == 1
+
+
+def test_oldest_segments_deleted():
+    index = SearchIndex(segment_size=2, max_segments=2)
+
+    for i in range(6):
+        index.add("Alice", f"message {i}")
+
+    assert texts(index.search("message")) == ["message 5", "message 4", "message 3", "message 2"]
+
+
+def test_postings_round_trip():
+    buffer = bytearray()
+    previous = -1
+
+    for message_id in (0, 1, 200, 20000, 20001):
+        encode_varint(message_id - previous, buffer)
+        previous = message_id
+
+    assert decode_postings(buffer, -1) == [0, 1, 200, 20000, 20001]
@@ -0,0 +1,304 @@
+"""
+Description:
+    Tests of the behaviour of a real server, launched in its thread on a free port of the machine.
+    The clients are raw connections exchanging frames with the server, or instances of the Client class.
+    The tests cover the private messages, the sessions, the file transfers, the order of the messages
+    in the pipeline and the shutdown deadline, with the incorrect frames which have stopped or blocked the server.
+
+    Usage:
+        python -m pytest tests
+
+Packages:
+    - os
+    - pytest
+    - socket
+    - sys
+    - time
+"""
+
+__author__ = ("Manitas Bahri")
+__version__ = "1.0"
+__date__ = "2020/05"
+
+import os
+import socket
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "application"))
+
+from catalog import PRIVATE, USER_LEFT
+from client import Client
+from pipeline import MessagePipeline
+from protocol import FrameReader, pack_object, receive_frame
+from server import STOP_DELAY, Server
+
+PASSWORD = "password"
+
+
+def free_port():
+    """Returns a port free on the machine, in the range accepted by the server."""
+    while True:
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+
+        if 1024 <= port <= 60000:
+            return port
+
+
+def launch_server(tmp_path, pipeline=None):
+    """Launch a server in its thread on a free port."""
+    server = Server("test", "owner", "127.0.0.1", free_port(), PASSWORD, pipeline=pipeline,
+                    ban_file=str(tmp_path / "bans.json"))
+    server.create_connection()
+    assert server.is_launched
+
+    server.start()
+    return server
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = launch_server(tmp_path)
+    yield server
+    server.stop(1.0)
+
+
+def join(server:Server, name:str, password:str=PASSWORD, **data):
+    """
+    Connect a raw client to the server.
+
+    Returns the connection, its reader and the answer of the server.
+    """
+    connection = socket.create_connection(("127.0.0.1", server.port), timeout=5)
+    reader = FrameReader()
+
+    connection.sendall(pack_object(dict({"User_Name":name, "User_Password":password}, **data)))
+    __, answer = receive_frame(connection, reader)
+
+    return connection, reader, answer
+
+
+def receive_until(connection, reader:FrameReader, is_expected):
+    """Returns the first message received for which is_expected is true, the other messages are ignored."""
+    while True:
+        __, message = receive_frame(connection, reader)
+
+        if is_expected(message):
+            return message
+
+
+def is_broadcast(message):
+    """Returns true for the messages sent to all users: the author, the message and its number."""
+    return isinstance(message, list) and len(message) == 3 and isinstance(message[2], int)
+
+
+def wait_for(condition, timeout:float=5):
+    """Wait until the condition is true, returns its last value."""
+    deadline = time.monotonic() + timeout
+
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    return condition()
+
+
+def test_private_message_only_to_recipient(server):
+    alice, alice_reader, __ = join(server, "alice")
+    bob, bob_reader, __ = join(server, "bob")
+    carol, carol_reader, __ = join(server, "carol")
+
+    alice.sendall(pack_object("/msg Bob\nsecret"))
+    assert receive_until(bob, bob_reader, lambda message: message[0] == "Direct Message") == ["Direct Message", "alice", "secret"]
+
+    # Carol receives the next message sent to all, but not the private message.
+    alice.sendall(pack_object("public"))
+    assert receive_until(carol, carol_reader, lambda message: message[0] != "Update User")[1] == "public"
+
+    alice.sendall(pack_object("/msg nobody\nhello"))
+    assert receive_until(alice, alice_reader, lambda message: message[0] == "Direct Message Error") == ["Direct Message Error", "nobody"]
+
+    # The private messages sent to the owner are displayed in the server menu.
+    alice.sendall(pack_object("/msg owner\nto the owner"))
+    assert wait_for(lambda: ["Message", (PRIVATE, "alice"), "to the owner"] in list(server.events.queue))
+
+
+def test_session_resumed_without_password(server):
+    alice, alice_reader, answer = join(server, "alice")
+    bob, bob_reader, __ = join(server, "bob")
+    token, sequence = answer[2], answer[3]
+
+    # The connection of alice is lost without informing the server, then bob sends a message.
+    alice.close()
+    assert wait_for(lambda: "alice" not in server.data_online_client["User_Name"])
+    bob.sendall(pack_object("while you were away"))
+
+    alice, alice_reader, answer = join(server, "alice", password="wrong", Session_Token=token, Last_Sequence=sequence)
+    assert answer[0] == "server connection accepted"
+    assert answer[2] == token
+
+    # The messages sent since the last one received are sent again.
+    assert receive_until(alice, alice_reader, is_broadcast)[1] == "while you were away"
+
+    # An unknown session needs the password.
+    __, __, answer = join(server, "carol", password="wrong", Session_Token="unknown", Last_Sequence=0)
+    assert answer == ["server connection refused", "password"]
+
+
+def test_client_numbers_messages_of_new_session(server):
+    # The client was connected to a previous server, whose messages had higher numbers.
+    bob = Client("bob", "127.0.0.1", server.port, PASSWORD)
+    bob.session_token, bob.last_sequence = "previous token", 50
+    bob.data_user.update({"Session_Token":"previous token", "Last_Sequence":50})
+    bob.create_connection()
+    bob.start_receiving()
+
+    alice, __, __ = join(server, "alice")
+    alice.sendall(pack_object("new server"))
+
+    assert wait_for(lambda: any(event[1:] == ["alice", "new server"] for event in list(bob.events.queue)))
+    assert bob.session_token != "previous token"
+    bob.close()
+
+
+def test_file_transfer(server, tmp_path):
+    data = os.urandom(100000)
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+
+    alice = Client("alice", "127.0.0.1", server.port, PASSWORD)
+    bob = Client("bob", "127.0.0.1", server.port, PASSWORD)
+    bob.download_dir = str(tmp_path / "downloads")
+
+    for client in (alice, bob):
+        client.create_connection()
+        client.start_receiving()
+
+    alice.offer_file(str(path), "bob")
+    assert wait_for(lambda: bob.transfers)
+
+    transfer_id = next(iter(bob.transfers))
+    assert bob.transfers[transfer_id]["Sender"] == "alice"
+
+    bob.accept_file(transfer_id)
+    assert wait_for(lambda: bob.transfers[transfer_id]["State"] == "complete")
+
+    with open(bob.transfers[transfer_id]["Path"], "rb") as file:
+        assert file.read() == data
+
+    alice.close()
+    bob.close()
+
+
+def slow_stage(author, message):
+    time.sleep(0.01)
+    return message.upper()
+
+
+def test_pipeline_keeps_order_until_user_left(tmp_path):
+    message_pipeline = MessagePipeline(workers=2, pool="thread")
+    message_pipeline.add_stage(slow_stage)
+    server = launch_server(tmp_path, message_pipeline)
+
+    try:
+        alice, __, __ = join(server, "alice")
+        bob, bob_reader, __ = join(server, "bob")
+
+        # The user leaves while his messages are still in the pipeline.
+        alice.sendall(b"".join(pack_object(f"message {i}") for i in range(10)) + pack_object("Close Client Connection"))
+
+        received = [receive_until(bob, bob_reader, is_broadcast)[1] for __ in range(11)]
+        assert received == [f"MESSAGE {i}" for i in range(10)] + [(USER_LEFT, "alice")]
+
+    finally:
+        server.stop(1.0)
+
+
+def test_stop_with_client_not_reading(server):
+    sleepy = socket.socket()
+    sleepy.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sleepy.connect(("127.0.0.1", server.port))
+    sleepy.sendall(pack_object({"User_Name":"sleepy", "User_Password":PASSWORD}))
+
+    alice, __, __ = join(server, "alice")
+    carol, carol_reader, __ = join(server, "carol")
+
+    # The frames waiting for the client which doesn't read don't block the other clients.
+    for __ in range(100):
+        alice.sendall(pack_object("x" * 60000))
+
+    alice.sendall(pack_object("ping"))
+    assert receive_until(carol, carol_reader, lambda message: is_broadcast(message) and message[1] == "ping")
+
+    start = time.monotonic()
+    assert server.stop(0.5)
+    assert time.monotonic() - start < 0.5 + STOP_DELAY
+
+
+def test_stop_reports_thread_not_stopped(tmp_path):
+    def blocking_stage(author, message):
+        time.sleep(2)
+        return message
+
+    message_pipeline = MessagePipeline()
+    message_pipeline.add_stage(blocking_stage)
+    server = launch_server(tmp_path, message_pipeline)
+
+    alice, __, __ = join(server, "alice")
+    alice.sendall(pack_object("blocks the loop"))
+    time.sleep(0.2)
+
+    assert not server.stop(0.1)
+    assert wait_for(lambda: not server.thread.is_alive())
+
+
+@pytest.mark.parametrize("frame", [["Typing"], ["Typing", "yes"], ["File Accept"], ["File Accept", "x"], ["File Cancel"],
+                                   ["File Offer", 1], ["File Offer", "1", "name", 10, None], [], [5, 1]])
+def test_incorrect_commands(server, frame):
+    alice, __, __ = join(server, "alice")
+    bob, bob_reader, __ = join(server, "bob")
+
+    alice.sendall(pack_object(frame))
+    alice.sendall(pack_object("still running"))
+
+    assert receive_until(bob, bob_reader, is_broadcast)[1] == "still running"
+    assert server.thread.is_alive()
+
+
+@pytest.mark.parametrize("data_user", [{"User_Name":1, "User_Password":PASSWORD}, {"User_Name":"alice", "User_Password":5},
+                                       {"Node_Id":["x"]}, {"User_Name":"alice", "User_Password":PASSWORD, "Session_Token":["x"]},
+                                       {"User_Name":"alice", "User_Password":PASSWORD, "Last_Sequence":"x"}, [], "x", None])
+def test_incorrect_handshakes(server, data_user):
+    connection = socket.create_connection(("127.0.0.1", server.port), timeout=5)
+    connection.sendall(pack_object(data_user))
+
+    # The connection is closed, or answered when only the session is incorrect, and the server still accepts the users.
+    try:
+        connection.recv(4096)
+
+    except OSError:
+        pass
+
+    connection.close()
+
+    __, __, answer = join(server, "bob")
+    assert answer[0] == "server connection accepted"
+    assert server.thread.is_alive()
+
+
+def test_long_handshake_refused(server):
+    connection = socket.create_connection(("127.0.0.1", server.port), timeout=5)
+    connection.sendall(pack_object({"User_Name":"alice", "User_Password":"x" * 100000}))
+
+    # The frame is refused as soon as its header is read, the rest of the frame is not waited for.
+    try:
+        assert connection.recv(4096) == b""
+
+    except ConnectionResetError:
+        pass
+
+    connection.close()
+    assert not server.handshakes